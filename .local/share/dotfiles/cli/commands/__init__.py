@@ -1,8 +1,22 @@
 """Commands module for deytefiles CLI."""
 
-from .bootstrap import BootstrapCommand
-from .pull import PullCommand
-from .sync import SyncCommand
+import importlib
 
-__all__ = ['BootstrapCommand', 'PullCommand', 'SyncCommand']
+__all__ = ['BootstrapCommand', 'DaemonCommand', 'MaintainCommand', 'PullCommand', 'SyncCommand']
 
+# Command classes are imported on first access so that loading one command
+# does not import the others.
+_COMMAND_MODULES = {
+    'BootstrapCommand': 'bootstrap',
+    'DaemonCommand': 'daemon',
+    'MaintainCommand': 'maintain',
+    'PullCommand': 'pull',
+    'SyncCommand': 'sync',
+}
+
+
+def __getattr__(name):
+    if name in _COMMAND_MODULES:
+        module = importlib.import_module(f".{_COMMAND_MODULES[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,11 +1,17 @@
 """Base command class for deytefiles CLI."""
 
 from abc import ABC, abstractmethod
-from ..notifications import NotificationSystem
 
 
 class BaseCommand(ABC):
     """Base class for all CLI commands."""
+
+    # Exclusive commands run one at a time (see cli/coordinator.py);
+    # long-running commands such as the daemon opt out
+    exclusive = True
+    # Arguments that must be equal for a concurrent run of the same
+    # command to be reused instead of running again
+    coalesce_args = ()
     
     def __init__(self, args):
         """
@@ -17,6 +23,32 @@ class BaseCommand(ABC):
         self.args = args
         self.quiet = getattr(args, 'quiet', False)
     
+    @property
+    def name(self):
+        """Command name, e.g. 'sync' for SyncCommand."""
+        return type(self).__name__.removesuffix('Command').lower()
+
+    def run(self):
+        """
+        Execute the command, coordinated with other deytefiles processes.
+
+        Exclusive commands wait for a running command to finish first. If
+        the running command is the same one with the same arguments, its
+        exit code is returned instead of executing again.
+
+        Returns:
+            int: Exit code (0 for success, non-zero for failure)
+        """
+        if not self.exclusive:
+            return self.execute()
+        # Import here to keep command startup fast
+        import json
+        from ..coordinator import Coordinator
+        key = json.dumps([self.name, getattr(self.args, 'repo_root', None)]
+                         + [getattr(self.args, arg, None) or None for arg in self.coalesce_args])
+        coordinator = Coordinator(timeout=getattr(self.args, 'lock_timeout', None))
+        return coordinator.run(self.name, key, self.execute)
+
     @abstractmethod
     def execute(self):
         """
@@ -37,5 +69,7 @@ class BaseCommand(ABC):
             success (bool): Whether this is a success notification
         """
         if not self.quiet:
+            # Import here to keep command startup fast
+            from ..notifications import NotificationSystem
             NotificationSystem.send(title, message, success)
 
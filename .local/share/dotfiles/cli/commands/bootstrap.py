@@ -1,9 +1,6 @@
 """Bootstrap command for deytefiles."""
 
 import os
-import sys
-import subprocess
-from pathlib import Path
 from .base import BaseCommand
 from ..logger import log_info, log_success, log_error, log_warning
 from ..git_ops import GitRepository
@@ -11,64 +8,84 @@ from ..git_ops import GitRepository
 
 class BootstrapCommand(BaseCommand):
     """Run the bootstrap process to set up dotfiles."""
-    
+
+    coalesce_args = ('dry_run', 'plan', 'save_plan', 'prune', 'jobs', 'copy_policy', 'scheduler')
+
     def execute(self):
         """
         Execute bootstrap command.
-        
+
         This command:
-        1. Executes bootstrap.py from the repository root
-        2. Processes all .strap files
-        3. Creates symlinks and copies files
+        1. Runs the bootstrap engine in-process
+        2. Plans all strap files, detecting conflicting targets
+        3. Creates symlinks and copies files (skipped with --dry-run)
         4. Applies cron jobs
-        
+
         Returns:
             int: Exit code (0 for success, non-zero for failure)
         """
         log_info("Starting bootstrap process...")
-        
+
         try:
             # Navigate to repo root
             repo = GitRepository(self.args.repo_root)
             repo_root = repo.repo_root
             os.chdir(repo_root)
-            
-            bootstrap_script = repo_root / 'bootstrap.py'
-            
-            if not bootstrap_script.exists():
-                log_error(f"Bootstrap script not found: {bootstrap_script}")
-                self.notify(
-                    "Deytefiles Bootstrap Failed",
-                    "bootstrap.py not found in repository root",
-                    success=False
-                )
-                return 1
-            
-            log_info(f"Executing: {bootstrap_script}")
-            
-            # Run bootstrap.py
-            result = subprocess.run(
-                [sys.executable, str(bootstrap_script)],
-                check=False
+
+            from dotfiles import engine, planner
+
+            dry_run = getattr(self.args, 'dry_run', False)
+            plan_file = getattr(self.args, 'plan', None)
+            save_plan = getattr(self.args, 'save_plan', None)
+
+            plan = None
+            if plan_file:
+                try:
+                    plan = planner.Plan.load(plan_file)
+                except (OSError, ValueError) as e:
+                    log_error(f"Could not load plan {plan_file}: {e}")
+                    return 1
+
+            result = engine.run_bootstrap(
+                repo_root,
+                dry_run=dry_run,
+                plan=plan,
+                prune=getattr(self.args, 'prune', False),
+                jobs=getattr(self.args, 'jobs', 1),
+                copy_policy=getattr(self.args, 'copy_policy', None),
+                scheduler=getattr(self.args, 'scheduler', None)
             )
-            
-            if result.returncode == 0:
+
+            if save_plan and result.plan is not None:
+                result.plan.save(save_plan)
+                log_info(f"Plan written to {save_plan}")
+
+            if dry_run:
+                log_info(f"Dry run: {len(result.plan.actions)} actions planned, "
+                         f"{len(result.plan.conflicts)} conflicts")
+                return result.exit_status
+
+            if result.exit_status == 0:
                 log_success("Bootstrap completed successfully!")
                 self.notify(
                     "Deytefiles Bootstrap Complete",
-                    "Dotfiles have been successfully bootstrapped",
+                    f"Dotfiles have been successfully bootstrapped ({result.summary()})",
                     success=True
                 )
                 return 0
             else:
-                log_error(f"Bootstrap failed with exit code {result.returncode}")
+                for path, message in result.failures:
+                    log_error(f"{os.path.relpath(path, repo_root)}: {message}")
+                if result.cron_applied is False:
+                    log_error("Failed to apply cron jobs")
+                log_error(f"Bootstrap finished with errors: {result.summary()}")
                 self.notify(
                     "Deytefiles Bootstrap Failed",
-                    f"Bootstrap process failed with exit code {result.returncode}",
+                    f"Bootstrap finished with errors: {result.summary()}",
                     success=False
                 )
-                return result.returncode
-                
+                return result.exit_status
+
         except KeyboardInterrupt:
             log_warning("\nBootstrap interrupted by user")
             return 130
@@ -80,4 +97,3 @@ class BootstrapCommand(BaseCommand):
                 success=False
             )
             return 1
-
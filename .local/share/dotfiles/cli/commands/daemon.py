@@ -0,0 +1,153 @@
+"""Daemon command for deytefiles."""
+
+import os
+import signal
+import time
+from .base import BaseCommand
+from .pull import PullCommand
+from .sync import SyncCommand
+from ..logger import log_info, log_warning, log_error
+from ..git_ops import GitRepository
+from ..offline import PushQueue
+
+# Defaults, in seconds
+DEFAULT_DEBOUNCE = 30
+DEFAULT_PULL_INTERVAL = 15 * 60
+DEFAULT_POLL_INTERVAL = 60
+# A burst of edits is committed after at most this many debounce periods,
+# even if it never goes quiet
+MAX_DEBOUNCE_PERIODS = 10
+
+
+class DaemonCommand(BaseCommand):
+    """Watch the repository and sync changes as they happen."""
+
+    # Runs until stopped; each sync or pull cycle takes the lock instead
+    exclusive = False
+
+    def execute(self):
+        """
+        Execute daemon command.
+
+        Runs until interrupted (SIGINT/SIGTERM):
+        1. Watches the working tree with inotify (polls `git status` where
+           inotify is unavailable)
+        2. After edits, waits for a quiet period and then syncs them as one commit
+        3. Pulls on an internal schedule (syncing instead when the tree is dirty)
+
+        Returns:
+            int: Exit code (0 when stopped by a signal)
+        """
+        self.debounce = getattr(self.args, 'debounce', None) or DEFAULT_DEBOUNCE
+        self.pull_interval = getattr(self.args, 'pull_interval', None) or DEFAULT_PULL_INTERVAL
+        self.repo = GitRepository(self.args.repo_root)
+        os.chdir(self.repo.repo_root)
+
+        # Sync and pull handle KeyboardInterrupt themselves, so a stop
+        # request is also recorded in a flag checked after every cycle
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        watcher = None
+        try:
+            from ..watcher import TreeWatcher
+            watcher = TreeWatcher(self.repo.repo_root)
+            log_info(f"Watching {self.repo.repo_root} ({len(watcher.watches)} directories)")
+        except OSError as e:
+            log_warning(f"{e}; polling git status every {DEFAULT_POLL_INTERVAL}s instead")
+
+        log_info(f"Daemon started: sync {self.debounce}s after the last edit, "
+                 f"pull every {self.pull_interval}s")
+        try:
+            self._loop(watcher)
+        except KeyboardInterrupt:
+            log_info("Daemon stopped")
+            return 0
+        finally:
+            if watcher is not None:
+                watcher.close()
+
+    def _loop(self, watcher):
+        """Wait for edits and deadlines; never returns normally."""
+        # Monotonic deadlines; None when nothing is pending
+        first_edit = None
+        last_edit = None
+        next_pull = time.monotonic() + self.pull_interval
+
+        while True:
+            now = time.monotonic()
+            deadlines = [next_pull]
+            if last_edit is not None:
+                deadlines.append(min(last_edit + self.debounce,
+                                     first_edit + self.debounce * MAX_DEBOUNCE_PERIODS))
+            timeout = max(0.0, min(deadlines) - now)
+
+            if watcher is not None:
+                changed = watcher.wait(timeout)
+            else:
+                time.sleep(min(timeout, DEFAULT_POLL_INTERVAL))
+                changed = {'.'} if self.repo.snapshot().has_changes else set()
+
+            now = time.monotonic()
+            if changed:
+                if last_edit is None:
+                    first_edit = last_edit = now
+                    log_info(f"Change detected ({_describe(changed)}); syncing after "
+                             f"{self.debounce}s without further edits")
+                elif watcher is not None:
+                    # Each edit restarts the quiet period. Polling only sees
+                    # that the tree is dirty, so there it runs from the first poll.
+                    last_edit = now
+                if watcher is not None:
+                    continue
+
+            if last_edit is not None and (now >= last_edit + self.debounce
+                                          or now >= first_edit + self.debounce * MAX_DEBOUNCE_PERIODS):
+                first_edit = last_edit = None
+                self._run_cycle(watcher, sync=True)
+                next_pull = time.monotonic() + self.pull_interval
+            elif now >= next_pull:
+                self._run_cycle(watcher, sync=False)
+                next_pull = time.monotonic() + self.pull_interval
+            if self.stopping:
+                raise KeyboardInterrupt
+
+    def _run_cycle(self, watcher, sync):
+        """
+        Sync pending edits, unpushed commits (held for the squash window or
+        queued while offline), or pull when there are none.
+
+        Events caused by our own git operations are drained afterwards, so
+        a rebase or pull does not trigger another cycle.
+        """
+        try:
+            # Sync also pushes held or queued commits, and pulls too
+            snapshot = self.repo.snapshot()
+            if snapshot.has_changes or snapshot.ahead or PushQueue().pending(self.repo.repo_root):
+                SyncCommand(self.args).run()
+            elif sync:
+                log_info("Edits left no changes to commit")
+            else:
+                PullCommand(self.args).run()
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            # Keep the daemon alive; the next cycle retries
+            log_error(f"Daemon cycle failed: {e}")
+        finally:
+            os.chdir(self.repo.repo_root)
+            if watcher is not None:
+                watcher.read()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+        raise KeyboardInterrupt
+
+
+def _describe(changed):
+    """Short description of a set of changed paths for the log."""
+    paths = sorted(changed)
+    if len(paths) > 3:
+        return f"{', '.join(paths[:3])} and {len(paths) - 3} more"
+    return ', '.join(paths)
@@ -0,0 +1,253 @@
+"""Maintain command for deytefiles."""
+
+import os
+import statistics
+import subprocess
+import time
+from .base import BaseCommand
+from ..logger import log_info, log_success, log_error, log_warning
+from ..git_ops import GitRepository
+
+# Settings that keep `git status` and `git add -A` fast on a large tree.
+# feature.manyFiles switches to index v4 and enables the untracked cache;
+# the commit-graph speeds up history walks during rebase and fetch.
+MAINTAIN_CONFIG = (
+    ('feature.manyFiles', 'true'),
+    ('core.untrackedCache', 'true'),
+    ('core.commitGraph', 'true'),
+    ('fetch.writeCommitGraph', 'true'),
+)
+
+# `git status` is timed this many times (after one warm-up run)
+STATUS_RUNS = 5
+
+# deytefiles scheduler -> `git maintenance start --scheduler`
+GIT_SCHEDULERS = {
+    'cron': 'crontab',
+    'systemd': 'systemd-timer',
+}
+
+
+class MaintainCommand(BaseCommand):
+    """Tune and maintain the repository so status and sync stay fast."""
+
+    coalesce_args = ('schedule', 'scheduler')
+
+    def execute(self):
+        """
+        Execute maintain command.
+
+        This command:
+        1. Times `git status` as sync runs it
+        2. Enables feature.manyFiles, the untracked cache and the commit-graph
+           in the repository and its checked-out submodules, testing once
+           that the filesystem supports the untracked cache
+        3. Starts the builtin fsmonitor daemon where this git supports it
+        4. Writes the commit-graph and runs an incremental repack
+        5. With --schedule, registers the repositories with `git maintenance start`
+        6. Times `git status` again and reports the difference
+
+        Returns:
+            int: Exit code (0 for success, non-zero for failure)
+        """
+        log_info("Maintaining dotfiles repository...")
+
+        try:
+            repo = GitRepository(self.args.repo_root)
+            os.chdir(repo.repo_root)
+            log_info(f"Repository: {repo.repo_root}")
+
+            before = _status_latency(repo)
+            log_info(f"git status: {before * 1e3:.1f} ms (median of {STATUS_RUNS} runs)")
+
+            repos = [repo] + [GitRepository(path) for path in repo.submodule_paths()]
+            ok = True
+            for target in repos:
+                if target is not repo:
+                    log_info(f"Submodule: {os.path.relpath(target.repo_root, repo.repo_root)}")
+                ok &= self._configure(target)
+            ok &= self._untracked_cache(repos)
+            for target in repos:
+                ok &= self._fsmonitor(target)
+                ok &= self._optimize(target)
+
+            if getattr(self.args, 'schedule', False):
+                ok &= self._schedule(repos)
+
+            after = _status_latency(repo)
+            summary = f"git status: {before * 1e3:.1f} ms -> {after * 1e3:.1f} ms"
+            if after > 0 and before > after:
+                summary += f" ({before / after:.1f}x faster)"
+            log_info(summary)
+
+            if not ok:
+                log_error("Maintenance finished with errors")
+                self.notify("Deytefiles Maintain Failed", f"Some steps failed. {summary}", success=False)
+                return 1
+
+            log_success("Repository maintenance complete!")
+            self.notify("Deytefiles Maintain Complete", summary, success=True)
+            return 0
+
+        except subprocess.CalledProcessError:
+            error_msg = "Maintenance failed. Check the logs for details."
+            log_error(error_msg)
+            self.notify("Deytefiles Maintain Failed", error_msg, success=False)
+            return 1
+        except KeyboardInterrupt:
+            log_warning("\nMaintenance interrupted by user")
+            return 130
+        except Exception as e:
+            log_error(f"Unexpected error: {e}")
+            self.notify("Deytefiles Maintain Failed", f"Unexpected error: {str(e)}", success=False)
+            return 1
+
+    def _configure(self, repo):
+        """
+        Set MAINTAIN_CONFIG in the repository's local config and read it back.
+
+        Returns:
+            bool: True if every setting is in effect
+        """
+        ok = True
+        for key, value in MAINTAIN_CONFIG:
+            if repo.get_config(key) == value:
+                log_info(f"{key}: already {value}")
+                continue
+            if repo.set_config(key, value) and repo.get_config(key) == value:
+                log_info(f"{key}: set to {value}")
+            else:
+                log_error(f"{key}: could not be set to {value}")
+                ok = False
+        return ok
+
+    def _untracked_cache(self, repos):
+        """
+        Check that the filesystem supports the untracked cache, then add it to each index.
+
+        The mtime test takes a few seconds, so it only runs until it has
+        passed once (recorded as deytefiles.untrackedCacheTested).
+
+        Returns:
+            bool: True unless adding the cache to an index failed
+        """
+        primary = repos[0]
+        if primary.get_config('deytefiles.untrackedCacheTested') != 'true':
+            log_info("Testing untracked cache support (takes a few seconds)...")
+            result = primary.run(['update-index', '--test-untracked-cache'])
+            if result.returncode != 0:
+                # The cache would silently miss new files; turn it back off
+                log_warning("The filesystem does not support the untracked cache; disabling it")
+                for repo in repos:
+                    repo.set_config('core.untrackedCache', 'false')
+                return True
+            primary.set_config('deytefiles.untrackedCacheTested', 'true')
+
+        ok = True
+        for repo in repos:
+            result = repo.run(['update-index', '--untracked-cache'])
+            if result.returncode != 0:
+                log_error(f"Enabling the untracked cache failed: {result.stderr.strip()}")
+                ok = False
+        if ok:
+            log_info("Untracked cache: enabled")
+        return ok
+
+    def _fsmonitor(self, repo):
+        """
+        Enable core.fsmonitor and start the builtin daemon, where supported.
+
+        A hook-based fsmonitor (e.g. Watchman) that is already configured
+        is left alone. The daemon needs git 2.36+ and a supported platform.
+
+        Returns:
+            bool: False only if a supported daemon failed to start
+        """
+        current = repo.get_config('core.fsmonitor')
+        if current and current.lower() not in ('true', 'false'):
+            log_info(f"core.fsmonitor: hook {current} already configured")
+            return True
+
+        status = repo.run(['fsmonitor--daemon', 'status'])
+        output = (status.stdout + status.stderr).strip()
+        if 'is watching' in output:
+            log_info("core.fsmonitor: daemon already running")
+            return repo.get_config('core.fsmonitor') == 'true' or repo.set_config('core.fsmonitor', 'true')
+        if 'not watching' not in output:
+            # Unknown command (git < 2.36) or "not supported on this platform"
+            log_info("core.fsmonitor: not supported by this git on this platform; skipped")
+            return True
+
+        repo.set_config('core.fsmonitor', 'true')
+        repo.run(['fsmonitor--daemon', 'start'])
+        if 'is watching' in repo.run(['fsmonitor--daemon', 'status']).stdout:
+            log_info("core.fsmonitor: daemon started")
+            return True
+        log_error("core.fsmonitor: daemon failed to start; disabling it")
+        repo.set_config('core.fsmonitor', 'false')
+        return False
+
+    def _optimize(self, repo):
+        """
+        Write and verify the commit-graph, then repack loose objects incrementally.
+
+        Returns:
+            bool: True if every step succeeded
+        """
+        steps = (
+            ("Writing commit-graph", ['commit-graph', 'write', '--reachable', '--changed-paths']),
+            ("Verifying commit-graph", ['commit-graph', 'verify']),
+            # Separate runs: the repack needs the pack loose-objects writes
+            # in a repository that has no packs yet
+            ("Packing loose objects", ['maintenance', 'run', '--task=loose-objects']),
+            ("Repacking incrementally", ['maintenance', 'run', '--task=incremental-repack']),
+        )
+        for label, args in steps:
+            log_info(f"{label}...")
+            result = repo.run(args)
+            if result.returncode != 0:
+                log_error(f"{label} failed: {(result.stderr or result.stdout).strip()}")
+                return False
+        return True
+
+    def _schedule(self, repos):
+        """
+        Register the repositories for background `git maintenance`.
+
+        git runs the hourly commit-graph and prefetch tasks and the daily
+        incremental repack from the scheduler chosen with --scheduler.
+
+        Returns:
+            bool: True if scheduling succeeded
+        """
+        scheduler = getattr(self.args, 'scheduler', None) \
+            or os.environ.get('DEYTEFILES_SCHEDULER') or 'cron'
+        primary = repos[0]
+        log_info(f"Scheduling background maintenance ({scheduler})...")
+        result = primary.run(['maintenance', 'start', f"--scheduler={GIT_SCHEDULERS[scheduler]}"])
+        if result.returncode != 0:
+            log_error(f"git maintenance start failed: {(result.stderr or result.stdout).strip()}")
+            return False
+        for repo in repos[1:]:
+            repo.run(['maintenance', 'register'])
+        log_info("Background maintenance scheduled")
+        return True
+
+
+def _status_latency(repo, runs=STATUS_RUNS):
+    """
+    Time `git status` the way sync reads it.
+
+    The first run is not counted: it warms the page cache and, right after
+    maintenance, fills the untracked cache.
+
+    Returns:
+        float: Median wall time in seconds
+    """
+    repo.snapshot()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        repo.snapshot()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
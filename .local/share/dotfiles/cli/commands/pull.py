@@ -10,6 +10,8 @@ from ..git_ops import GitRepository
 class PullCommand(BaseCommand):
     """Pull dotfiles repository from remote."""
 
+    coalesce_args = ('apply',)
+
     def execute(self):
         log_info("Pulling dotfiles from remote...")
 
@@ -18,9 +20,19 @@ class PullCommand(BaseCommand):
             os.chdir(repo.repo_root)
             log_info(f"Repository: {repo.repo_root}")
 
-            branch = repo.get_current_branch()
+            snapshot = repo.snapshot()
+            branch = snapshot.branch
             log_info(f"Current branch: {branch}")
 
+            # Import here to keep command startup fast
+            from ..offline import PushQueue, probe_remotes
+            offline = probe_remotes({'origin': repo.remote_url('origin')},
+                                    ssh_command=repo.get_config('core.sshCommand'))
+            if offline:
+                # Not worth a failure notification; the next run tries again
+                log_warning(f"origin is unreachable ({offline['origin']}); skipping pull")
+                return 0
+
             log_info(f"Pulling changes from origin/{branch} with rebase...")
             result = repo.pull_rebase('origin', branch)
 
@@ -41,6 +53,23 @@ class PullCommand(BaseCommand):
                 return 1
 
             log_success("Dotfiles pulled successfully!")
+
+            pending = PushQueue().pending(repo.repo_root)
+            if pending:
+                self._flush_in_background(repo, pending)
+
+            from ..submodules import update_stale_submodules
+            failed = update_stale_submodules(repo, snapshot.oid, getattr(self.args, 'jobs', None),
+                                             getattr(self.args, 'shallow', True))
+            if failed:
+                error_msg = f"Pulled, but updating submodules failed: {', '.join(failed)}"
+                log_error(error_msg)
+                self.notify("Deytefiles Pull Failed", error_msg, success=False)
+                return 1
+
+            if getattr(self.args, 'apply', False):
+                return self._apply(repo, snapshot.oid, branch)
+
             self.notify(
                 "Deytefiles Pull Complete",
                 f"Successfully pulled dotfiles on branch '{branch}'",
@@ -60,3 +89,88 @@ class PullCommand(BaseCommand):
             log_error(f"Unexpected error: {e}")
             self.notify("Deytefiles Pull Failed", f"Unexpected error: {str(e)}", success=False)
             return 1
+
+    def _flush_in_background(self, repo, pending):
+        """
+        Start one background `sync --push-queued` to push what was queued while offline.
+
+        It only pushes the queued remotes and branches; uncommitted changes
+        are not committed. It waits for this pull to release the command
+        lock, and coalesces with any other flush that starts meanwhile.
+
+        Args:
+            repo (GitRepository): Pulled repository
+            pending (dict): remote -> queued push, from PushQueue.pending
+        """
+        import sys
+        log_info(f"Network is back; pushing {len(pending)} queued push(es) to "
+                 f"{', '.join(sorted(pending))} in the background")
+        script = os.path.join(repo.repo_root, '.local', 'bin', 'deytefiles')
+        subprocess.Popen(
+            [sys.executable, script, 'sync', '--push-queued'] + (['-q'] if self.quiet else []),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=repo.repo_root,
+            start_new_session=True
+        )
+
+    def _apply(self, repo, before, branch):
+        """
+        Re-bootstrap the strap files affected by the pulled commits.
+
+        Args:
+            repo (GitRepository): Pulled repository
+            before (str or None): HEAD before the pull
+            branch (str): Current branch
+
+        Returns:
+            int: Exit code of the bootstrap (0 if nothing needed applying)
+        """
+        after = repo.rev_parse('HEAD')
+        if before is None or after == before:
+            log_info("No new commits; nothing to apply")
+            self.notify(
+                "Deytefiles Pull Complete",
+                f"Already up to date on branch '{branch}'",
+                success=True
+            )
+            return 0
+
+        from dotfiles import engine
+
+        changed = repo.changed_paths(before, after)
+        strap_dirs = engine.affected_strap_dirs(repo.repo_root, changed)
+        if strap_dirs is None:
+            log_info(f"{len(changed)} file(s) changed, including strap files or the "
+                     "bootstrap engine; running a full bootstrap")
+        elif not strap_dirs:
+            log_info(f"{len(changed)} file(s) changed; no strap file affected")
+            self.notify(
+                "Deytefiles Pull Complete",
+                f"Pulled {len(changed)} changed file(s) on branch '{branch}'",
+                success=True
+            )
+            return 0
+        else:
+            names = ', '.join(os.path.relpath(d, repo.repo_root) for d, _files in strap_dirs)
+            log_info(f"{len(changed)} file(s) changed; re-applying {names}")
+
+        result = engine.run_bootstrap(repo.repo_root, strap_dirs=strap_dirs)
+        if result.exit_status == 0:
+            log_success(f"Applied pulled changes: {result.summary()}")
+            self.notify(
+                "Deytefiles Pull Complete",
+                f"Pulled and applied changes on branch '{branch}' ({result.summary()})",
+                success=True
+            )
+        else:
+            for path, message in result.failures:
+                log_error(f"{os.path.relpath(path, repo.repo_root)}: {message}")
+            log_error(f"Applying pulled changes failed: {result.summary()}")
+            self.notify(
+                "Deytefiles Pull Failed",
+                f"Pulled, but applying changes failed: {result.summary()}",
+                success=False
+            )
+        return result.exit_status
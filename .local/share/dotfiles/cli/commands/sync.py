@@ -2,25 +2,42 @@
 
 import os
 import subprocess
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 from .base import BaseCommand
 from ..logger import log_info, log_success, log_error, log_warning
-from ..git_ops import GitRepository
+from ..git_ops import GitRepository, classify_failure
+from ..offline import PushQueue, probe_remotes
+from ..squash import auto_sync_message, fold_auto_syncs, hold_until
+from ..submodules import update_stale_submodules
 
 
 class SyncCommand(BaseCommand):
     """Sync dotfiles repository with remote."""
-    
+
+    coalesce_args = ('message', 'remotes', 'force', 'squash_window', 'push_queued')
+
     def execute(self):
         """
         Execute sync command.
         
         This command:
-        1. Adds all changes
-        2. Commits with timestamp
-        3. Pulls with rebase
-        4. Pushes to remote
-        5. Sends notification about the result
+        1. Reads the repository state in one `git status` call
+        2. Adds and commits all changes with a timestamp
+        3. Holds the push while all unpushed commits are auto-sync commits
+           younger than the squash window (see cli/squash.py)
+        4. Probes the sync remotes; if the primary remote is unreachable,
+           queues the push and stops (see cli/offline.py)
+        5. Fetches all reachable remotes concurrently, and rebases onto the
+           upstream only if it has new commits
+        6. Updates submodules whose recorded commit the rebase changed
+        7. Folds consecutive unpushed auto-sync commits into one
+        8. Pushes concurrently to every reachable remote that is missing
+           the commits, queueing the unreachable ones
+        9. Sends one notification summarizing all remotes
+        
+        With --push-queued, only the pushes waiting in the push queue are
+        retried (see _push_queued); nothing is committed or rebased.
         
         Returns:
             int: Exit code (0 for success, non-zero for failure)
@@ -33,12 +50,25 @@ class SyncCommand(BaseCommand):
             os.chdir(repo.repo_root)
             log_info(f"Repository: {repo.repo_root}")
             
-            # Get current branch
-            branch = repo.get_current_branch()
-            log_info(f"Current branch: {branch}")
+            if getattr(self.args, 'push_queued', False):
+                return self._push_queued(repo, PushQueue())
+            
+            snapshot = repo.snapshot()
+            branch = snapshot.branch
+            if snapshot.upstream:
+                log_info(f"Current branch: {branch} ({snapshot.ahead} ahead, "
+                         f"{snapshot.behind} behind {snapshot.upstream})")
+            else:
+                log_info(f"Current branch: {branch}")
+            
+            remotes = getattr(self.args, 'remotes', None) or repo.sync_remotes()
+            queue = PushQueue()
             
-            # Check for changes
-            if not repo.has_changes():
+            # Nothing to commit and nothing left unpushed. With mirrors, the
+            # upstream's ahead count says nothing about the other remotes.
+            if not snapshot.has_changes and not snapshot.ahead and len(remotes) == 1:
+                queue.remove(repo.repo_root, remotes[0])
+                queue.save()
                 log_info("No changes to sync")
                 self.notify(
                     "Deytefiles Sync",
@@ -47,56 +77,79 @@ class SyncCommand(BaseCommand):
                 )
                 return 0
             
-            # Stage all changes
-            log_info("Staging changes...")
-            repo.add_all()
+            if snapshot.has_changes:
+                # Stage all changes
+                log_info(f"Staging {len(snapshot.changes)} changed file(s)...")
+                repo.add_all()
+                
+                # Create commit message with timestamp
+                commit_message = getattr(self.args, 'message', None) or auto_sync_message()
+                
+                log_info(f"Committing with message: {commit_message}")
+                repo.commit(commit_message)
+            elif snapshot.ahead:
+                log_info(f"No new changes; {snapshot.ahead} unpushed commit(s)")
             
-            # Create commit message with timestamp
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            commit_message = getattr(self.args, 'message', None) or f"auto-sync: {timestamp}"
+            due = None if snapshot.detached else hold_until(repo, self._squash_window(repo))
+            if due is not None:
+                log_info(f"Holding unpushed auto-sync commit(s) for the squash window; "
+                         f"next sync after {time.strftime('%H:%M', time.localtime(due))} pushes them")
+                return 0
             
-            log_info(f"Committing with message: {commit_message}")
-            repo.commit(commit_message)
+            offline = probe_remotes({remote: repo.remote_url(remote) for remote in remotes},
+                                    ssh_command=repo.get_config('core.sshCommand'))
+            if remotes[0] in offline:
+                # Without the primary there is nothing to rebase onto, and
+                # pushing to mirrors alone would let them diverge
+                return self._queue_offline(repo, queue, branch, remotes, offline)
+            queued = {}
+            for remote, reason in offline.items():
+                queue.add(repo.repo_root, remote, branch, reason)
+                queued[remote] = ('queued', f"unreachable: {reason}")
+            remotes = [remote for remote in remotes if remote not in offline]
             
-            # Pull with rebase if not in detached HEAD or initial commit
-            if branch != "HEAD":
-                log_info(f"Pulling changes from origin/{branch} with rebase...")
-                result = repo.pull_rebase('origin', branch)
+            with ThreadPoolExecutor(max_workers=len(remotes)) as pool:
+                # Fetch every remote at once; only the primary is waited for
+                # before rebasing, each push waits for its own remote's fetch.
+                # Mirror fetches leave FETCH_HEAD alone, since the pull
+                # fallback in _integrate_remote rebases onto it.
+                fetches = {}
+                if not snapshot.detached:
+                    log_info(f"Fetching from {', '.join(remotes)}...")
+                    fetches = {remote: pool.submit(repo.fetch, remote, remote == remotes[0])
+                               for remote in remotes}
                 
-                if result.returncode != 0:
-                    # Check if it's a rebase conflict
-                    if 'conflict' in result.stderr.lower() or 'conflict' in result.stdout.lower():
-                        log_error("Rebase conflict detected!")
-                        log_info("Aborting rebase...")
-                        repo.abort_rebase()
-                        
-                        error_msg = "Rebase conflict detected. Manual intervention required."
-                        log_error(error_msg)
-                        self.notify(
-                            "Deytefiles Sync Failed",
-                            error_msg,
-                            success=False
-                        )
+                # Pull with rebase if not in detached HEAD or initial commit
+                if not snapshot.detached:
+                    before = repo.rev_parse('HEAD')
+                    if not self._integrate_remote(repo, branch, snapshot.upstream, remotes[0],
+                                                  fetches[remotes[0]].result()):
                         return 1
-                    
-                    # If not a conflict but still failed
-                    log_warning("Pull failed, but continuing with push...")
-            
-            # Push changes
-            log_info(f"Pushing changes to origin/{branch}...")
-            force = getattr(self.args, 'force', False)
-            repo.push('origin', branch, force=force)
-            
-            log_success("Dotfiles synced successfully!")
-            
-            self.notify(
-                "Deytefiles Sync Complete",
-                f"Successfully synced dotfiles on branch '{branch}'",
-                success=True
-            )
-            
-            return 0
+                    failed_submodules = update_stale_submodules(
+                        repo, before, getattr(self.args, 'jobs', None), getattr(self.args, 'shallow', True))
+                    fold_auto_syncs(repo)
+                else:
+                    failed_submodules = []
+                
+                head = repo.rev_parse('HEAD')
+                force = getattr(self.args, 'force', False)
+                log_info(f"Pushing {branch} to {', '.join(remotes)}...")
+                pushes = {
+                    remote: pool.submit(self._push_remote, repo, remote, branch, head,
+                                        fetches.get(remote), force)
+                    for remote in remotes
+                }
+                results = {remote: future.result() for remote, future in pushes.items()}
             
+            for remote, (status, detail) in results.items():
+                if status == 'queued':
+                    queue.add(repo.repo_root, remote, branch, detail)
+                elif status != 'failed':
+                    queue.remove(repo.repo_root, remote)
+            queue.save()
+            results.update(queued)
+            return self._report(branch, results, failed_submodules)
+        
         except subprocess.CalledProcessError as e:
             error_msg = "Sync failed. Check the logs for details."
             log_error(error_msg)
@@ -118,3 +171,241 @@ class SyncCommand(BaseCommand):
             )
             return 1
 
+    def _squash_window(self, repo):
+        """
+        Return the squash window in minutes.
+
+        Set with --squash-window or the deytefiles.squashWindow git config
+        key; defaults to 0 (push at once).
+        """
+        window = getattr(self.args, 'squash_window', None)
+        if window is None:
+            value = repo.get_config('deytefiles.squashWindow')
+            try:
+                window = float(value) if value else 0
+            except ValueError:
+                log_warning(f"Ignoring invalid deytefiles.squashWindow: {value}")
+                window = 0
+        return max(0, window)
+
+    def _integrate_remote(self, repo, branch, upstream, primary, fetch_result):
+        """
+        Bring in upstream commits before pushing.
+        
+        With an upstream configured, rebases only when the freshly fetched
+        upstream has commits the branch does not. Without one, falls back
+        to `git pull --rebase <primary> <branch>`.
+        
+        Args:
+            repo (GitRepository): Repository to sync
+            branch (str): Current branch
+            upstream (str or None): Upstream of the branch
+            primary (str): Primary sync remote
+            fetch_result (subprocess.CompletedProcess): Fetch of the primary remote
+        
+        Returns:
+            bool: False if a rebase conflict stopped the sync
+        """
+        snapshot = None
+        if upstream:
+            if fetch_result.returncode == 0:
+                snapshot = repo.snapshot()
+            else:
+                log_warning(f"Fetch from {primary} failed: {fetch_result.stderr.strip()}")
+        
+        if snapshot is not None and not snapshot.behind:
+            log_info(f"Already up to date with {snapshot.upstream}; skipping rebase")
+            return True
+        
+        if snapshot is not None:
+            log_info(f"Rebasing onto {snapshot.upstream} ({snapshot.behind} new commit(s))...")
+            result = repo.rebase(snapshot.upstream)
+        else:
+            log_info(f"Pulling changes from {primary}/{branch} with rebase...")
+            result = repo.pull_rebase(primary, branch)
+        
+        if result.returncode != 0:
+            # Check if it's a rebase conflict
+            if 'conflict' in result.stderr.lower() or 'conflict' in result.stdout.lower():
+                log_error("Rebase conflict detected!")
+                log_info("Aborting rebase...")
+                repo.abort_rebase()
+                
+                error_msg = "Rebase conflict detected. Manual intervention required."
+                log_error(error_msg)
+                self.notify(
+                    "Deytefiles Sync Failed",
+                    error_msg,
+                    success=False
+                )
+                return False
+            
+            # If not a conflict but still failed
+            log_warning("Pull failed, but continuing with push...")
+        return True
+
+    def _push_remote(self, repo, remote, branch, head, fetch, force):
+        """
+        Push the branch to one remote unless it already has HEAD.
+
+        Runs on the sync thread pool; never raises.
+
+        Args:
+            repo (GitRepository): Repository to sync
+            remote (str): Remote name
+            branch (str): Branch to push
+            head (str or None): Commit id of HEAD
+            fetch (Future or None): Pending fetch of this remote
+            force (bool): Use --force-with-lease
+
+        Returns:
+            tuple: (status, detail) with status 'pushed', 'up to date',
+                'queued' (transient network failure) or 'failed'
+        """
+        try:
+            if fetch is not None and fetch.result().returncode == 0 and head is not None \
+                    and repo.rev_parse(f"refs/remotes/{remote}/{branch}") == head:
+                return 'up to date', ''
+            result = repo.push(remote, branch, force=force)
+        except Exception as e:
+            return 'failed', str(e)
+        if result.returncode != 0:
+            lines = [line.strip() for line in (result.stderr or result.stdout).splitlines() if line.strip()]
+            # Prefer git's own error line over hints and progress output
+            errors = [line for line in lines if line.startswith(('fatal:', 'error:', '! '))]
+            detail = (errors or lines or [f"git push exited with {result.returncode}"])[0]
+            reason = classify_failure(result)
+            if reason:
+                # The network went away mid-sync; retry on a later run
+                return 'queued', f"{reason}: {detail}"
+            return 'failed', detail
+        return 'pushed', ''
+
+    def _push_queued(self, repo, queue):
+        """
+        Retry the queued pushes of the repository, and nothing else.
+
+        Pushes each queued remote's branch as it is now. The working tree,
+        index and HEAD are left alone, so uncommitted changes stay
+        uncommitted. Remotes that are still unreachable stay queued.
+
+        Args:
+            repo (GitRepository): Repository to sync
+            queue (PushQueue): Pending pushes
+
+        Returns:
+            int: Exit code, as for a full sync
+        """
+        pending = queue.pending(repo.repo_root)
+        if not pending:
+            log_info("No queued pushes")
+            return 0
+
+        offline = probe_remotes({remote: repo.remote_url(remote) for remote in pending},
+                                ssh_command=repo.get_config('core.sshCommand'))
+        results = {remote: ('queued', f"unreachable: {reason}") for remote, reason in offline.items()}
+        reachable = [remote for remote in pending if remote not in offline]
+        if reachable:
+            log_info(f"Pushing queued push(es) to {', '.join(reachable)}...")
+            with ThreadPoolExecutor(max_workers=len(reachable)) as pool:
+                pushes = {
+                    remote: pool.submit(self._push_remote, repo, remote, pending[remote]['branch'],
+                                        None, None, False)
+                    for remote in reachable
+                }
+                results.update((remote, future.result()) for remote, future in pushes.items())
+
+        for remote, (status, detail) in results.items():
+            if status == 'queued':
+                queue.add(repo.repo_root, remote, pending[remote]['branch'], detail)
+            elif status != 'failed':
+                queue.remove(repo.repo_root, remote)
+        queue.save()
+        branches = sorted({entry['branch'] or 'HEAD' for entry in pending.values()})
+        return self._report(', '.join(branches), results)
+
+    def _queue_offline(self, repo, queue, branch, remotes, offline):
+        """
+        Record the push for a later run when the primary remote is unreachable.
+
+        The commit is already made locally. Only the first run that finds
+        the remote unreachable sends a notification; later runs stay quiet
+        until it is back.
+
+        Args:
+            repo (GitRepository): Repository to sync
+            queue (PushQueue): Pending pushes
+            branch (str): Branch to push later
+            remotes (list): Sync remotes, primary first
+            offline (dict): remote -> reason, from probe_remotes
+
+        Returns:
+            int: 0, the commit is safe and the push will follow
+        """
+        reason = offline[remotes[0]]
+        log_warning(f"{remotes[0]} is unreachable ({reason}); skipping fetch and push")
+        new = [remote for remote in remotes
+               if queue.add(repo.repo_root, remote, branch, offline.get(remote, reason))]
+        queue.save()
+        log_info(f"Committed locally; push to {', '.join(remotes)} queued until reachable")
+        if new:
+            self.notify(
+                "Deytefiles Sync Offline",
+                f"Changes on branch '{branch}' are committed locally and will be pushed "
+                f"once {remotes[0]} is reachable",
+                success=True
+            )
+        return 0
+
+    def _report(self, branch, results, failed_submodules=()):
+        """
+        Log one line per remote and send a single notification.
+
+        Args:
+            branch (str): Synced branch
+            results (dict): remote -> (status, detail) from _push_remote
+            failed_submodules (list): Submodules that failed to update
+
+        Returns:
+            int: 0 if every remote is up to date and every submodule
+                updated, 1 otherwise
+        """
+        for remote, (status, detail) in results.items():
+            line = f"{remote}: {status}" + (f" ({detail})" if detail else '')
+            if status == 'failed':
+                log_error(line)
+            elif status == 'queued':
+                log_warning(line)
+            else:
+                log_info(line)
+
+        failed = [remote for remote, (status, _) in results.items() if status == 'failed']
+        queued = [remote for remote, (status, _) in results.items() if status == 'queued']
+        synced = [remote for remote in results if remote not in failed and remote not in queued]
+        if not failed and not failed_submodules:
+            message = f"Successfully synced dotfiles on branch '{branch}' to {', '.join(synced)}"
+            if queued:
+                message += f"; push to {', '.join(queued)} queued until reachable"
+            log_success("Dotfiles synced successfully!")
+            self.notify(
+                "Deytefiles Sync Complete",
+                message,
+                success=True
+            )
+            return 0
+
+        parts = []
+        if failed:
+            parts.append(f"Push failed for {', '.join(failed)}")
+        if synced:
+            parts.append(f"synced to {', '.join(synced)}" if failed else f"Synced to {', '.join(synced)}")
+        if failed_submodules:
+            parts.append(f"submodule update failed for {', '.join(failed_submodules)}")
+        summary = '; '.join(parts)
+        log_error(summary)
+        self.notify(
+            "Deytefiles Sync Failed",
+            f"{summary} (branch '{branch}')",
+            success=False
+        )
+        return 1
@@ -0,0 +1,144 @@
+"""
+Single-flight coordination between deytefiles commands.
+
+sync, pull, bootstrap and maintain all touch the git index or the deployed
+files, so only one of them runs at a time. They take an exclusive flock(2)
+on one lock file in the XDG state directory; the kernel drops the lock when
+the holder exits, even if it crashes, so a lock is never left stale.
+
+While holding the lock, a command records who it is (command, arguments,
+pid, start time) in the lock file, and its exit code once it finishes. A
+second invocation of the same command with the same arguments waits for the
+running one and returns its exit code instead of redoing the work. Any other
+command queues behind it. Both wait at most a bounded time.
+"""
+
+import fcntl
+import json
+import os
+import time
+
+from .logger import log_info, log_error
+
+# Seconds to wait for a running command before giving up
+DEFAULT_LOCK_TIMEOUT = 300
+# Seconds between attempts to take the lock while waiting
+POLL_INTERVAL = 0.2
+
+
+def default_lock_path():
+    """Return the lock file location under the XDG state directory."""
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.path.join(state_home, 'deytefiles', 'command.lock')
+
+
+def _describe(holder, now):
+    """Describe the lock holder for a log message."""
+    age = max(0, int(now - holder.get('started', now)))
+    return f"deytefiles {holder.get('command', '?')} (pid {holder.get('pid', '?')}, started {age}s ago)"
+
+
+class Coordinator:
+    """Runs commands one at a time, coalescing identical concurrent runs."""
+
+    def __init__(self, path=None, timeout=None):
+        """
+        Initialize the coordinator.
+
+        Args:
+            path (str, optional): Lock file. Defaults to
+                ~/.local/state/deytefiles/command.lock
+            timeout (float, optional): Seconds to wait for a running
+                command (default: DEFAULT_LOCK_TIMEOUT; 0 fails at once)
+        """
+        self.path = path or default_lock_path()
+        self.timeout = DEFAULT_LOCK_TIMEOUT if timeout is None else timeout
+
+    def _read(self, fd):
+        """Return the record in the lock file, or None if it is empty or being written."""
+        try:
+            return json.loads(os.pread(fd, 64 * 1024, 0).decode())
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, fd, record):
+        data = json.dumps(record).encode()
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, data, 0)
+
+    def _try_lock(self, fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _wait(self, fd):
+        """Take the lock, polling until the timeout. Returns False on timeout."""
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock(fd):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+    def run(self, name, key, func):
+        """
+        Run func while holding the lock.
+
+        Args:
+            name (str): Command name, e.g. 'sync'
+            key (str): Command and arguments; runs with equal keys coalesce
+            func (callable): Runs the command and returns its exit code
+
+        Returns:
+            int: Exit code of func, of the concurrent run it coalesced with,
+                1 if the wait timed out, or 130 if interrupted while waiting
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o600)
+        try:
+            holder = None
+            if not self._try_lock(fd):
+                holder = self._read(fd) or {}
+                coalesce = holder.get('key') == key and holder.get('run_id') is not None
+                if coalesce:
+                    log_info(f"{_describe(holder, time.time())} is already running; "
+                             f"waiting up to {self.timeout:g}s to reuse its result")
+                else:
+                    log_info(f"Waiting up to {self.timeout:g}s for {_describe(holder, time.time())} to finish...")
+                try:
+                    acquired = self._wait(fd)
+                except KeyboardInterrupt:
+                    log_error(f"Interrupted while waiting for {_describe(holder, time.time())}")
+                    return 130
+                if not acquired:
+                    log_error(f"Gave up after {self.timeout:g}s: {_describe(holder, time.time())} "
+                              f"is still running (raise --lock-timeout to wait longer)")
+                    return 1
+
+                if coalesce:
+                    record = self._read(fd)
+                    if record and record.get('run_id') == holder['run_id'] and record.get('exit') is not None:
+                        log_info(f"Reusing the result of the concurrent {name} (exit code {record['exit']})")
+                        return record['exit']
+                    # The other run crashed or was interrupted; do the work ourselves
+                    log_info(f"The concurrent {name} did not finish; running {name}")
+
+            record = {
+                'run_id': os.urandom(8).hex(),
+                'command': name,
+                'key': key,
+                'pid': os.getpid(),
+                'started': time.time(),
+                'exit': None,
+            }
+            self._write(fd, record)
+            try:
+                record['exit'] = func()
+                return record['exit']
+            finally:
+                # Recorded before the lock is released, for coalesced waiters
+                self._write(fd, record)
+        finally:
+            os.close(fd)
@@ -1,8 +1,209 @@
 """Git operations wrapper for deytefiles."""
 
+import os
 import subprocess
-from pathlib import Path
-from .logger import log_error
+import sys
+import time
+from .logger import log_info, log_warning, log_error
+
+# Time budget in seconds for each network operation, all attempts included.
+# Override with git config deytefiles.<operation>Timeout, e.g.
+# `git config deytefiles.pushTimeout 120`.
+NETWORK_TIMEOUTS = {
+    'fetch': 60,
+    'pull': 90,
+    'push': 60,
+    'submodule': 120,
+}
+# Attempts per network operation (git config deytefiles.attempts)
+NETWORK_ATTEMPTS = 4
+# Exponential backoff between attempts: base * 2^n seconds, capped, with
+# full jitter so runs on several machines do not retry in lockstep
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 20.0
+# Exit code reported when an attempt is killed for exceeding its budget
+TIMEOUT_EXIT = 124
+
+# stderr patterns (case-insensitive) of failures worth retrying -> short
+# reason for the log. Compiled on first use, only when something failed.
+TRANSIENT_ERRORS = (
+    (r"could not resolve host|temporary failure in name resolution|"
+     r"name or service not known|could not resolve hostname", "DNS lookup failed"),
+    (r"connection reset|connection timed out|operation timed out|"
+     r"connection refused|network is unreachable|no route to host", "connection failed"),
+    (r"remote end hung up|early eof|unexpected disconnect|rpc failed|"
+     r"connection closed by|kex_exchange_identification|"
+     r"ssl_read|gnutls|tls connection was non-properly terminated", "remote hung up"),
+    (r"the requested url returned error: 5\d\d|http 5\d\d", "server error"),
+)
+
+
+def classify_failure(result):
+    """
+    Tell transient network failures from permanent ones.
+
+    Args:
+        result (subprocess.CompletedProcess): Failed git command
+
+    Returns:
+        str or None: Short reason if retrying may help (DNS, connection,
+            remote hung up, timeout), None for permanent failures such as
+            rejected pushes, authentication errors or conflicts
+    """
+    import re
+    if result.returncode == TIMEOUT_EXIT:
+        return "timed out"
+    output = f"{result.stderr or ''}\n{result.stdout or ''}"
+    for pattern, reason in TRANSIENT_ERRORS:
+        if re.search(pattern, output, re.IGNORECASE):
+            return reason
+    return None
+
+
+def _backoff_delay(attempt):
+    """Seconds to wait before retry number `attempt` (1-based), with full jitter."""
+    import random
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _run_with_timeout(cmd, timeout, cwd):
+    """
+    Run a command, killing it once timeout seconds have passed.
+
+    Without a terminal, the command gets its own session so that ssh and
+    remote helpers started by git are killed with it. On a terminal it
+    stays in the foreground, so credential prompts keep working.
+
+    Returns:
+        subprocess.CompletedProcess: Result; returncode TIMEOUT_EXIT on timeout
+    """
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.DEVNULL if not sys.stdin.isatty() else None,
+        text=True,
+        cwd=cwd,
+        start_new_session=not sys.stdin.isatty()
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+    except subprocess.TimeoutExpired:
+        pass
+
+    import signal
+    stdout, stderr = '', ''
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            if process.pid == os.getpgid(process.pid):
+                os.killpg(process.pid, sig)
+            else:
+                process.send_signal(sig)
+        except ProcessLookupError:
+            pass
+        try:
+            stdout, stderr = process.communicate(timeout=2)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+    else:
+        # A grandchild still holds the pipes open; stop waiting for it
+        process.stdout.close()
+        process.stderr.close()
+        process.wait()
+    stderr = f"{stderr or ''}fatal: {' '.join(cmd[:2])} timed out after {timeout:.0f}s\n"
+    return subprocess.CompletedProcess(cmd, TIMEOUT_EXIT, stdout or '', stderr)
+
+
+class RepoSnapshot:
+    """
+    Branch and working tree state from one `git status --porcelain=v2 --branch -z`.
+
+    Attributes:
+        oid (str or None): Commit of HEAD (None before the first commit)
+        branch (str): Current branch, or 'HEAD' when detached
+        upstream (str or None): Upstream branch, e.g. 'origin/main'
+        ahead (int): Commits on the branch not on its upstream
+        behind (int): Commits on the upstream not on the branch
+        changes (list): (XY status, path, original path or None) per changed
+            file; XY is '??' for untracked files
+        submodules (dict): Path -> submodule state ('S<c><m><u>': C if its
+            checked-out commit differs from the recorded one, M for tracked
+            and U for untracked changes inside it) for changed submodules
+    """
+
+    __slots__ = ('oid', 'branch', 'upstream', 'ahead', 'behind', 'changes', 'submodules')
+
+    def __init__(self):
+        self.oid = None
+        self.branch = 'HEAD'
+        self.upstream = None
+        self.ahead = 0
+        self.behind = 0
+        self.changes = []
+        self.submodules = {}
+
+    @property
+    def detached(self):
+        """True if HEAD is detached."""
+        return self.branch == 'HEAD'
+
+    @property
+    def has_changes(self):
+        """True if there are staged, unstaged or untracked changes."""
+        return bool(self.changes)
+
+    @property
+    def stale_submodules(self):
+        """Paths of submodules not checked out at the commit the superproject records."""
+        return sorted(path for path, state in self.submodules.items() if state[1] == 'C')
+
+    @classmethod
+    def parse(cls, output):
+        """
+        Parse the output of `git status --porcelain=v2 --branch -z`.
+
+        Args:
+            output (str): NUL-separated status records
+
+        Returns:
+            RepoSnapshot: The parsed snapshot
+        """
+        snapshot = cls()
+        records = iter(output.split('\0'))
+        for record in records:
+            if not record:
+                continue
+            kind = record[0]
+            if kind == '#':
+                key, _, value = record[2:].partition(' ')
+                if key == 'branch.oid':
+                    snapshot.oid = None if value == '(initial)' else value
+                elif key == 'branch.head':
+                    snapshot.branch = 'HEAD' if value == '(detached)' else value
+                elif key == 'branch.upstream':
+                    snapshot.upstream = value
+                elif key == 'branch.ab':
+                    ahead, behind = value.split()
+                    snapshot.ahead, snapshot.behind = int(ahead), abs(int(behind))
+            elif kind == '1':
+                # 1 XY sub mH mI mW hH hI path
+                fields = record.split(' ', 8)
+                snapshot.changes.append((fields[1], fields[8], None))
+                if fields[2].startswith('S'):
+                    snapshot.submodules[fields[8]] = fields[2]
+            elif kind == '2':
+                # 2 XY sub mH mI mW hH hI Xscore path, then the original path
+                fields = record.split(' ', 9)
+                snapshot.changes.append((fields[1], fields[9], next(records, None)))
+            elif kind == 'u':
+                # u XY sub m1 m2 m3 mW h1 h2 h3 path
+                fields = record.split(' ', 10)
+                snapshot.changes.append((fields[1], fields[10], None))
+            elif kind == '?':
+                snapshot.changes.append(('??', record[2:], None))
+        return snapshot
 
 
 class GitRepository:
@@ -13,19 +214,20 @@ class GitRepository:
         Initialize Git repository wrapper.
         
         Args:
-            repo_path (Path, optional): Path to repository. If None, auto-detect.
+            repo_path (str or Path, optional): Path to repository. If None, auto-detect.
         """
         if repo_path:
-            self.repo_root = Path(repo_path) if not isinstance(repo_path, Path) else repo_path
+            self.repo_root = os.fspath(repo_path)
         else:
             self.repo_root = self._get_root()
+        self._network_config = None
     
     def _get_root(self):
         """
         Get the root directory of the git repository.
         
         Returns:
-            Path: Absolute path to repository root
+            str: Absolute path to repository root
         """
         try:
             result = subprocess.run(
@@ -34,11 +236,31 @@ class GitRepository:
                 text=True,
                 check=True
             )
-            return Path(result.stdout.strip())
+            return result.stdout.strip()
         except subprocess.CalledProcessError:
             log_error("Not in a git repository")
             raise
     
+    def snapshot(self):
+        """
+        Read branch, upstream, ahead/behind counts and changed files in one call.
+
+        Ahead/behind counts compare against the last fetched state of the
+        upstream; they are 0 when the branch has no upstream.
+
+        Returns:
+            RepoSnapshot: Current repository state
+        """
+        result = subprocess.run(
+            ['git', 'status', '--porcelain=v2', '--branch', '-z'],
+            capture_output=True,
+            encoding='utf-8',
+            errors='surrogateescape',
+            check=True,
+            cwd=self.repo_root
+        )
+        return RepoSnapshot.parse(result.stdout)
+
     def get_current_branch(self):
         """
         Get the current git branch name.
@@ -90,6 +312,272 @@ class GitRepository:
         """
         subprocess.run(['git', 'commit', '-m', message], check=True, cwd=self.repo_root)
     
+    def sync_remotes(self):
+        """
+        Return the remotes `sync` fetches from and pushes to.
+
+        Configured with the multi-valued `deytefiles.remote` git config key
+        (e.g. `git config --add deytefiles.remote mirror`); the first one is
+        the primary remote. Defaults to ['origin'].
+
+        Returns:
+            list: Remote names
+        """
+        result = subprocess.run(
+            ['git', 'config', '--get-all', 'deytefiles.remote'],
+            capture_output=True,
+            text=True,
+            check=False,
+            cwd=self.repo_root
+        )
+        remotes = []
+        for remote in result.stdout.split():
+            if remote not in remotes:
+                remotes.append(remote)
+        return remotes or ['origin']
+
+    def run(self, args):
+        """
+        Run a git command in the repository with its output captured.
+
+        Args:
+            args (list): Arguments after 'git'
+
+        Returns:
+            subprocess.CompletedProcess: Result of the command
+        """
+        return subprocess.run(
+            ['git'] + list(args),
+            capture_output=True,
+            text=True,
+            check=False,
+            cwd=self.repo_root
+        )
+
+    def get_config(self, key):
+        """
+        Read a value from the repository's git config.
+
+        Returns:
+            str or None: The value, or None if the key is not set
+        """
+        result = self.run(['config', '--get', key])
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+
+    def set_config(self, key, value):
+        """
+        Set a value in the repository's local git config.
+
+        Returns:
+            bool: True if git accepted the value
+        """
+        return self.run(['config', '--local', key, value]).returncode == 0
+
+    def submodule_paths(self):
+        """
+        List the submodules that are checked out.
+
+        Returns:
+            list: Absolute paths of initialized submodules
+        """
+        result = self.run(['config', '--file', '.gitmodules', '--get-regexp', r'^submodule\..*\.path$'])
+        paths = []
+        for line in result.stdout.splitlines():
+            _key, _, path = line.partition(' ')
+            path = os.path.join(self.repo_root, path)
+            if os.path.exists(os.path.join(path, '.git')):
+                paths.append(path)
+        return paths
+
+    def network_budget(self, operation):
+        """
+        Return the time budget and attempt count for a network operation.
+
+        Args:
+            operation (str): 'fetch', 'pull', 'push' or 'submodule'
+
+        Returns:
+            tuple: (seconds, attempts)
+        """
+        if self._network_config is None:
+            result = self.run(['config', '--get-regexp', r'^deytefiles\.(.*timeout|attempts)$'])
+            config = {}
+            for line in result.stdout.splitlines():
+                key, _, value = line.partition(' ')
+                try:
+                    config[key] = float(value)
+                except ValueError:
+                    log_warning(f"Ignoring invalid git config {key}={value}")
+            self._network_config = config
+        timeout = self._network_config.get(f"deytefiles.{operation}timeout", NETWORK_TIMEOUTS[operation])
+        attempts = int(self._network_config.get('deytefiles.attempts', NETWORK_ATTEMPTS))
+        return timeout, max(1, attempts)
+
+    def _run_network(self, operation, args, label):
+        """
+        Run a network git command within its time budget, retrying transient failures.
+
+        Each attempt gets whatever is left of the budget; retries back off
+        exponentially with jitter and stop when the budget would run out.
+        Every attempt is logged with its duration.
+
+        Args:
+            operation (str): 'fetch', 'pull', 'push' or 'submodule' (selects the budget)
+            args (list): Arguments after 'git'
+            label (str): Description for the log, e.g. 'git push origin main'
+
+        Returns:
+            subprocess.CompletedProcess: Result of the last attempt
+        """
+        budget, attempts = self.network_budget(operation)
+        deadline = time.monotonic() + budget
+        attempt = 0
+        while True:
+            attempt += 1
+            start = time.monotonic()
+            result = _run_with_timeout(['git'] + list(args), max(1.0, deadline - start), self.repo_root)
+            elapsed = time.monotonic() - start
+            if result.returncode == 0:
+                log_info(f"{label}: done in {elapsed:.1f}s (attempt {attempt}/{attempts})")
+                return result
+
+            reason = classify_failure(result)
+            if reason and operation == 'pull' and self.rebase_in_progress():
+                # Killed while rebasing: undo it rather than retry on top of it
+                self.abort_rebase()
+                reason = None
+            delay = _backoff_delay(attempt) if reason else 0
+            if reason is None or attempt >= attempts or time.monotonic() + delay + 1 >= deadline:
+                log_warning(f"{label}: attempt {attempt}/{attempts} failed after {elapsed:.1f}s"
+                            + (f" ({reason}); giving up" if reason else ""))
+                return result
+            log_warning(f"{label}: attempt {attempt}/{attempts} failed after {elapsed:.1f}s "
+                        f"({reason}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def rebase_in_progress(self):
+        """Return True if a rebase is stopped in the working tree."""
+        result = self.run(['rev-parse', '--git-path', 'rebase-merge', '--git-path', 'rebase-apply'])
+        return any(os.path.exists(os.path.join(self.repo_root, path))
+                   for path in result.stdout.splitlines())
+
+    def remote_url(self, remote):
+        """
+        Return the URL git connects to for a remote (after insteadOf rewrites).
+
+        Returns:
+            str or None: URL, or None if the remote does not exist
+        """
+        result = self.run(['remote', 'get-url', remote])
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip() or None
+
+    def update_submodule(self, path, shallow=True):
+        """
+        Check out a submodule at the commit the superproject records.
+
+        Fetches only if that commit is missing, within the 'submodule'
+        network budget. A submodule with full history is never made
+        shallow.
+
+        Args:
+            path (str): Submodule path relative to the repository root
+            shallow (bool): Fetch only the needed commit (--depth 1) into
+                shallow submodules
+
+        Returns:
+            subprocess.CompletedProcess: Result of `git submodule update`
+        """
+        args = ['submodule', 'update']
+        if shallow and subprocess.run(
+                ['git', 'rev-parse', '--is-shallow-repository'],
+                capture_output=True, text=True, check=False,
+                cwd=os.path.join(self.repo_root, path)).stdout.strip() != 'false':
+            args += ['--depth', '1']
+        args += ['--', path]
+        return self._run_network('submodule', args, f"git submodule update {path}")
+
+    def rev_parse(self, ref):
+        """
+        Resolve a ref to a commit id.
+
+        Returns:
+            str or None: Commit id, or None if the ref does not exist
+        """
+        result = subprocess.run(
+            ['git', 'rev-parse', '--verify', '--quiet', f"{ref}^{{commit}}"],
+            capture_output=True,
+            text=True,
+            check=False,
+            cwd=self.repo_root
+        )
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip() or None
+
+    def changed_paths(self, old, new='HEAD'):
+        """
+        List the files that differ between two commits.
+
+        Args:
+            old (str): Older commit
+            new (str): Newer commit (default: HEAD)
+
+        Returns:
+            list: Paths relative to the repository root
+        """
+        result = subprocess.run(
+            ['git', 'diff', '--name-only', '-z', old, new],
+            capture_output=True,
+            encoding='utf-8',
+            errors='surrogateescape',
+            check=True,
+            cwd=self.repo_root
+        )
+        return [path for path in result.stdout.split('\0') if path]
+
+    def fetch(self, remote=None, write_fetch_head=True):
+        """
+        Fetch from a remote.
+
+        Args:
+            remote (str, optional): Remote name (default: the current
+                branch's remote)
+            write_fetch_head (bool): Update .git/FETCH_HEAD. Fetches that
+                run alongside a `git pull` must not, or the pull may rebase
+                onto what they fetched.
+
+        Returns:
+            subprocess.CompletedProcess: Result of the fetch
+        """
+        # Submodules are fetched by update_submodule(), only where needed
+        args = ['fetch', '--no-recurse-submodules']
+        if not write_fetch_head:
+            args.append('--no-write-fetch-head')
+        args += [remote] if remote else []
+        return self._run_network('fetch', args, 'git ' + ' '.join(args))
+
+    def rebase(self, onto):
+        """
+        Rebase the current branch onto another ref.
+
+        Args:
+            onto (str): Ref to rebase onto, e.g. the upstream branch
+
+        Returns:
+            subprocess.CompletedProcess: Result of the rebase
+        """
+        return subprocess.run(
+            ['git', 'rebase', onto],
+            capture_output=True,
+            text=True,
+            check=False,
+            cwd=self.repo_root
+        )
+
     def pull_rebase(self, remote='origin', branch=None):
         """
         Pull changes with rebase.
@@ -104,13 +592,8 @@ class GitRepository:
         if branch is None:
             branch = self.get_current_branch()
         
-        return subprocess.run(
-            ['git', 'pull', '--rebase', remote, branch],
-            capture_output=True,
-            text=True,
-            check=False,
-            cwd=self.repo_root
-        )
+        args = ['pull', '--rebase', '--no-recurse-submodules', remote, branch]
+        return self._run_network('pull', args, 'git ' + ' '.join(args))
     
     def push(self, remote='origin', branch=None, force=False):
         """
@@ -118,18 +601,22 @@ class GitRepository:
         
         Args:
             remote (str): Remote name (default: 'origin')
-            branch (str): Branch name (default: 'origin')
+            branch (str): Branch name (default: current branch)
             force (bool): Use --force-with-lease if True
+
+        Returns:
+            subprocess.CompletedProcess: Result of the push (output captured,
+                so concurrent pushes do not interleave)
         """
         if branch is None:
             branch = self.get_current_branch()
         
-        cmd = ['git', 'push']
+        args = ['push']
         if force:
-            cmd.append('--force-with-lease')
-        cmd.extend([remote, branch])
+            args.append('--force-with-lease')
+        args.extend([remote, branch])
         
-        subprocess.run(cmd, check=True, cwd=self.repo_root)
+        return self._run_network('push', args, 'git ' + ' '.join(args))
     
     def abort_rebase(self):
         """Abort an ongoing rebase."""
@@ -13,22 +13,25 @@ class Colors:
     BOLD = '\033[1m'
 
 
+# Each line is written in one call, so lines logged from worker threads
+# (concurrent fetches, pushes and submodule updates) do not interleave
+
 def log_info(message):
     """Log an informational message."""
-    print(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}")
+    sys.stdout.write(f"{Colors.BLUE}[INFO]{Colors.RESET} {message}\n")
 
 
 def log_success(message):
     """Log a success message."""
-    print(f"{Colors.GREEN}[SUCCESS]{Colors.RESET} {message}")
+    sys.stdout.write(f"{Colors.GREEN}[SUCCESS]{Colors.RESET} {message}\n")
 
 
 def log_warning(message):
     """Log a warning message."""
-    print(f"{Colors.YELLOW}[WARNING]{Colors.RESET} {message}")
+    sys.stdout.write(f"{Colors.YELLOW}[WARNING]{Colors.RESET} {message}\n")
 
 
 def log_error(message):
     """Log an error message."""
-    print(f"{Colors.RED}[ERROR]{Colors.RESET} {message}", file=sys.stderr)
+    sys.stderr.write(f"{Colors.RED}[ERROR]{Colors.RESET} {message}\n")
 
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Check of the network time budgets and retries in git_ops.
+
+Runs real `git fetch` and `git push` through GitRepository against a local
+bare repository behind a stand-in ssh transport (GIT_SSH_COMMAND). The
+stand-in misbehaves on purpose:
+
+- stall: never answers and leaves a grandchild running; the budget must
+  kill the whole process group, well within the budget plus grace time
+- flaky: refuses the first connections, then serves the repository; the
+  fetch must be retried with backoff, each attempt logged
+- auth: fails like a rejected ssh key; must fail on the first attempt
+- rejected push: a non-fast-forward push; must fail on the first attempt
+
+Backoff delays are shortened so the check runs in a few seconds.
+
+Usage:
+    python3 network_check.py [--keep]
+
+Exits with status 1 if a check fails.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cli import git_ops
+
+# Budget for the stalled fetch, and how long past it the kill may take
+STALL_BUDGET = 2
+KILL_GRACE = 5
+
+# ssh stand-ins; git runs them as `<command> <host> <remote command>`
+_STUBS = {
+    'stall': '''#!/bin/sh
+echo $$ >> "$CHECK_DIR/pids"
+sleep 300 &
+echo $! >> "$CHECK_DIR/pids"
+wait
+''',
+    'flaky': '''#!/bin/sh
+count=$(($(cat "$CHECK_DIR/count" 2>/dev/null || echo 0) + 1))
+echo $count > "$CHECK_DIR/count"
+if [ $count -lt 3 ]; then
+    echo "ssh: connect to host $1 port 22: Connection refused" >&2
+    exit 255
+fi
+shift
+exec sh -c "$*"
+''',
+    'auth': '''#!/bin/sh
+count=$(($(cat "$CHECK_DIR/count" 2>/dev/null || echo 0) + 1))
+echo $count > "$CHECK_DIR/count"
+echo "git@$1: Permission denied (publickey)." >&2
+exit 255
+''',
+    'serve': '''#!/bin/sh
+count=$(($(cat "$CHECK_DIR/count" 2>/dev/null || echo 0) + 1))
+echo $count > "$CHECK_DIR/count"
+shift
+exec sh -c "$*"
+''',
+}
+
+
+def _git(cwd, *args):
+    subprocess.run(['git'] + list(args), cwd=cwd, check=True, capture_output=True)
+
+
+def _alive(pid):
+    """Return True if a process exists and is not a zombie."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        if os.path.isdir('/proc/self'):
+            return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class NetworkCheck:
+    """Sandbox with a bare remote, a clone and the ssh stand-ins."""
+
+    def __init__(self, root):
+        self.root = root
+        self.remote = os.path.join(root, 'remote.git')
+        self.work = os.path.join(root, 'work')
+        _git(root, 'init', '-q', '--bare', '-b', 'main', self.remote)
+        _git(root, 'init', '-q', '-b', 'main', self.work)
+        for key, value in (('user.name', 'Check'), ('user.email', 'check@example.invalid'),
+                           ('ssh.variant', 'simple')):
+            _git(self.work, 'config', key, value)
+        _git(self.work, 'commit', '-q', '--allow-empty', '-m', 'initial')
+        _git(self.work, 'remote', 'add', 'origin', f"ssh://example.invalid{self.remote}")
+        for name, script in _STUBS.items():
+            path = os.path.join(root, f"ssh-{name}")
+            with open(path, 'w') as f:
+                f.write(script)
+            os.chmod(path, 0o755)
+        self.failures = []
+
+    def _reset(self, stub, **config):
+        """Select a stand-in, reset its counters and set budget config."""
+        for name in ('count', 'pids'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.root, name))
+        os.environ['GIT_SSH_COMMAND'] = os.path.join(self.root, f"ssh-{stub}")
+        subprocess.run(['git', 'config', '--remove-section', 'deytefiles'],
+                       cwd=self.work, capture_output=True, check=False)
+        for key, value in config.items():
+            _git(self.work, 'config', f"deytefiles.{key}", str(value))
+
+    def _count(self):
+        try:
+            with open(os.path.join(self.root, 'count')) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+
+    def _run(self, operation, *args):
+        """Run a GitRepository method; returns (result, seconds, log)."""
+        repo = git_ops.GitRepository(self.work)
+        log = io.StringIO()
+        start = time.monotonic()
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            result = getattr(repo, operation)(*args)
+        return result, time.monotonic() - start, log.getvalue()
+
+    def expect(self, name, condition, detail):
+        print(f"{'ok' if condition else 'FAIL':<6}{name}: {detail}")
+        if not condition:
+            self.failures.append(name)
+
+    def check_stall(self):
+        self._reset('stall', fetchTimeout=STALL_BUDGET, attempts=1)
+        result, elapsed, _log = self._run('fetch', 'origin')
+        self.expect('stall times out', result.returncode == git_ops.TIMEOUT_EXIT,
+                    f"exit {result.returncode} after {elapsed:.1f}s (budget {STALL_BUDGET}s)")
+        self.expect('stall within budget', elapsed < STALL_BUDGET + KILL_GRACE,
+                    f"{elapsed:.1f}s < {STALL_BUDGET + KILL_GRACE}s")
+        time.sleep(0.2)
+        try:
+            with open(os.path.join(self.root, 'pids')) as f:
+                pids = [int(line) for line in f if line.strip()]
+        except OSError:
+            pids = []
+        survivors = [pid for pid in pids if _alive(pid)]
+        for pid in survivors:
+            with contextlib.suppress(OSError):
+                os.kill(pid, 9)
+        self.expect('stall kills the process group', pids and not survivors,
+                    f"{len(pids)} stand-in process(es) started, still running: {survivors or 'none'}")
+
+    def check_flaky(self):
+        self._reset('flaky', fetchTimeout=30)
+        result, _elapsed, log = self._run('fetch', 'origin')
+        retries = [float(delay) for delay in re.findall(r"retrying in ([\d.]+)s", log)]
+        self.expect('flaky fetch succeeds', result.returncode == 0,
+                    f"exit {result.returncode} after {self._count()} connection(s)")
+        self.expect('flaky fetch retried', self._count() == 3 and len(retries) == 2,
+                    f"{len(retries)} retries logged")
+        bounds = [git_ops.BACKOFF_BASE * 2 ** attempt for attempt in (1, 2)]
+        self.expect('retries back off', all(0 <= d <= b + 0.05 for d, b in zip(retries, bounds)),
+                    f"delays {retries} within {bounds}")
+        attempts = re.findall(r"attempt (\d)/\d", log)
+        self.expect('each attempt logged', attempts == ['1', '2', '3'],
+                    f"attempts in log: {attempts}")
+
+    def check_auth(self):
+        self._reset('auth', fetchTimeout=30)
+        result, elapsed, log = self._run('fetch', 'origin')
+        self.expect('auth error fails at once', result.returncode != 0 and self._count() == 1
+                    and 'retrying' not in log,
+                    f"exit {result.returncode}, {self._count()} attempt(s) in {elapsed:.1f}s")
+
+    def check_rejected_push(self):
+        self._reset('serve', pushTimeout=30)
+        other = os.path.join(self.root, 'other')
+        _git(self.root, 'clone', '-q', self.remote, other)
+        _git(other, '-c', 'user.name=Other', '-c', 'user.email=o@example.invalid',
+             'commit', '-q', '--allow-empty', '-m', 'from elsewhere')
+        _git(other, 'push', '-q', 'origin', 'HEAD')
+        _git(self.work, 'commit', '-q', '--allow-empty', '-m', 'diverged')
+        result, elapsed, log = self._run('push', 'origin', 'main')
+        self.expect('rejected push fails at once', result.returncode != 0 and self._count() == 1
+                    and 'retrying' not in log,
+                    f"exit {result.returncode}, {self._count()} attempt(s) in {elapsed:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check git network budgets, retries and failure handling")
+    parser.add_argument('--keep', action='store_true', help='Keep the sandbox directory')
+    args = parser.parse_args(argv)
+
+    # Like cron: no terminal, so each git command gets its own session
+    sys.stdin = open(os.devnull)
+    git_ops.BACKOFF_BASE = 0.1
+    root = tempfile.mkdtemp(prefix='deytefiles-network-check-')
+    os.environ['CHECK_DIR'] = root
+    check = None
+    try:
+        check = NetworkCheck(root)
+        # The rejected push needs the remote populated first
+        _git(check.work, 'push', '-q', check.remote, 'main')
+        check.check_stall()
+        check.check_flaky()
+        check.check_auth()
+        check.check_rejected_push()
+    finally:
+        if args.keep:
+            print(f"Sandbox kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if check is None or check.failures:
+        print(f"{len(check.failures) if check else 'All'} check(s) failed")
+        return 1
+    print("All network checks passed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
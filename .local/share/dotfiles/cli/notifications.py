@@ -1,54 +1,233 @@
-"""Cross-platform notification system for deytefiles."""
+"""
+Cross-platform notification system for deytefiles.
 
-import subprocess
-import platform
+Notifications never block the command that sends them. They are handed to
+a background thread, which waits until no new notification has arrived for
+COALESCE_DELAY seconds and then sends the burst as one summary. Every
+notification reuses the replace-ID of the previous one, which is kept in
+$XDG_STATE_HOME/deytefiles/notification-id, so repeated sync results update
+a single bubble instead of stacking.
+
+On Linux, notifications go straight to org.freedesktop.Notifications on
+the session bus (see cli/session_bus.py), without forking a process;
+notify-send is the fallback. On exit, pending notifications get up to
+FLUSH_TIMEOUT seconds to go out.
+"""
+
+import os
+import sys
+import threading
+import time
 from .logger import log_warning
 
+APP_NAME = 'deytefiles'
+# Seconds without a new notification before a burst is sent
+COALESCE_DELAY = 0.3
+# A burst is sent after this many seconds even if notifications keep coming
+MAX_COALESCE_DELAY = 3.0
+# Seconds pending notifications may hold up exit
+FLUSH_TIMEOUT = 3.0
 
-class NotificationSystem:
-    """Cross-platform notification system."""
-    
-    @staticmethod
-    def send(title, message, success=True):
+NOTIFICATIONS_BUS_NAME = 'org.freedesktop.Notifications'
+NOTIFICATIONS_PATH = '/org/freedesktop/Notifications'
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def default_id_path():
+    """Return the replace-ID file location under the XDG state directory."""
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.path.join(state_home, 'deytefiles', 'notification-id')
+
+
+def summarize(batch):
+    """
+    Collapse a burst of notifications into one.
+
+    Args:
+        batch (list): (title, message, success) tuples, oldest first
+
+    Returns:
+        tuple: (title, message, success); the title of the latest failure
+            (or the latest notification) and one message line per notification
+    """
+    if len(batch) == 1:
+        return batch[0]
+    success = all(ok for _title, _message, ok in batch)
+    title = next((title for title, _message, ok in reversed(batch) if not ok), batch[-1][0])
+    message = "\n".join(f"{part_title}: {part}" for part_title, part, _ok in batch)
+    return f"{title} (+{len(batch) - 1} more)", message, success
+
+
+class NotificationDispatcher:
+    """Sends notifications from a background thread, one bubble at a time."""
+
+    def __init__(self, delay=COALESCE_DELAY, id_path=None):
         """
-        Send a native notification to the user.
-        
+        Initialize the dispatcher.
+
         Args:
-            title (str): Notification title
-            message (str): Notification message
-            success (bool): Whether this is a success (True) or error (False) notification
+            delay (float): Seconds without a new notification before a
+                burst is sent
+            id_path (str, optional): Replace-ID file. Defaults to
+                ~/.local/state/deytefiles/notification-id
         """
-        system = platform.system().lower()
-        
+        self.delay = delay
+        self.id_path = id_path or default_id_path()
+        self._pending = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._flushing = False
+        self._bus = None
+
+    def post(self, title, message, success=True):
+        """Queue a notification and return at once."""
+        with self._condition:
+            self._pending.append((title, message, success, time.monotonic()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name='notifications', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Send pending notifications now, waiting at most timeout seconds."""
+        with self._condition:
+            self._flushing = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._condition:
+            self._flushing = False
+
+    def _worker(self):
+        """Send bursts until no notification is pending."""
+        while True:
+            with self._condition:
+                while self._pending and not self._flushing:
+                    first, last = self._pending[0][3], self._pending[-1][3]
+                    remaining = min(last + self.delay, first + MAX_COALESCE_DELAY) - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._pending = self._pending, []
+                if not batch:
+                    self._thread = None
+                    return
+            self._deliver(*summarize([entry[:3] for entry in batch]))
+
+    def _deliver(self, title, message, success):
         try:
-            if system == 'darwin':
-                NotificationSystem._send_macos(title, message, success)
-            elif system == 'linux':
-                NotificationSystem._send_linux(title, message, success)
+            if sys.platform == 'darwin':
+                self._send_macos(title, message, success)
+            elif sys.platform.startswith('linux'):
+                self._send_linux(title, message, success)
         except FileNotFoundError:
             log_warning("Notification system not available")
         except Exception as e:
             log_warning(f"Failed to send notification: {e}")
-    
-    @staticmethod
-    def _send_macos(title, message, success):
+
+    def _load_id(self):
+        try:
+            with open(self.id_path, 'r') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_id(self, notification_id):
+        tmp_path = f"{self.id_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.id_path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                f.write(f"{notification_id}\n")
+            os.replace(tmp_path, self.id_path)
+        except OSError:
+            pass
+
+    def _send_macos(self, title, message, success):
         """Send notification on macOS using osascript."""
         sound = "Glass" if success else "Basso"
-        script = f'display notification "{message}" with title "{title}" sound name "{sound}"'
+        # Passed as arguments so quotes in the message need no escaping
+        script = ('on run argv\n'
+                  'display notification (item 2 of argv) with title (item 1 of argv) '
+                  'sound name (item 3 of argv)\n'
+                  'end run')
+        import subprocess
         subprocess.run(
-            ['osascript', '-e', script],
+            ['osascript', '-e', script, title, message, sound],
             check=False,
             capture_output=True
         )
-    
-    @staticmethod
-    def _send_linux(title, message, success):
-        """Send notification on Linux using notify-send."""
+
+    def _send_linux(self, title, message, success):
+        """Send notification on Linux over D-Bus, falling back to notify-send."""
+        replaces_id = self._load_id()
+        try:
+            notification_id = self._notify_dbus(replaces_id, title, message, success)
+        except OSError:
+            notification_id = self._notify_send(replaces_id, title, message, success)
+        if notification_id and notification_id != replaces_id:
+            self._save_id(notification_id)
+
+    def _notify_dbus(self, replaces_id, title, message, success):
+        """Call org.freedesktop.Notifications.Notify; returns the notification id."""
+        from .session_bus import SessionBus
+        if self._bus is None:
+            self._bus = SessionBus()
+        hints = {'urgency': ('y', 1 if success else 2)}
+        icon = "dialog-information" if success else "dialog-error"
+        try:
+            return self._bus.call(
+                NOTIFICATIONS_BUS_NAME, NOTIFICATIONS_PATH, NOTIFICATIONS_BUS_NAME, 'Notify',
+                'susssasa{sv}i', (APP_NAME, replaces_id, icon, title, message, [], hints, -1)
+            )[0]
+        except OSError:
+            # Reconnect on the next notification
+            self._bus.close()
+            self._bus = None
+            raise
+
+    def _notify_send(self, replaces_id, title, message, success):
+        """Run notify-send; returns the notification id if it reports one."""
         urgency = "normal" if success else "critical"
         icon = "dialog-information" if success else "dialog-error"
-        subprocess.run(
-            ['notify-send', '-u', urgency, '-i', icon, title, message],
-            check=False,
-            capture_output=True
-        )
+        import subprocess
+        command = ['notify-send', '-a', APP_NAME, '-u', urgency, '-i', icon]
+        # --print-id and --replace-id need libnotify 0.7.9 or newer
+        replace = ['-p'] + (['-r', str(replaces_id)] if replaces_id else [])
+        result = subprocess.run(command + replace + [title, message], check=False, capture_output=True, text=True)
+        if result.returncode != 0 and 'option' in result.stderr.lower():
+            subprocess.run(command + [title, message], check=False, capture_output=True)
+            return None
+        try:
+            return int(result.stdout.strip())
+        except ValueError:
+            return None
+
 
+def dispatcher():
+    """Return the process-wide dispatcher, flushed at exit."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            import atexit
+            _dispatcher = NotificationDispatcher()
+            atexit.register(_dispatcher.flush)
+        return _dispatcher
+
+
+class NotificationSystem:
+    """Cross-platform notification system."""
+
+    @staticmethod
+    def send(title, message, success=True):
+        """
+        Send a native notification to the user without waiting for it.
+
+        Args:
+            title (str): Notification title
+            message (str): Notification message
+            success (bool): Whether this is a success (True) or error (False) notification
+        """
+        dispatcher().post(title, message, success)
@@ -0,0 +1,244 @@
+"""
+Offline handling for sync: a cheap reachability probe and a push queue.
+
+Before any network git operation, sync opens a TCP connection to each
+remote's host with a short deadline. This takes milliseconds when online and
+at most PROBE_TIMEOUT seconds when not. Remotes that cannot be reached
+are skipped without fetching or pushing. Their pending pushes are recorded
+in $XDG_STATE_HOME/deytefiles/push-queue.json, and the next run that finds
+them reachable pushes everything in one go.
+
+Remotes whose transport cannot be probed directly (local paths, proxies,
+custom ssh commands, ProxyJump hosts, remote helpers) are always treated
+as reachable.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+
+# Seconds a probe may take, DNS lookup included
+PROBE_TIMEOUT = 3.0
+
+# Bump when the queue layout changes
+QUEUE_VERSION = 1
+
+_DEFAULT_PORTS = {
+    'ssh': 22,
+    'git+ssh': 22,
+    'ssh+git': 22,
+    'git': 9418,
+    'http': 80,
+    'https': 443,
+}
+
+
+def default_queue_path():
+    """Return the push queue location under the XDG state directory."""
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.path.join(state_home, 'deytefiles', 'push-queue.json')
+
+
+def _ssh_endpoint(host, port, ssh_command=None):
+    """
+    Resolve an ssh host alias through `ssh -G`.
+
+    Returns:
+        tuple or None: (hostname, port), or None if ssh goes through a
+            proxy or a custom command and cannot be probed directly
+    """
+    if ssh_command or os.environ.get('GIT_SSH_COMMAND') or os.environ.get('GIT_SSH'):
+        return None
+    import subprocess
+    try:
+        result = subprocess.run(['ssh', '-G'] + (['-p', str(port)] if port else []) + [host],
+                                capture_output=True, text=True, timeout=PROBE_TIMEOUT, check=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return host, port or 22
+    if result.returncode != 0:
+        return host, port or 22
+    options = {}
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition(' ')
+        options.setdefault(key, value)
+    if options.get('proxycommand', 'none') != 'none' or options.get('proxyjump', 'none') != 'none':
+        return None
+    try:
+        return options.get('hostname', host), int(options.get('port', port or 22))
+    except ValueError:
+        return host, port or 22
+
+
+def remote_endpoint(url, ssh_command=None):
+    """
+    Find the host and port a git remote URL connects to.
+
+    Args:
+        url (str): Remote URL, e.g. 'git@github.com:user/repo.git' or
+            'https://example.com/repo.git'
+        ssh_command (str, optional): The repository's core.sshCommand
+
+    Returns:
+        tuple or None: (host, port), or None if the remote cannot be probed
+    """
+    if '://' in url:
+        scheme, _, rest = url.partition('://')
+        scheme = scheme.lower()
+        if scheme not in _DEFAULT_PORTS:
+            return None
+        authority = rest.split('/', 1)[0].rpartition('@')[2]
+        if authority.startswith('['):
+            host, _, port = authority[1:].partition(']')
+            port = port.lstrip(':')
+        else:
+            host, _, port = authority.partition(':')
+        port = int(port) if port.isdigit() else None
+        if scheme in ('http', 'https'):
+            proxy_vars = (f'{scheme}_proxy', f'{scheme.upper()}_PROXY', 'all_proxy', 'ALL_PROXY')
+            if any(os.environ.get(var) for var in proxy_vars):
+                return None
+        if 'ssh' in scheme:
+            return _ssh_endpoint(host, port, ssh_command)
+        return host, port or _DEFAULT_PORTS[scheme]
+
+    # scp-like syntax: [user@]host:path, with no slash before the colon
+    head, colon, _path = url.partition(':')
+    if not colon or '/' in head or '::' in url or os.path.exists(url):
+        # Local path or a remote helper (transport::address)
+        return None
+    return _ssh_endpoint(head.rpartition('@')[2], None, ssh_command)
+
+
+def _connect(host, port, timeout):
+    """Try one TCP connection; return None on success, else a short reason."""
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+    except socket.gaierror:
+        return "DNS lookup failed"
+    except socket.timeout:
+        return f"no answer within {timeout:g}s"
+    except OSError as e:
+        return (e.strerror or str(e)).lower()
+    return None
+
+
+def probe_remotes(urls, ssh_command=None, timeout=PROBE_TIMEOUT):
+    """
+    Check which remotes are reachable, all at once and within timeout.
+
+    DNS lookups cannot be given a timeout, so every probe runs on its own
+    daemon thread and any probe still running at the deadline counts as
+    unreachable.
+
+    Args:
+        urls (dict): Remote name -> URL (None if the remote does not exist)
+        ssh_command (str, optional): The repository's core.sshCommand
+        timeout (float): Seconds for all probes together
+
+    Returns:
+        dict: Remote name -> reason, for the remotes that are unreachable
+    """
+    results = {}
+    threads = []
+    endpoints = {}
+    for name, url in urls.items():
+        endpoint = remote_endpoint(url, ssh_command) if url else None
+        if endpoint is None:
+            continue
+        endpoints[name] = endpoint
+
+        def probe(name=name, endpoint=endpoint):
+            results[name] = _connect(endpoint[0], endpoint[1], timeout)
+
+        thread = threading.Thread(target=probe, name=f"probe-{name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    unreachable = {}
+    for name, (host, port) in endpoints.items():
+        reason = results.get(name, f"no answer within {timeout:g}s")
+        if reason is not None:
+            unreachable[name] = f"{host}:{port}: {reason}"
+    return unreachable
+
+
+class PushQueue:
+    """Pushes waiting for their remote to become reachable."""
+
+    def __init__(self, path=None):
+        """
+        Load the queue.
+
+        Args:
+            path (str, optional): Queue file. Defaults to
+                ~/.local/state/deytefiles/push-queue.json
+        """
+        self.path = path or default_queue_path()
+        # (repository, remote) -> {'branch', 'queued', 'reason'}
+        self.entries = {}
+        self._dirty = False
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get('version') != QUEUE_VERSION:
+            return
+        for entry in data.get('entries') or []:
+            if not isinstance(entry, dict) or 'repo' not in entry or 'remote' not in entry:
+                continue
+            self.entries[(entry['repo'], entry['remote'])] = {
+                'branch': entry.get('branch'),
+                'queued': entry.get('queued'),
+                'reason': entry.get('reason'),
+            }
+
+    def pending(self, repo_root):
+        """Return {remote: entry} for the queued pushes of a repository."""
+        return {remote: entry for (repo, remote), entry in self.entries.items() if repo == repo_root}
+
+    def add(self, repo_root, remote, branch, reason):
+        """
+        Queue a push; an already queued push keeps its original time.
+
+        Returns:
+            bool: True if the push was not queued before
+        """
+        entry = self.entries.get((repo_root, remote))
+        if entry is not None:
+            if entry['branch'] != branch or entry['reason'] != reason:
+                entry.update(branch=branch, reason=reason)
+                self._dirty = True
+            return False
+        self.entries[(repo_root, remote)] = {'branch': branch, 'queued': time.time(), 'reason': reason}
+        self._dirty = True
+        return True
+
+    def remove(self, repo_root, remote):
+        """Drop a queued push, e.g. once it went through."""
+        if self.entries.pop((repo_root, remote), None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """Persist the queue if it changed."""
+        if not self._dirty:
+            return
+        data = {
+            'version': QUEUE_VERSION,
+            'entries': [
+                {'repo': repo, 'remote': remote, **entry}
+                for (repo, remote), entry in sorted(self.entries.items())
+            ],
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps(data, indent=1, sort_keys=True) + '\n')
+        os.replace(tmp_path, self.path)
+        self._dirty = False
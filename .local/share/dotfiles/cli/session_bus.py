@@ -0,0 +1,290 @@
+"""
+Minimal D-Bus session bus client.
+
+Speaks the D-Bus wire protocol over the bus's Unix socket, so no
+third-party packages (dbus-python, jeepney) and no helper processes are
+needed. Only what notifications use is implemented: EXTERNAL
+authentication and blocking method calls with basic, string, array,
+dict, struct and variant types. Variants are passed as (signature, value)
+tuples.
+"""
+
+import os
+import socket
+import struct
+
+# Seconds to wait for the bus or a reply
+DEFAULT_TIMEOUT = 2.0
+
+# Message types
+METHOD_CALL = 1
+METHOD_RETURN = 2
+ERROR = 3
+
+# Header field codes
+FIELD_PATH = 1
+FIELD_INTERFACE = 2
+FIELD_MEMBER = 3
+FIELD_ERROR_NAME = 4
+FIELD_REPLY_SERIAL = 5
+FIELD_DESTINATION = 6
+FIELD_SIGNATURE = 8
+
+_ALIGNMENT = {
+    'y': 1, 'b': 4, 'n': 2, 'q': 2, 'i': 4, 'u': 4, 'x': 8, 't': 8, 'd': 8,
+    's': 4, 'o': 4, 'g': 1, 'v': 1, 'a': 4, '(': 8, '{': 8,
+}
+_FIXED = {'y': 'B', 'b': 'I', 'n': 'h', 'q': 'H', 'i': 'i', 'u': 'I', 'x': 'q', 't': 'Q', 'd': 'd'}
+
+
+class DBusError(OSError):
+    """An error reply, or a failure to reach or talk to the bus."""
+
+
+def _type_end(signature, start):
+    """Return the index just past the complete type starting at start."""
+    code = signature[start]
+    if code == 'a':
+        return _type_end(signature, start + 1)
+    if code in '({':
+        close = ')' if code == '(' else '}'
+        index = start + 1
+        while signature[index] != close:
+            index = _type_end(signature, index)
+        return index + 1
+    return start + 1
+
+
+def split_signature(signature):
+    """Split a signature such as 'susa{sv}' into its complete types."""
+    types = []
+    index = 0
+    while index < len(signature):
+        end = _type_end(signature, index)
+        types.append(signature[index:end])
+        index = end
+    return types
+
+
+class _Writer:
+    """Marshals values in little-endian order; offsets count from the message start."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def align(self, boundary):
+        self.data.extend(b'\0' * (-len(self.data) % boundary))
+
+    def write(self, signature, value):
+        code = signature[0]
+        self.align(_ALIGNMENT[code])
+        if code in _FIXED:
+            self.data.extend(struct.pack('<' + _FIXED[code], value))
+        elif code in 'so':
+            encoded = value.encode()
+            self.data.extend(struct.pack('<I', len(encoded)) + encoded + b'\0')
+        elif code == 'g':
+            encoded = value.encode()
+            self.data.extend(bytes([len(encoded)]) + encoded + b'\0')
+        elif code == 'v':
+            inner, inner_value = value
+            self.write('g', inner)
+            self.write(inner, inner_value)
+        elif code == 'a':
+            element = signature[1:]
+            length_at = len(self.data)
+            self.data.extend(b'\0\0\0\0')
+            # The length excludes the padding before the first element
+            self.align(_ALIGNMENT[element[0]])
+            start = len(self.data)
+            for item in (value.items() if element[0] == '{' else value):
+                self.write(element, item)
+            struct.pack_into('<I', self.data, length_at, len(self.data) - start)
+        else:
+            for member, member_value in zip(split_signature(signature[1:-1]), value):
+                self.write(member, member_value)
+
+
+class _Reader:
+    """Unmarshals values from a complete message."""
+
+    def __init__(self, data, byteorder, pos=0):
+        self.data = data
+        self.byteorder = byteorder
+        self.pos = pos
+
+    def align(self, boundary):
+        self.pos += -self.pos % boundary
+
+    def read(self, signature):
+        code = signature[0]
+        if code not in _ALIGNMENT:
+            raise DBusError(f"Unsupported D-Bus type '{code}'")
+        self.align(_ALIGNMENT[code])
+        if code in _FIXED:
+            fmt = self.byteorder + _FIXED[code]
+            value = struct.unpack_from(fmt, self.data, self.pos)[0]
+            self.pos += struct.calcsize(fmt)
+            return value
+        if code in 'so':
+            length = self.read('u')
+            value = self.data[self.pos:self.pos + length].decode()
+            self.pos += length + 1
+            return value
+        if code == 'g':
+            length = self.data[self.pos]
+            value = self.data[self.pos + 1:self.pos + 1 + length].decode()
+            self.pos += length + 2
+            return value
+        if code == 'v':
+            return self.read(self.read('g'))
+        if code == 'a':
+            length = self.read('u')
+            self.align(_ALIGNMENT[signature[1]])
+            end = self.pos + length
+            items = []
+            while self.pos < end:
+                items.append(self.read(signature[1:]))
+            return dict(items) if signature[1] == '{' else items
+        return tuple(self.read(member) for member in split_signature(signature[1:-1]))
+
+
+def session_bus_path():
+    """
+    Find the session bus socket.
+
+    Returns:
+        str or None: Socket path (abstract sockets start with a NUL byte),
+            or None if there is no session bus
+    """
+    address = os.environ.get('DBUS_SESSION_BUS_ADDRESS')
+    if not address:
+        runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or f"/run/user/{os.getuid()}"
+        path = os.path.join(runtime_dir, 'bus')
+        return path if os.path.exists(path) else None
+    from urllib.parse import unquote
+    for entry in address.split(';'):
+        transport, _, params = entry.partition(':')
+        if transport != 'unix':
+            continue
+        options = dict(param.split('=', 1) for param in params.split(',') if '=' in param)
+        if 'path' in options:
+            return unquote(options['path'])
+        if 'abstract' in options:
+            return '\0' + unquote(options['abstract'])
+    return None
+
+
+class SessionBus:
+    """A connection to the user's session bus."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        """
+        Connect and authenticate.
+
+        Args:
+            timeout (float): Seconds to wait for the bus or a reply
+
+        Raises:
+            DBusError: If there is no session bus or it refused us
+            OSError: If the socket cannot be connected
+        """
+        path = session_bus_path()
+        if path is None:
+            raise DBusError("No D-Bus session bus")
+        self._serial = 0
+        self._buffer = b''
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.settimeout(timeout)
+            self.sock.connect(path)
+            self._authenticate()
+            self.unique_name = self.call('org.freedesktop.DBus', '/org/freedesktop/DBus',
+                                         'org.freedesktop.DBus', 'Hello')[0]
+        except BaseException:
+            self.sock.close()
+            raise
+
+    def close(self):
+        self.sock.close()
+
+    def _recv(self, size):
+        """Return exactly size bytes from the socket."""
+        while len(self._buffer) < size:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise DBusError("D-Bus connection closed")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _authenticate(self):
+        uid = str(os.getuid()).encode().hex().encode()
+        self.sock.sendall(b'\0AUTH EXTERNAL ' + uid + b'\r\n')
+        while b'\r\n' not in self._buffer:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise DBusError("D-Bus connection closed during authentication")
+            self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b'\r\n')
+        if not line.startswith(b'OK '):
+            raise DBusError(f"D-Bus authentication failed: {line.decode(errors='replace')}")
+        self.sock.sendall(b'BEGIN\r\n')
+
+    def call(self, destination, path, interface, member, signature='', args=()):
+        """
+        Call a method and wait for its reply.
+
+        Args:
+            destination (str): Bus name, e.g. 'org.freedesktop.Notifications'
+            path (str): Object path
+            interface (str): Interface name
+            member (str): Method name
+            signature (str): Signature of args
+            args (tuple): Arguments
+
+        Returns:
+            list: Values of the reply
+
+        Raises:
+            DBusError: On an error reply or a closed connection
+            OSError: On socket errors, including timeouts
+        """
+        self._serial += 1
+        serial = self._serial
+        body = _Writer()
+        for arg_type, arg in zip(split_signature(signature), args):
+            body.write(arg_type, arg)
+        fields = [
+            (FIELD_PATH, ('o', path)),
+            (FIELD_INTERFACE, ('s', interface)),
+            (FIELD_MEMBER, ('s', member)),
+            (FIELD_DESTINATION, ('s', destination)),
+        ]
+        if signature:
+            fields.append((FIELD_SIGNATURE, ('g', signature)))
+        header = _Writer()
+        header.write('(yyyyuu)', (ord('l'), METHOD_CALL, 0, 1, len(body.data), serial))
+        header.write('a(yv)', fields)
+        header.align(8)
+        self.sock.sendall(bytes(header.data + body.data))
+
+        while True:
+            fixed = self._recv(16)
+            byteorder = '<' if fixed[:1] == b'l' else '>'
+            message_type = fixed[1]
+            body_length, _serial, fields_length = struct.unpack(byteorder + 'III', fixed[4:16])
+            header_length = 16 + fields_length + (-fields_length % 8)
+            message = fixed + self._recv(header_length - 16 + body_length)
+            reader = _Reader(message, byteorder, 12)
+            reply_fields = dict(reader.read('a(yv)'))
+            if reply_fields.get(FIELD_REPLY_SERIAL) != serial:
+                # Signals such as NameAcquired
+                continue
+            reader.pos = header_length
+            values = [reader.read(value_type)
+                      for value_type in split_signature(reply_fields.get(FIELD_SIGNATURE, ''))]
+            if message_type == ERROR:
+                detail = values[0] if values and isinstance(values[0], str) else ''
+                raise DBusError(f"{reply_fields.get(FIELD_ERROR_NAME, 'D-Bus error')}: {detail}".rstrip(': '))
+            return values
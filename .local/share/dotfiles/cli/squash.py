@@ -0,0 +1,181 @@
+"""
+Folding of unpushed auto-sync commits.
+
+Every sync with changes commits "auto-sync: <timestamp>". Before pushing,
+each run of consecutive auto-sync commits that no remote has yet is folded
+into one commit whose message summarizes the paths the run touched.
+Commits with any other message (sync -m, manual commits) are never folded;
+they are kept with their message, author and tree, on top of the folded
+commits before them.
+
+Folding only rewrites commits that are not reachable from any remote-
+tracking branch, so history that others may have is never changed. The
+new commits are built from the existing trees with `git commit-tree`, so the
+working tree and index are not touched and the final tree is identical.
+
+With a squash window (git config deytefiles.squashWindow, in minutes),
+sync also holds back the push of auto-sync commits until the oldest of them
+is that old, so all syncs within the window end up as one commit.
+"""
+
+import os
+import re
+import subprocess
+import time
+
+from .logger import log_info, log_warning
+
+AUTO_SYNC_PREFIX = "auto-sync: "
+# Subjects written by sync, including folded ones
+AUTO_SYNC_SUBJECT = re.compile(r"auto-sync: \d{4}-\d\d-\d\d \d\d:\d\d:\d\d( \(\d+ syncs since [\d :-]+\))?")
+# Paths listed in a folded commit's message
+MAX_SUMMARY_PATHS = 50
+
+
+def is_auto_sync(subject):
+    """Return True if a commit subject was generated by sync."""
+    return AUTO_SYNC_SUBJECT.fullmatch(subject) is not None
+
+
+def auto_sync_message(timestamp=None):
+    """Return the message for a new auto-sync commit."""
+    return AUTO_SYNC_PREFIX + time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
+
+def unpushed_commits(repo):
+    """
+    List the commits on HEAD that no remote-tracking branch contains.
+
+    Returns:
+        list: (oid, parent oids, author time, subject) tuples, oldest first.
+            Author times survive rebases, unlike committer times.
+    """
+    result = repo.run(['log', '--reverse', '--format=%H%x1f%P%x1f%at%x1f%s', 'HEAD', '--not', '--remotes'])
+    if result.returncode != 0:
+        return []
+    commits = []
+    for line in result.stdout.splitlines():
+        oid, parents, author_time, subject = line.split('\x1f', 3)
+        commits.append((oid, parents.split(), int(author_time), subject))
+    return commits
+
+
+def hold_until(repo, window):
+    """
+    Decide whether the push should wait for the squash window.
+
+    Args:
+        repo (GitRepository): Repository to sync
+        window (float): Squash window in minutes (0 disables holding)
+
+    Returns:
+        float or None: Time (epoch seconds) when the held commits are due,
+            or None to push now. Pushes are never held while a commit
+            with a custom message is waiting.
+    """
+    if window <= 0:
+        return None
+    commits = unpushed_commits(repo)
+    if not commits or not all(is_auto_sync(subject) for _oid, _parents, _t, subject in commits):
+        return None
+    # Measured from the oldest held sync's author time, which rebasing the
+    # held commits onto a moving upstream does not reset
+    due = commits[0][2] + window * 60
+    return due if time.time() < due else None
+
+
+def _summary(repo, base, tip, runs):
+    """Build the message of a folded commit."""
+    first, last = runs[0][2], runs[-1][2]
+    subject = f"{auto_sync_message(last)} ({len(runs)} syncs since " \
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(first))})"
+    result = repo.run(['diff', '--name-status', '--no-renames', base, tip])
+    lines = [line.replace('\t', ' ', 1) for line in result.stdout.splitlines()]
+    body = ["Touched paths:"] + [f"  {line}" for line in lines[:MAX_SUMMARY_PATHS]]
+    if len(lines) > MAX_SUMMARY_PATHS:
+        body.append(f"  ... and {len(lines) - MAX_SUMMARY_PATHS} more")
+    return subject + "\n\n" + "\n".join(body) + "\n"
+
+
+def _commit_tree(repo, oid, parent, message=None, author_oid=None):
+    """
+    Create a commit with the tree of oid on top of parent.
+
+    Without a message, oid's message and author are kept. With a message,
+    the author of author_oid (default oid) is used, so a folded commit
+    keeps the author time of the oldest sync it contains.
+
+    Returns:
+        str or None: The new commit id
+    """
+    info = repo.run(['log', '-1', '--format=%an%x00%ae%x00%ad%x00%B', '--date=raw', author_oid or oid]).stdout
+    name, email, date, original = info.split('\0', 3)
+    env = dict(os.environ, GIT_AUTHOR_NAME=name, GIT_AUTHOR_EMAIL=email, GIT_AUTHOR_DATE=date)
+    if message is None:
+        message = original.rstrip('\n') + '\n'
+    result = subprocess.run(
+        ['git', 'commit-tree', f"{oid}^{{tree}}", '-p', parent, '-F', '-'],
+        input=message, capture_output=True, text=True, check=False,
+        cwd=repo.repo_root, env=env
+    )
+    if result.returncode != 0:
+        log_warning(f"Could not rewrite {oid[:12]}: {result.stderr.strip()}")
+        return None
+    return result.stdout.strip()
+
+
+def fold_auto_syncs(repo):
+    """
+    Fold each run of consecutive unpushed auto-sync commits into one commit.
+
+    Args:
+        repo (GitRepository): Repository to sync (HEAD on a branch)
+
+    Returns:
+        int: Number of commits removed from the history (0 if nothing was folded)
+    """
+    commits = unpushed_commits(repo)
+    if len(commits) < 2 or any(len(parents) != 1 for _oid, parents, _t, _s in commits):
+        # Nothing to fold, or merges that this linear rewrite cannot keep
+        return 0
+
+    # Split into runs: consecutive auto-sync commits, or one other commit
+    runs = []
+    for commit in commits:
+        if is_auto_sync(commit[3]) and runs and is_auto_sync(runs[-1][-1][3]):
+            runs[-1].append(commit)
+        else:
+            runs.append([commit])
+    if len(runs) == len(commits):
+        return 0
+
+    old_head = commits[-1][0]
+    parent = commits[0][1][0]
+    rewritten = False
+    for run in runs:
+        tip = run[-1][0]
+        if len(run) > 1:
+            new = _commit_tree(repo, tip, parent, _summary(repo, run[0][1][0], tip, run), author_oid=run[0][0])
+            rewritten = True
+        elif rewritten:
+            # Kept as is, on top of the folded commits before it
+            new = _commit_tree(repo, tip, parent)
+        else:
+            new = tip
+        if new is None:
+            return 0
+        parent = new
+
+    trees = repo.run(['rev-parse', f"{parent}^{{tree}}", f"{old_head}^{{tree}}"]).stdout.split()
+    if len(trees) != 2 or trees[0] != trees[1]:
+        log_warning("Folding auto-sync commits changed the tree; keeping the original commits")
+        return 0
+    result = repo.run(['update-ref', '-m', 'deytefiles: fold auto-sync commits', 'HEAD', parent, old_head])
+    if result.returncode != 0:
+        log_warning(f"Could not fold auto-sync commits: {result.stderr.strip()}")
+        return 0
+
+    folded = len(commits) - len(runs)
+    log_info(f"Folded {len(commits)} unpushed commit(s) into {len(runs)} "
+             f"({folded} auto-sync commit(s) squashed)")
+    return folded
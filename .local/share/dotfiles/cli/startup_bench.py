@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the deytefiles CLI.
+
+Starts a fresh interpreter for each run and measures the wall time of
+`deytefiles --help` and of `deytefiles --startup-profile pull` (everything
+`pull` loads before it touches git). Each case must stay within its time
+budget; the median of several runs is compared so that a single slow
+start does not fail the check.
+
+Usage:
+    python3 startup_bench.py [--runs N] [--help-budget MS] [--pull-budget MS]
+
+Exits with status 1 if a case exceeds its budget.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEYTEFILES = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                          '..', '..', '..', 'bin', 'deytefiles'))
+
+# Default budgets in milliseconds, interpreter startup included
+HELP_BUDGET_MS = 60
+PULL_BUDGET_MS = 80
+
+
+def time_command(argv, runs):
+    """
+    Run a command repeatedly in fresh processes.
+
+    Returns:
+        list: Wall times in milliseconds
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1e3)
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check deytefiles cold-start time budgets")
+    parser.add_argument('--runs', type=int, default=15, help='Runs per case (default: 15)')
+    parser.add_argument('--help-budget', type=float, default=HELP_BUDGET_MS, metavar='MS',
+                        help=f'Budget for `deytefiles --help` (default: {HELP_BUDGET_MS} ms)')
+    parser.add_argument('--pull-budget', type=float, default=PULL_BUDGET_MS, metavar='MS',
+                        help=f'Budget for starting `deytefiles pull` (default: {PULL_BUDGET_MS} ms)')
+    args = parser.parse_args(argv)
+
+    python = [sys.executable, DEYTEFILES]
+    baseline = statistics.median(time_command([sys.executable, '-c', 'pass'], args.runs))
+    cases = [
+        ('deytefiles --help', python + ['--help'], args.help_budget),
+        ('deytefiles pull (startup)', python + ['--startup-profile', 'pull'], args.pull_budget),
+    ]
+
+    print(f"{'case':<28}{'median':>10}{'min':>10}{'budget':>10}")
+    print(f"{'python -c pass':<28}{baseline:>7.1f} ms")
+    failed = False
+    for label, command, budget in cases:
+        times = time_command(command, args.runs)
+        median = statistics.median(times)
+        status = 'ok' if median <= budget else 'OVER BUDGET'
+        failed |= median > budget
+        print(f"{label:<28}{median:>7.1f} ms{min(times):>7.1f} ms{budget:>7.0f} ms  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Submodule updates after pull and sync."""
+
+from concurrent.futures import ThreadPoolExecutor
+from .logger import log_info, log_error, log_warning
+
+# Default cap on concurrent submodule updates
+MAX_SUBMODULE_JOBS = 8
+
+
+def _recorded_commits(repo, commit, paths):
+    """Return {path: commit id} of the submodules recorded in a commit."""
+    result = repo.run(['ls-tree', '-z', commit, '--'] + list(paths))
+    recorded = {}
+    for entry in result.stdout.split('\0'):
+        info, _, path = entry.partition('\t')
+        fields = info.split()
+        if len(fields) == 3 and fields[1] == 'commit':
+            recorded[path] = fields[2]
+    return recorded
+
+
+def update_stale_submodules(repo, before, jobs=None, shallow=True):
+    """
+    Check out submodules whose recorded commit a pull or rebase changed, concurrently.
+
+    Costs one `git status` when no submodule changed. Only submodules are
+    touched whose recorded commit differs between before and HEAD, and
+    that are still checked out at the commit recorded before. A submodule
+    the user moved to another commit without recording it is left alone,
+    as are uninitialized submodules.
+
+    Args:
+        repo (GitRepository): Superproject
+        before (str or None): HEAD before the pull or rebase
+        jobs (int, optional): Concurrent updates (default: one per changed
+            submodule, at most MAX_SUBMODULE_JOBS)
+        shallow (bool): Fetch only the needed commits (--depth 1)
+
+    Returns:
+        list: Paths of submodules that failed to update
+    """
+    if before is None or before == repo.rev_parse('HEAD'):
+        return []
+    stale = repo.snapshot().stale_submodules
+    if not stale:
+        return []
+    changed = set(repo.changed_paths(before, 'HEAD'))
+    stale = [path for path in stale if path in changed]
+    if not stale:
+        return []
+
+    recorded = _recorded_commits(repo, before, stale)
+    candidates = []
+    for path in stale:
+        checked_out = repo.run(['-C', path, 'rev-parse', 'HEAD']).stdout.strip()
+        if checked_out != recorded.get(path):
+            log_warning(f"Submodule {path}: checked out at {checked_out[:12] or 'unknown commit'}, "
+                        f"not the commit recorded before the pull; leaving it alone")
+            continue
+        candidates.append(path)
+    if not candidates:
+        return []
+
+    jobs = max(1, min(jobs or MAX_SUBMODULE_JOBS, len(candidates)))
+    log_info(f"Updating {len(candidates)} changed submodule(s) "
+             f"({jobs} at a time{', shallow' if shallow else ''}): {', '.join(candidates)}")
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = dict(zip(candidates, pool.map(lambda path: repo.update_submodule(path, shallow), candidates)))
+
+    failed = []
+    for path, result in results.items():
+        if result.returncode != 0:
+            lines = [line.strip() for line in (result.stderr or result.stdout).splitlines() if line.strip()]
+            log_error(f"Submodule {path}: {lines[-1] if lines else 'update failed'}")
+            failed.append(path)
+    return failed
@@ -0,0 +1,164 @@
+"""
+Working tree watcher for the deytefiles daemon.
+
+Uses Linux inotify through ctypes, so no third-party packages are needed.
+Every directory of the tree gets a watch (inotify is not recursive);
+directories created later are watched as they appear. The .git directory
+and bulky caches are never watched. Waiting for events blocks in select(),
+so an idle watcher costs no CPU.
+"""
+
+import ctypes
+import errno
+import os
+import select
+import struct
+
+# inotify event masks (<sys/inotify.h>)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+
+# Directories that never hold files worth syncing
+SKIP_DIRS = frozenset(('.git', '.strapcache', 'node_modules', '__pycache__'))
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _libc():
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+class TreeWatcher:
+    """Recursive inotify watch on a directory tree."""
+
+    def __init__(self, root, skip_dirs=SKIP_DIRS):
+        """
+        Start watching a tree.
+
+        Args:
+            root (str): Directory to watch
+            skip_dirs (iterable): Directory names that are not descended into
+
+        Raises:
+            OSError: If inotify is not available (e.g. not on Linux)
+        """
+        self.root = os.path.abspath(root)
+        self.skip_dirs = frozenset(skip_dirs)
+        # watch descriptor -> directory path
+        self.watches = {}
+        self.overflowed = False
+        try:
+            self._lib = _libc()
+            init = self._lib.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise OSError(errno.ENOSYS, f"inotify is not available: {e}") from None
+        self.fd = init(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        self._add_tree(self.root)
+
+    def close(self):
+        """Stop watching and release the inotify descriptor."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+            self.watches.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _add_watch(self, path):
+        wd = self._lib.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached "
+                                   "(raise fs.inotify.max_user_watches)")
+            # The directory vanished or is unreadable; nothing to watch
+            return
+        self.watches[wd] = path
+
+    def _add_tree(self, top):
+        """Watch top and every directory below it, skipping SKIP_DIRS."""
+        for dirpath, dirnames, _filenames in os.walk(top):
+            dirnames[:] = [d for d in dirnames if d not in self.skip_dirs
+                           and not os.path.islink(os.path.join(dirpath, d))]
+            self._add_watch(dirpath)
+
+    def wait(self, timeout=None):
+        """
+        Wait for changes in the tree.
+
+        Args:
+            timeout (float, optional): Seconds to wait; None waits forever
+
+        Returns:
+            set: Paths (relative to the root) that changed; empty on timeout.
+                After an event queue overflow, `overflowed` is set and the
+                root '.' is reported.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        return self.read()
+
+    def read(self):
+        """Read and return all pending changes without blocking (see wait())."""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                self._handle(wd, mask, name, changed)
+
+    def _handle(self, wd, mask, name, changed):
+        if mask & IN_Q_OVERFLOW:
+            self.overflowed = True
+            changed.add('.')
+            return
+        if mask & IN_IGNORED:
+            self.watches.pop(wd, None)
+            return
+        directory = self.watches.get(wd)
+        if directory is None:
+            return
+        path = os.path.join(directory, name) if name else directory
+        if mask & IN_ISDIR and name in self.skip_dirs:
+            return
+        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+            # Watch new subtrees; files created before the watch was added
+            # are still picked up by git status
+            self._add_tree(path)
+        changed.add(os.path.relpath(path, self.root))
@@ -0,0 +1,143 @@
+"""
+On-disk cache of parsed strap files.
+
+Strap files almost never change between bootstrap runs, yet each run used
+to re-read and re-parse all of them. The cache stores every parsed config,
+marshalled, in <repo>/.strapcache/configs.marshal. Entries are keyed by
+the strap file's path and validated by its size and mtime; the whole cache
+is discarded when the YAML parser, the Python version or the cache layout
+changes.
+
+The cache is bounded: it keeps at most max_entries configs and evicts the
+least recently used ones first. Recency is tracked by the order of entries
+and persisted whenever the cache is next written.
+"""
+
+import marshal
+import os
+import sys
+import time
+
+from . import discovery
+from . import utils
+
+CACHE_FILENAME = "configs.marshal"
+# Bump when the cache layout changes
+CACHE_VERSION = 1
+DEFAULT_MAX_ENTRIES = 256
+# Files modified this recently may change again within the same mtime tick;
+# parse them but do not cache them
+_MTIME_SETTLE_SECONDS = 2
+
+
+def default_cache_path(root):
+    """Return the config cache location for a repository root."""
+    return os.path.join(root, discovery.CACHE_DIR_REL, CACHE_FILENAME)
+
+
+def _cache_header():
+    return (CACHE_VERSION, utils.yaml_parser_id(), tuple(sys.version_info[:2]), marshal.version)
+
+
+class ConfigCache:
+    """Size/mtime-validated LRU cache of parsed strap configs."""
+
+    def __init__(self, root, cache_path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the cache.
+
+        Args:
+            root (str): Repository root
+            cache_path (str, optional): Cache file. Defaults to
+                <root>/.strapcache/configs.marshal
+            max_entries (int): Maximum number of cached configs
+        """
+        self.root = os.path.abspath(root)
+        self.cache_path = cache_path or default_cache_path(self.root)
+        self.max_entries = max_entries
+        # path -> (size, mtime_ns, config), least recently used first
+        self.entries = {}
+        self.stats = {'hits': 0, 'parsed': 0, 'evicted': 0}
+        self._dirty = False
+
+    def load(self):
+        """Load the cache, discarding it if unreadable or written by another parser."""
+        try:
+            with open(self.cache_path, 'rb') as f:
+                header, entries = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            self.entries = {}
+            return
+
+        if header != _cache_header() or not isinstance(entries, dict):
+            self.entries = {}
+            self._dirty = True
+            return
+
+        self.entries = entries
+
+    def save(self):
+        """Persist the cache if any entry was added or evicted."""
+        if not self._dirty:
+            return
+
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                marshal.dump((_cache_header(), self.entries), f)
+            os.replace(tmp_path, self.cache_path)
+            self._dirty = False
+        except (OSError, ValueError):
+            # The cache is only an optimization; never fail bootstrap over it
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _put(self, path, st, config):
+        """Store a parsed config, evicting the least recently used entries."""
+        if time.time_ns() - st.st_mtime_ns < _MTIME_SETTLE_SECONDS * 1_000_000_000:
+            return
+        try:
+            # Only plain data can be marshalled (PyYAML may return dates)
+            marshal.dumps(config)
+        except ValueError:
+            return
+
+        self.entries.pop(path, None)
+        self.entries[path] = (st.st_size, st.st_mtime_ns, config)
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+            self.stats['evicted'] += 1
+        self._dirty = True
+
+    def load_config(self, path):
+        """
+        Return the parsed YAML config of a strap file, parsing it only if
+        it changed since it was cached.
+
+        Args:
+            path (str): Absolute path of the strap file
+
+        Returns:
+            The parsed document (None for an empty file)
+
+        Raises:
+            OSError: If the file cannot be read
+            utils.yaml.YAMLError: If the file cannot be parsed
+        """
+        st = os.stat(path)
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            # Mark as most recently used
+            del self.entries[path]
+            self.entries[path] = entry
+            self.stats['hits'] += 1
+            return entry[2]
+
+        with open(path, 'r') as f:
+            config = utils.load_yaml(f)
+        self.stats['parsed'] += 1
+        self._put(path, st, config)
+        return config
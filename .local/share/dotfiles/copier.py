@@ -0,0 +1,404 @@
+"""
+Content-aware incremental copy engine for strap `copy:` entries.
+
+sync_path() makes a target file or directory tree identical to its source
+while writing as little as possible:
+
+- files whose size and mtime already match are left alone (copies preserve
+  mtime, so this is the common case); files with equal size but different
+  mtime are compared by content hash, hashed in parallel for larger trees;
+- only files that differ are rewritten, in place, so unchanged inodes are
+  kept. Data is cloned with a reflink where the filesystem supports it,
+  otherwise transferred in-kernel with os.copy_file_range()/os.sendfile(),
+  falling back to a plain buffered copy;
+- metadata is preserved the same way shutil.copy2() does (shutil.copystat);
+- target entries that do not exist in the source are removed, matching the
+  previous remove-and-copytree behaviour.
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+_HASH_CHUNK = 1024 * 1024
+_COPY_CHUNK = 8 * 1024 * 1024
+
+# Linux FICLONE ioctl: clone a whole file (reflink) on btrfs, xfs, bcachefs...
+_FICLONE = 0x40049409
+
+# Hash in parallel once a tree has at least this many files to compare
+PARALLEL_HASH_THRESHOLD = 4
+# Worker threads used for hashing (hashlib releases the GIL on large buffers)
+HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def hash_file(path):
+    """Return the sha256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CopyStats:
+    """What a sync_path() call actually did."""
+
+    def __init__(self):
+        self.files_copied = 0
+        self.files_unchanged = 0
+        self.bytes_written = 0
+        self.reflinked = 0
+        self.removed = 0
+        self.metadata_updated = 0
+
+    @property
+    def changed(self):
+        """True if anything on disk was modified."""
+        return bool(self.files_copied or self.removed or self.metadata_updated)
+
+    def describe(self):
+        """Return a short human-readable summary."""
+        text = (f"{self.files_copied} copied, {self.files_unchanged} unchanged, "
+                f"{_format_bytes(self.bytes_written)} written")
+        if self.reflinked:
+            text += f", {self.reflinked} reflinked"
+        if self.removed:
+            text += f", {self.removed} removed"
+        return text
+
+
+def _format_bytes(size):
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _try_reflink(src_fd, dst_fd):
+    """Clone src into dst with FICLONE. Returns True on success."""
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        import fcntl
+        fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def _copy_data(source, target, size, stats):
+    """
+    Copy file contents from source into target in place.
+
+    The target is truncated and rewritten rather than replaced, keeping its
+    inode.
+    """
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        src_fd = src.fileno()
+        dst_fd = dst.fileno()
+
+        if size and _try_reflink(src_fd, dst_fd):
+            stats.reflinked += 1
+            return
+
+        written = 0
+        copy_file_range = getattr(os, 'copy_file_range', None)
+        sendfile = getattr(os, 'sendfile', None)
+        try:
+            if copy_file_range is not None:
+                while written < size:
+                    n = copy_file_range(src_fd, dst_fd, min(_COPY_CHUNK, size - written))
+                    if n == 0:
+                        break
+                    written += n
+            elif sendfile is not None and sys.platform.startswith('linux'):
+                while written < size:
+                    n = sendfile(dst_fd, src_fd, written, min(_COPY_CHUNK, size - written))
+                    if n == 0:
+                        break
+                    written += n
+            else:
+                raise OSError(errno.ENOTSUP, "no in-kernel copy available")
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.ENOTSUP, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+            # Cross-device or unsupported: fall back to a userspace copy
+            src.seek(written)
+            dst.seek(written)
+            shutil.copyfileobj(src, dst, _COPY_CHUNK)
+            written = size
+
+        stats.bytes_written += written
+
+
+def _remove(path):
+    """Remove a file, symlink or directory tree."""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def _metadata_differs(src_st, dst_st):
+    return (stat.S_IMODE(src_st.st_mode) != stat.S_IMODE(dst_st.st_mode)
+            or src_st.st_mtime_ns != dst_st.st_mtime_ns)
+
+
+def _sync_symlink(source, target, stats):
+    link_target = os.readlink(source)
+    if os.path.islink(target) and os.readlink(target) == link_target:
+        stats.files_unchanged += 1
+        return
+    if os.path.lexists(target):
+        _remove(target)
+    os.symlink(link_target, target)
+    stats.files_copied += 1
+
+
+def _plan_file(source, target):
+    """
+    Decide what to do with one regular file.
+
+    Returns:
+        tuple: (decision, source stat, target stat) where decision is
+            'copy', 'same' or 'hash'
+    """
+    src_st = os.stat(source)
+    try:
+        dst_st = os.lstat(target)
+    except FileNotFoundError:
+        return 'copy', src_st, None
+
+    if not stat.S_ISREG(dst_st.st_mode) or dst_st.st_size != src_st.st_size:
+        return 'copy', src_st, dst_st
+    if dst_st.st_mtime_ns == src_st.st_mtime_ns:
+        return 'same', src_st, dst_st
+    return 'hash', src_st, dst_st
+
+
+def _finish_file(source, target, decision, src_st, dst_st, stats):
+    """Apply a decision made by _plan_file (after hashing, if needed)."""
+    if decision == 'copy':
+        if dst_st is not None and not stat.S_ISREG(dst_st.st_mode):
+            _remove(target)
+        try:
+            _copy_data(source, target, src_st.st_size, stats)
+        except PermissionError:
+            # Read-only target (e.g. copied from a read-only source): replace it
+            os.remove(target)
+            _copy_data(source, target, src_st.st_size, stats)
+        shutil.copystat(source, target)
+        stats.files_copied += 1
+        return
+
+    stats.files_unchanged += 1
+    if _metadata_differs(src_st, dst_st):
+        shutil.copystat(source, target)
+        stats.metadata_updated += 1
+
+
+def _sync_files(pairs, stats):
+    """Synchronize (source, target) regular-file pairs."""
+    planned = [(src, dst) + _plan_file(src, dst) for src, dst in pairs]
+    to_hash = [(src, dst) for src, dst, decision, _s, _d in planned if decision == 'hash']
+
+    equal = {}
+    if to_hash:
+        def compare(pair):
+            return pair, hash_file(pair[0]) == hash_file(pair[1])
+
+        if len(to_hash) >= PARALLEL_HASH_THRESHOLD and HASH_WORKERS > 1:
+            with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+                equal = dict(pool.map(compare, to_hash))
+        else:
+            equal = dict(map(compare, to_hash))
+
+    for src, dst, decision, src_st, dst_st in planned:
+        if decision == 'hash':
+            decision = 'same' if equal[(src, dst)] else 'copy'
+        _finish_file(src, dst, decision, src_st, dst_st, stats)
+
+
+def _sync_tree(source, target, stats):
+    """Make directory tree target mirror directory tree source."""
+    if os.path.lexists(target) and not (os.path.isdir(target) and not os.path.islink(target)):
+        _remove(target)
+    os.makedirs(target, exist_ok=True)
+
+    file_pairs = []
+    dirs_to_stat = []
+    for root, dirs, files in os.walk(source):
+        rel = os.path.relpath(root, source)
+        target_root = os.path.normpath(os.path.join(target, rel))
+
+        # Remove target entries that no longer exist in the source
+        expected = set(dirs) | set(files)
+        try:
+            existing = os.listdir(target_root)
+        except FileNotFoundError:
+            existing = []
+        for name in existing:
+            if name not in expected:
+                _remove(os.path.join(target_root, name))
+                stats.removed += 1
+
+        # Symlinked directories are copied as links (copytree(symlinks=True))
+        for name in list(dirs):
+            src_path = os.path.join(root, name)
+            if os.path.islink(src_path):
+                dirs.remove(name)
+                _sync_symlink(src_path, os.path.join(target_root, name), stats)
+                continue
+            dst_path = os.path.join(target_root, name)
+            if os.path.lexists(dst_path) and (os.path.islink(dst_path) or not os.path.isdir(dst_path)):
+                _remove(dst_path)
+            os.makedirs(dst_path, exist_ok=True)
+            dirs_to_stat.append((src_path, dst_path))
+
+        for name in files:
+            src_path = os.path.join(root, name)
+            dst_path = os.path.join(target_root, name)
+            if os.path.islink(src_path):
+                _sync_symlink(src_path, dst_path, stats)
+            else:
+                file_pairs.append((src_path, dst_path))
+
+    _sync_files(file_pairs, stats)
+
+    # Directory metadata last: writing files would change directory mtimes
+    for src_path, dst_path in reversed(dirs_to_stat):
+        shutil.copystat(src_path, dst_path)
+    shutil.copystat(source, target)
+
+
+def sync_path(source, target):
+    """
+    Make target an exact copy of source, writing only what differs.
+
+    Args:
+        source (str): Source file or directory
+        target (str): Target path (created if missing)
+
+    Returns:
+        CopyStats: Files copied/unchanged/removed and bytes written
+    """
+    stats = CopyStats()
+    if os.path.isdir(source) and not os.path.islink(source):
+        _sync_tree(source, target, stats)
+    elif os.path.islink(source):
+        _sync_symlink(source, target, stats)
+    else:
+        if os.path.isdir(target) and not os.path.islink(target):
+            _remove(target)
+        _sync_files([(source, target)], stats)
+    return stats
+
+
+def paths_identical(source, target):
+    """
+    Return True if target already has the same content as source.
+
+    Uses the same size/mtime quick check and content hashing as sync_path(),
+    without writing anything.
+    """
+    if not os.path.lexists(target):
+        return False
+    if os.path.islink(source) or os.path.islink(target):
+        return os.path.islink(source) and os.path.islink(target) \
+            and os.readlink(source) == os.readlink(target)
+    if os.path.isdir(source) != os.path.isdir(target):
+        return False
+    if not os.path.isdir(source):
+        decision, _src_st, _dst_st = _plan_file(source, target)
+        if decision == 'hash':
+            return hash_file(source) == hash_file(target)
+        return decision == 'same'
+
+    for root, dirs, files in os.walk(source):
+        rel = os.path.relpath(root, source)
+        target_root = os.path.normpath(os.path.join(target, rel))
+        try:
+            if set(os.listdir(target_root)) != set(dirs) | set(files):
+                return False
+        except OSError:
+            return False
+        for name in list(dirs):
+            if os.path.islink(os.path.join(root, name)):
+                dirs.remove(name)
+                files.append(name)
+        for name in files:
+            if not paths_identical(os.path.join(root, name), os.path.join(target_root, name)):
+                return False
+    return True
+
+
+def _tree_size(path):
+    """Total size in bytes of the regular files under path."""
+    if not os.path.isdir(path) or os.path.islink(path):
+        return os.lstat(path).st_size
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _line_diff(source, target, limit=256 * 1024):
+    """Return (added, removed) line counts for small text files, or None."""
+    import difflib
+    try:
+        if os.path.getsize(source) > limit or os.path.getsize(target) > limit:
+            return None
+        with open(source, 'r') as f:
+            new_lines = f.readlines()
+        with open(target, 'r') as f:
+            old_lines = f.readlines()
+    except (OSError, UnicodeDecodeError):
+        return None
+    added = removed = 0
+    for line in difflib.unified_diff(old_lines, new_lines, n=0):
+        if line.startswith('+') and not line.startswith('+++'):
+            added += 1
+        elif line.startswith('-') and not line.startswith('---'):
+            removed += 1
+    return added, removed
+
+
+def diff_summary(source, target):
+    """
+    Summarize what copying source over target would change.
+
+    Returns:
+        str: e.g. 'new, 1.2 KiB', 'changed, 63 B, +3 -1 lines' or
+            'changed, 40.0 KiB, 2 of 12 files differ'
+    """
+    size = _format_bytes(_tree_size(source))
+    if not os.path.lexists(target):
+        return f"new, {size}"
+
+    if os.path.isdir(source) and not os.path.islink(source) and os.path.isdir(target):
+        total = 0
+        differ = 0
+        for root, _dirs, files in os.walk(source):
+            rel = os.path.relpath(root, source)
+            for name in files:
+                total += 1
+                if not paths_identical(os.path.join(root, name), os.path.join(target, rel, name)):
+                    differ += 1
+        return f"changed, {size}, {differ} of {total} files differ"
+
+    lines = None
+    if os.path.isfile(source) and os.path.isfile(target):
+        lines = _line_diff(source, target)
+    if lines is not None:
+        return f"changed, {size}, +{lines[0]} -{lines[1]} lines"
+    return f"changed, {size}"
@@ -0,0 +1,323 @@
+"""
+Cron schedule compiler.
+
+Cron time expressions are compiled into one bitmask per field (minute,
+hour, day of month, month, day of week). The compiler validates exactly
+what cron accepts (values, ranges, steps, lists and month/day names, all
+within each field's bounds), computes next fire times with bit scans
+instead of minute-by-minute stepping, and builds a per-minute load
+histogram across all collected jobs.
+
+Jobs that opt in with `jitter: true` get their minute field rotated by a
+stable hash of the host, strap name and command. The rewritten schedule
+keeps its shape (every 15 minutes stays every 15 minutes) but different
+jobs, and the same job on different machines, stop firing in the same
+minute.
+"""
+
+import datetime
+import hashlib
+import os
+
+# (name, lowest value, highest value)
+FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day of month', 1, 31),
+    ('month', 1, 12),
+    ('day of week', 0, 7),
+)
+
+_MONTH_NAMES = {name: i + 1 for i, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'))}
+_DAY_NAMES = {name: i for i, name in enumerate(('sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'))}
+_FIELD_NAMES = (None, None, None, _MONTH_NAMES, _DAY_NAMES)
+
+# Next fire times are searched this many days ahead (covers Feb 29 on a Monday)
+_SEARCH_DAYS = 366 * 28
+
+
+class CronError(ValueError):
+    """Raised for an invalid cron time expression."""
+    pass
+
+
+def _next_bit(mask, start):
+    """Return the lowest set bit position >= start, or None."""
+    rest = mask >> start
+    if not rest:
+        return None
+    return start + (rest & -rest).bit_length() - 1
+
+
+def _bits(mask):
+    """Yield the set bit positions of mask in ascending order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _parse_value(text, field):
+    name, low, high = FIELDS[field]
+    names = _FIELD_NAMES[field]
+    if names is not None and text.lower() in names:
+        return names[text.lower()]
+    if not text.isdigit():
+        raise CronError(f"Invalid {name} value '{text}'")
+    value = int(text)
+    if not low <= value <= high:
+        raise CronError(f"{name.capitalize()} value {value} out of range ({low}-{high})")
+    return value
+
+
+def _parse_field(text, field):
+    """
+    Compile one field into a bitmask.
+
+    Returns:
+        int: Bit n is set if the field matches value n
+    """
+    name, low, high = FIELDS[field]
+    mask = 0
+    for item in text.split(','):
+        if not item:
+            raise CronError(f"Empty item in {name} field '{text}'")
+        base, slash, step_text = item.partition('/')
+        step = 1
+        if slash:
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise CronError(f"Invalid step '{step_text}' in {name} field '{text}'")
+            step = int(step_text)
+            if step > high - low + 1:
+                raise CronError(f"Step {step} too large for {name} field '{text}'")
+
+        if base == '*':
+            start, end = low, high
+        elif '-' in base:
+            first, _, last = base.partition('-')
+            start, end = _parse_value(first, field), _parse_value(last, field)
+            if start > end:
+                raise CronError(f"Invalid range '{base}' in {name} field (start after end)")
+        else:
+            start = _parse_value(base, field)
+            # "n/step" means n through the end of the field
+            end = high if slash else start
+
+        for value in range(start, end + 1, step):
+            mask |= 1 << value
+
+    if field == 4 and mask & (1 << 7):
+        # Both 0 and 7 are Sunday
+        mask = (mask | 1) & ~(1 << 7)
+    return mask
+
+
+class CronSchedule:
+    """A compiled five-field cron time expression."""
+
+    __slots__ = ('expression', 'minutes', 'hours', 'days', 'months', 'weekdays',
+                 'days_restricted', 'weekdays_restricted')
+
+    def __init__(self, expression):
+        """
+        Compile a cron time expression.
+
+        Args:
+            expression (str): e.g. "*/15 9-17 * * mon-fri"
+
+        Raises:
+            CronError: If the expression is invalid
+        """
+        if not isinstance(expression, str):
+            raise CronError("Time expression must be a string")
+        parts = expression.split()
+        if len(parts) != 5:
+            raise CronError(f"Cron time expression must have 5 fields, got {len(parts)}")
+
+        self.expression = ' '.join(parts)
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(part, i) for i, part in enumerate(parts))
+        # cron matches either day field when both are restricted
+        self.days_restricted = not parts[2].startswith('*')
+        self.weekdays_restricted = not parts[4].startswith('*')
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r})"
+
+    def matches_day(self, date):
+        """Return True if the schedule fires on this date (at some time)."""
+        if not self.months >> date.month & 1:
+            return False
+        day_ok = bool(self.days >> date.day & 1)
+        weekday_ok = bool(self.weekdays >> (date.isoweekday() % 7) & 1)
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_fire(self, after=None):
+        """
+        Return the first time strictly after `after` that the schedule fires.
+
+        Args:
+            after (datetime.datetime, optional): Defaults to now
+
+        Returns:
+            datetime.datetime or None: None if the schedule never fires
+                (e.g. "0 0 31 2 *")
+        """
+        if after is None:
+            after = datetime.datetime.now()
+        start = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        date = start.date()
+        hour, minute = start.hour, start.minute
+
+        for _ in range(_SEARCH_DAYS):
+            if self.matches_day(date):
+                h = _next_bit(self.hours, hour)
+                while h is not None:
+                    m = _next_bit(self.minutes, minute if h == hour else 0)
+                    if m is not None:
+                        return datetime.datetime.combine(date, datetime.time(h, m), after.tzinfo)
+                    h = _next_bit(self.hours, h + 1)
+            date += datetime.timedelta(days=1)
+            hour = minute = 0
+        return None
+
+    def on_calendar(self):
+        """
+        Translate the schedule to systemd OnCalendar= expressions.
+
+        systemd requires both day fields to match, so a schedule restricting
+        both is split into one expression per day field (cron matches either).
+
+        Returns:
+            list: One or two calendar expressions, e.g. ["Mon..Fri *-*-* 09:30:00"]
+        """
+        weekdays = _calendar_list(_bits(self.weekdays), _WEEKDAY_ABBR)
+        hours = _calendar_list(_bits(self.hours), width=2) if self.hours != _FULL_HOURS else '*'
+        minutes = _calendar_list(_bits(self.minutes), width=2) if self.minutes != _FULL_MINUTES else '*'
+        time_part = f"{hours}:{minutes}:00"
+        months = _calendar_list(_bits(self.months), width=2) if self.months != _FULL_MONTHS else '*'
+        days = _calendar_list(_bits(self.days), width=2) if self.days != _FULL_DAYS else '*'
+        weekday_prefix = f"{weekdays} " if self.weekdays != _FULL_WEEKDAYS else ''
+
+        if self.days_restricted and self.weekdays_restricted:
+            return [f"*-{months}-{days} {time_part}", f"{weekday_prefix}*-{months}-* {time_part}"]
+        return [f"{weekday_prefix}*-{months}-{days} {time_part}"]
+
+    def minutes_of_day(self):
+        """Yield the minutes of the day (0-1439) at which the schedule can fire."""
+        minutes = list(_bits(self.minutes))
+        for h in _bits(self.hours):
+            for m in minutes:
+                yield h * 60 + m
+
+    def rotate_minutes(self, offset):
+        """
+        Return the expression with its minute set rotated by offset minutes.
+
+        The other fields are kept verbatim.
+        """
+        minutes = sorted((m + offset) % 60 for m in _bits(self.minutes))
+        return ' '.join([_format_minutes(minutes)] + self.expression.split()[1:])
+
+
+_WEEKDAY_ABBR = ('Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat')
+_FULL_MINUTES = (1 << 60) - 1
+_FULL_HOURS = (1 << 24) - 1
+_FULL_DAYS = sum(1 << d for d in range(1, 32))
+_FULL_MONTHS = sum(1 << m for m in range(1, 13))
+_FULL_WEEKDAYS = sum(1 << d for d in range(7))
+
+
+def _calendar_list(values, names=None, width=0):
+    """Render values as a systemd calendar list, joining runs into 'a..b' ranges."""
+    values = list(values)
+    render = (lambda v: names[v]) if names else (lambda v: f"{v:0{width}d}")
+    items = []
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and values[j + 1] == values[j] + 1:
+            j += 1
+        if j - i >= 2:
+            items.append(f"{render(values[i])}..{render(values[j])}")
+        else:
+            items.extend(render(v) for v in values[i:j + 1])
+        i = j + 1
+    return ','.join(items)
+
+
+def _format_minutes(minutes):
+    """Render a sorted minute list compactly: '7', '7-59/15' or '7,23'."""
+    if len(minutes) == 60:
+        return '*'
+    if len(minutes) > 2:
+        step = minutes[1] - minutes[0]
+        if all(b - a == step for a, b in zip(minutes, minutes[1:])) \
+                and minutes[0] < step and minutes[-1] + step > 59:
+            return f"{minutes[0]}-59/{step}"
+    return ','.join(str(m) for m in minutes)
+
+
+def split_entry(entry):
+    """
+    Split a crontab line into its time expression and command.
+
+    Returns:
+        tuple: (time expression, command)
+    """
+    parts = entry.split(None, 5)
+    return ' '.join(parts[:5]), parts[5] if len(parts) > 5 else ''
+
+
+def jitter_offset(name, command, host=None):
+    """
+    Stable minute offset (0-59) for a job.
+
+    The offset depends on the host, the strap name and the command, so it
+    is the same on every run but differs between jobs and machines.
+    """
+    host = host if host is not None else os.uname().nodename
+    digest = hashlib.sha256(f"{host}\0{name}\0{command}".encode()).digest()
+    return int.from_bytes(digest[:4], 'big') % 60
+
+
+def apply_jitter(time_expr, name, command, host=None):
+    """
+    Rewrite a time expression's minute field for a jittered job.
+
+    Raises:
+        CronError: If time_expr is invalid
+    """
+    return CronSchedule(time_expr).rotate_minutes(jitter_offset(name, command, host))
+
+
+def minute_histogram(schedules):
+    """
+    Count, for every minute of the day, how many schedules can fire in it.
+
+    Day, month and weekday fields are ignored: the histogram shows which
+    jobs may coincide, not how often they do.
+
+    Returns:
+        list: 1440 counts, index = hour * 60 + minute
+    """
+    histogram = [0] * 1440
+    for schedule in schedules:
+        for minute in schedule.minutes_of_day():
+            histogram[minute] += 1
+    return histogram
+
+
+def busiest_minutes(histogram, threshold=2, limit=5):
+    """
+    Return the minutes where at least `threshold` jobs can fire together.
+
+    Returns:
+        list: (count, 'HH:MM') pairs, busiest first, at most `limit`
+    """
+    busy = [(count, minute) for minute, count in enumerate(histogram) if count >= threshold]
+    busy.sort(key=lambda item: (-item[0], item[1]))
+    return [(count, f"{minute // 60:02d}:{minute % 60:02d}") for count, minute in busy[:limit]]
@@ -0,0 +1,514 @@
+"""
+Strap file discovery for the bootstrap process.
+
+Walking the whole checkout on every bootstrap is wasteful: the repository
+holds a handful of strap files but thousands of unrelated files. Discovery
+therefore:
+
+- prunes whole subtrees before descending into them: `.git`, submodules
+  listed in `.gitmodules`, well-known build/dependency directories, and
+  anything excluded by `.gitignore` or `.strapignore` files (same syntax,
+  honoured at every directory level);
+- keeps a small persistent index of every directory visited, keyed by the
+  directory's mtime. Adding, removing or renaming an entry in a directory
+  bumps its mtime, so on re-runs an unchanged directory reuses its cached
+  strap files and subdirectory list with a single stat(). Only directories
+  that actually changed are rescanned;
+- can alternatively ask `git ls-files` for all candidate paths in one call.
+"""
+
+import json
+import os
+import re
+import subprocess
+import time
+
+# YAML strap file names (platform-specific variants included)
+STRAP_YAML_PATTERNS = ["strap.yaml", "strap@darwin.yaml", "strap@linux.yaml"]
+# Legacy Python strap file name
+LEGACY_STRAP_FILENAME = ".strap"
+
+# Directory (relative to the repository root) holding bootstrap caches
+CACHE_DIR_REL = ".strapcache"
+# Discovery index file name inside CACHE_DIR_REL
+INDEX_FILENAME = "index.json"
+# Bump when the on-disk index layout changes
+INDEX_VERSION = 2
+
+# Per-directory ignore files, applied in this order
+IGNORE_FILENAMES = [".gitignore", ".strapignore"]
+
+# Directory names that are never descended into
+ALWAYS_PRUNED = {".git", CACHE_DIR_REL, "node_modules", "__pycache__"}
+
+# Files whose changes can change which strap files discovery finds
+DISCOVERY_FILENAMES = IGNORE_FILENAMES + [".gitmodules"]
+
+# Directory mtimes newer than this (seconds) are not trusted: a write in the
+# same timestamp tick as the scan would otherwise go unnoticed.
+_MTIME_SETTLE_SECONDS = 2
+
+
+def is_strap_filename(filename):
+    """Return True if filename is a YAML or legacy strap file name."""
+    return filename in STRAP_YAML_PATTERNS or filename == LEGACY_STRAP_FILENAME
+
+
+def default_index_path(root):
+    """Return the default discovery index location for a repository root."""
+    return os.path.join(root, CACHE_DIR_REL, INDEX_FILENAME)
+
+
+def _glob_to_regex(pattern):
+    """
+    Translate a gitignore glob into a regular expression.
+
+    Supports '*', '?', '[...]' and the '**' forms ('**/x', 'x/**', 'a/**/b').
+    """
+    i = 0
+    n = len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                # '**/' matches zero or more leading directories
+                if pattern.startswith('**/', i):
+                    out.append('(?:.*/)?')
+                    i += 3
+                    continue
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class IgnoreRule:
+    """A single compiled .gitignore/.strapignore pattern."""
+
+    __slots__ = ('base', 'negate', 'dir_only', 'regex')
+
+    def __init__(self, base, pattern):
+        """
+        Compile a pattern.
+
+        Args:
+            base (str): Directory (relative to the walk root) the ignore file
+                lives in, '' for the root
+            pattern (str): A non-empty, non-comment ignore line
+        """
+        self.base = base
+        self.negate = pattern.startswith('!')
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+
+        # A slash anywhere but at the end anchors the pattern to its base,
+        # otherwise it matches the name at any depth below the base.
+        if '/' in pattern:
+            regex = _glob_to_regex(pattern.lstrip('/'))
+        else:
+            regex = '(?:.*/)?' + _glob_to_regex(pattern)
+        self.regex = re.compile(regex + r'\Z')
+
+    def match(self, rel_path, is_dir):
+        """Return True if the rule applies to rel_path (relative to the walk root)."""
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            prefix = self.base + '/'
+            if not rel_path.startswith(prefix):
+                return False
+            rel_path = rel_path[len(prefix):]
+        return self.regex.match(rel_path) is not None
+
+
+class IgnoreRules:
+    """An immutable, ordered set of ignore rules; the last match wins."""
+
+    def __init__(self, rules=()):
+        self.rules = tuple(rules)
+
+    @staticmethod
+    def parse_lines(lines):
+        """Yield the meaningful patterns of an ignore file."""
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line.endswith('\\ '):
+                line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            yield line
+
+    def extend(self, base, lines):
+        """Return a new rule set with the patterns of an ignore file appended."""
+        new_rules = [IgnoreRule(base, p) for p in self.parse_lines(lines)]
+        if not new_rules:
+            return self
+        return IgnoreRules(self.rules + tuple(new_rules))
+
+    def extend_from_dir(self, root, rel, filenames):
+        """Return a new rule set extended with the given ignore files in root/rel."""
+        rules = self
+        for filename in filenames:
+            path = os.path.join(root, rel, filename)
+            try:
+                with open(path, 'r') as f:
+                    rules = rules.extend(rel, f.readlines())
+            except (OSError, UnicodeDecodeError):
+                continue
+        return rules
+
+    def is_ignored(self, rel_path, is_dir):
+        """Return True if rel_path is excluded by the rules."""
+        ignored = False
+        for rule in self.rules:
+            if rule.negate == ignored and rule.match(rel_path, is_dir):
+                ignored = not rule.negate
+        return ignored
+
+
+def read_submodule_paths(root):
+    """Return the set of submodule paths declared in root/.gitmodules."""
+    paths = set()
+    try:
+        with open(os.path.join(root, '.gitmodules'), 'r') as f:
+            for line in f:
+                key, sep, value = line.partition('=')
+                if sep and key.strip() == 'path':
+                    paths.add(value.strip().strip('/'))
+    except OSError:
+        pass
+    return paths
+
+
+def owning_strap_dirs(root, rel_paths):
+    """
+    Map changed paths to the strap directories that own them.
+
+    A path belongs to the nearest directory at or above it that holds a
+    strap file. Paths inside pruned subtrees (.git, caches, submodules)
+    and paths that no strap file owns are dropped.
+
+    Args:
+        root (str): Repository root
+        rel_paths (iterable): Paths relative to root (may no longer exist)
+
+    Returns:
+        list: (directory path, strap file names) in the format of
+            discover_strap_dirs(), sorted by directory
+    """
+    root = os.path.abspath(root)
+    submodules = read_submodule_paths(root)
+    # relative directory -> strap file names (empty if none)
+    listings = {}
+    owners = {}
+
+    def strap_files(rel_dir):
+        if rel_dir not in listings:
+            try:
+                names = os.listdir(os.path.join(root, rel_dir))
+            except OSError:
+                names = []
+            listings[rel_dir] = sorted(n for n in names if is_strap_filename(n))
+        return listings[rel_dir]
+
+    for rel_path in rel_paths:
+        parts = rel_path.strip('/').split('/')
+        if any(part in ALWAYS_PRUNED for part in parts) or any(
+                rel_path == sub or rel_path.startswith(sub + '/') for sub in submodules):
+            continue
+        # Start at the path's directory, then walk up to the root
+        for depth in range(len(parts) - 1, -1, -1):
+            rel_dir = '/'.join(parts[:depth])
+            files = strap_files(rel_dir)
+            if files:
+                owners[rel_dir] = files
+                break
+
+    return [(os.path.join(root, rel_dir) if rel_dir else root, files)
+            for rel_dir, files in sorted(owners.items())]
+
+
+class StrapIndex:
+    """Persistent, mtime-validated index of strap files in a directory tree."""
+
+    def __init__(self, root, index_path=None):
+        """
+        Initialize the index.
+
+        Args:
+            root (str): Directory tree to discover strap files in
+            index_path (str, optional): Where to persist the index.
+                Defaults to <root>/.strapcache/index.json
+        """
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or default_index_path(self.root)
+        self.dirs = {}
+        self.stats = {'stat': 0, 'scanned': 0, 'reused': 0, 'pruned': 0}
+        self._dirty = False
+
+    def load(self):
+        """Load the persisted index, discarding it if stale or unreadable."""
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.dirs = {}
+            return
+
+        if not isinstance(data, dict) or data.get('version') != INDEX_VERSION \
+                or data.get('root') != self.root:
+            self.dirs = {}
+            self._dirty = True
+            return
+
+        self.dirs = data.get('dirs') or {}
+
+    def save(self):
+        """Persist the index if anything changed since it was loaded."""
+        if not self._dirty:
+            return
+
+        data = {'version': INDEX_VERSION, 'root': self.root, 'dirs': self.dirs}
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, separators=(',', ':'), sort_keys=True)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+        except OSError:
+            # The index is only an optimization; never fail bootstrap over it
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _scan_dir(self, path):
+        """
+        Scan a single directory.
+
+        Subdirectories are recorded unfiltered (apart from ALWAYS_PRUNED) so
+        that edits to ignore files never invalidate the index; ignore rules
+        are applied while walking.
+
+        Returns:
+            tuple: (strap file names, subdirectory names, ignore file names)
+        """
+        straps = []
+        subdirs = []
+        ignore_files = []
+        self.stats['scanned'] += 1
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in ALWAYS_PRUNED:
+                            subdirs.append(entry.name)
+                    elif is_strap_filename(entry.name):
+                        straps.append(entry.name)
+                    elif entry.name in IGNORE_FILENAMES:
+                        ignore_files.append(entry.name)
+                except OSError:
+                    continue
+        straps.sort()
+        subdirs.sort()
+        ignore_files.sort(key=IGNORE_FILENAMES.index)
+        return straps, subdirs, ignore_files
+
+    def walk(self, rules=None, pruned_paths=()):
+        """
+        Walk the tree, revalidating cached directories by mtime.
+
+        Args:
+            rules (IgnoreRules, optional): Rules inherited by the root
+            pruned_paths (iterable): Root-relative directories to skip entirely
+
+        Yields:
+            tuple: (absolute directory path, list of strap file names) for
+                every directory containing at least one strap file, in
+                deterministic top-down order
+        """
+        pruned_paths = set(pruned_paths)
+        seen = set()
+        now_ns = time.time_ns()
+        settle_ns = _MTIME_SETTLE_SECONDS * 1_000_000_000
+        stack = [('', rules or IgnoreRules())]
+
+        while stack:
+            rel, dir_rules = stack.pop()
+            path = os.path.join(self.root, rel) if rel else self.root
+
+            try:
+                self.stats['stat'] += 1
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+
+            seen.add(rel)
+            cached = self.dirs.get(rel)
+            if cached is not None and cached.get('mtime_ns') == mtime_ns:
+                self.stats['reused'] += 1
+                straps = cached['straps']
+                subdirs = cached['subdirs']
+                ignore_files = cached['ignore_files']
+            else:
+                try:
+                    straps, subdirs, ignore_files = self._scan_dir(path)
+                except OSError:
+                    continue
+                trusted = now_ns - mtime_ns > settle_ns
+                self.dirs[rel] = {
+                    'mtime_ns': mtime_ns if trusted else None,
+                    'straps': straps,
+                    'subdirs': subdirs,
+                    'ignore_files': ignore_files,
+                }
+                self._dirty = True
+
+            if ignore_files:
+                dir_rules = dir_rules.extend_from_dir(self.root, rel, ignore_files)
+
+            kept = [
+                name for name in straps
+                if not dir_rules.is_ignored(f"{rel}/{name}" if rel else name, False)
+            ]
+            if kept:
+                yield path, kept
+
+            # Reverse so that the stack pops subdirectories in sorted order
+            for name in reversed(subdirs):
+                child = f"{rel}/{name}" if rel else name
+                if child in pruned_paths or dir_rules.is_ignored(child, True):
+                    self.stats['pruned'] += 1
+                    continue
+                stack.append((child, dir_rules))
+
+        # Forget directories that are gone or no longer visited
+        stale = [rel for rel in self.dirs if rel not in seen]
+        for rel in stale:
+            del self.dirs[rel]
+        if stale:
+            self._dirty = True
+
+
+def _git_ls_strap_files(root):
+    """
+    List candidate strap files with a single `git ls-files` call.
+
+    Returns:
+        list or None: Root-relative paths, or None if git is unavailable
+    """
+    pathspecs = [f":(glob)**/{name}" for name in STRAP_YAML_PATTERNS + [LEGACY_STRAP_FILENAME]]
+    try:
+        result = subprocess.run(
+            ['git', 'ls-files', '-z', '--cached', '--others', '--exclude-standard', '--', *pathspecs],
+            capture_output=True,
+            check=False,
+            cwd=root
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return [p for p in result.stdout.decode('utf-8', 'surrogateescape').split('\0') if p]
+
+
+def _discover_with_git(root, pruned_paths):
+    """
+    Discover strap directories from `git ls-files` output.
+
+    git already applies .gitignore and skips submodule contents; .strapignore
+    rules and pruned paths are applied here on each candidate's ancestry.
+
+    Returns:
+        list or None: (directory path, strap file names) pairs, or None if
+            git could not be used
+    """
+    paths = _git_ls_strap_files(root)
+    if paths is None:
+        return None
+
+    rules_cache = {}
+
+    def rules_for(rel_dir):
+        # Rules in effect inside rel_dir, built from .strapignore files only
+        if rel_dir not in rules_cache:
+            parent = rules_for(os.path.dirname(rel_dir)) if rel_dir else IgnoreRules()
+            rules_cache[rel_dir] = parent.extend_from_dir(root, rel_dir, ['.strapignore'])
+        return rules_cache[rel_dir]
+
+    def dir_excluded(rel_dir):
+        parts = rel_dir.split('/') if rel_dir else []
+        for depth in range(1, len(parts) + 1):
+            sub = '/'.join(parts[:depth])
+            if sub in pruned_paths or parts[depth - 1] in ALWAYS_PRUNED:
+                return True
+            if rules_for('/'.join(parts[:depth - 1])).is_ignored(sub, True):
+                return True
+        return False
+
+    grouped = {}
+    for rel_path in paths:
+        rel_dir, filename = os.path.split(rel_path)
+        if not is_strap_filename(filename) or not os.path.isfile(os.path.join(root, rel_path)):
+            continue
+        if dir_excluded(rel_dir) or rules_for(rel_dir).is_ignored(rel_path, False):
+            continue
+        grouped.setdefault(rel_dir, []).append(filename)
+
+    return [
+        (os.path.join(root, rel_dir) if rel_dir else root, sorted(names))
+        for rel_dir, names in sorted(grouped.items(), key=lambda item: item[0].split('/'))
+    ]
+
+
+def discover_strap_dirs(root, use_index=True, use_git=False):
+    """
+    Discover directories containing strap files.
+
+    Args:
+        root (str): Repository root to search
+        use_index (bool): Reuse and update the persistent discovery index
+        use_git (bool): Ask `git ls-files` for candidates instead of walking;
+            falls back to walking if git is unavailable
+
+    Returns:
+        tuple: (list of (directory path, strap file names), StrapIndex)
+    """
+    root = os.path.abspath(root)
+    pruned_paths = read_submodule_paths(root)
+    index = StrapIndex(root)
+
+    if use_git:
+        results = _discover_with_git(root, pruned_paths)
+        if results is not None:
+            return results, index
+
+    if use_index:
+        index.load()
+    results = list(index.walk(pruned_paths=pruned_paths))
+    if use_index:
+        index.save()
+    return results, index
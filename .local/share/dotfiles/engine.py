@@ -0,0 +1,524 @@
+"""
+Bootstrap engine.
+
+Importable, re-entrant implementation of the bootstrap process. Both
+`bootstrap.py` and `deytefiles bootstrap` call run_bootstrap(), which returns
+a BootstrapResult instead of printing and exiting. No state is kept at module
+level between runs, so the engine can be invoked repeatedly from a
+long-running process.
+
+A run has two phases: every strap file is first turned into actions in a
+single planner.Plan (deduplicated and conflict-checked across strap files),
+then the plan is applied. A dry run stops after the first phase.
+
+Applying consults the deployed-state ledger (see ledger.py): links and
+copies that are already in place are not touched, cron lines are only
+reinstalled when they changed, and entries dropped from strap files since
+the last run are reported (and removed with prune=True).
+
+Cron entries go to the user crontab, or to systemd user timers (see
+timers.py) on machines that select the 'systemd' scheduler.
+"""
+
+import os
+import sys
+import runpy
+import traceback
+
+from . import configcache
+from . import cron
+from . import discovery
+from . import ledger as ledger_mod
+from . import planner
+from . import timers
+from . import utils
+
+
+# Backends that install strap cron entries
+SCHEDULERS = ('cron', 'systemd')
+
+
+def log(message):
+    """Main bootstrap logger."""
+    print(f"[bootstrap] {message}")
+
+
+class BootstrapResult:
+    """Outcome of a single bootstrap run."""
+
+    def __init__(self, repo_root):
+        self.repo_root = repo_root
+        self.found = 0
+        self.executed = 0
+        self.failures = []
+        self.plan = None
+        self.applied = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.stale = []
+        self.pruned = 0
+        self.cron_entries = []
+        self.cron_applied = None
+
+    def record_failure(self, path, message):
+        """Record a failed strap file (or step) and log it."""
+        self.failures.append((path, message))
+        log(f"ERROR processing {path}: {message}")
+
+    @property
+    def exit_status(self):
+        """Process exit status: 0 on success, 1 if anything failed."""
+        return 1 if self.failures or self.cron_applied is False else 0
+
+    def summary(self):
+        """Return a one-line human-readable summary."""
+        text = f"Found {self.found} strap files, executed {self.executed}"
+        if self.plan is not None:
+            text += f", {self.applied} actions applied, {self.unchanged} unchanged"
+            if self.skipped:
+                text += f", {self.skipped} skipped"
+        if self.stale:
+            text += f", {len(self.stale)} stale ({self.pruned} pruned)"
+        if self.failures:
+            text += f", {len(self.failures)} failed"
+        return text
+
+
+def get_platform_from_filename(filename):
+    """
+    Extract platform from strap filename.
+
+    Args:
+        filename (str): Filename like 'strap.yaml', 'strap@darwin.yaml', etc.
+
+    Returns:
+        str: Platform name ('any', 'darwin', 'linux') or None if not a strap file
+    """
+    if filename == 'strap.yaml':
+        return 'any'
+    elif filename.startswith('strap@') and filename.endswith('.yaml'):
+        # Extract platform between @ and .yaml
+        platform_name = filename[6:-5]  # Remove 'strap@' and '.yaml'
+        return platform_name
+    return None
+
+
+def should_process_strap_file(filename, current_platform_name):
+    """
+    Determine if a strap file should be processed on the current platform.
+
+    Args:
+        filename (str): Strap filename
+        current_platform_name (str): Current platform ('darwin' or 'linux')
+
+    Returns:
+        bool: True if file should be processed
+    """
+    file_platform = get_platform_from_filename(filename)
+
+    if file_platform is None:
+        return False
+
+    if file_platform == 'any':
+        return True
+
+    return file_platform == current_platform_name
+
+
+def get_current_platform_name():
+    """Get current platform name as string."""
+    if sys.platform == 'darwin':
+        return 'darwin'
+    elif sys.platform.startswith('linux'):
+        return 'linux'
+    else:
+        return 'unknown'
+
+
+def platform_name_to_code(platform_name):
+    """Convert platform name to platform code constant."""
+    if platform_name == 'darwin':
+        return utils.PLATFORM_DARWIN
+    elif platform_name == 'linux':
+        return utils.PLATFORM_LINUX
+    else:
+        return utils.PLATFORM_ANY
+
+
+def _plan_yaml_strap(result, plan, root, yaml_file, cache=None):
+    """Load a single YAML strap file (through the config cache, if given) and add its actions to the plan."""
+    strap_file_path = os.path.join(root, yaml_file)
+    log(f"Found YAML strap file: {os.path.relpath(strap_file_path, result.repo_root)}")
+
+    try:
+        log(f"Processing: {strap_file_path}")
+
+        # Load YAML configuration
+        if cache is not None:
+            config = cache.load_config(strap_file_path)
+        else:
+            with open(strap_file_path, 'r') as f:
+                config = utils.load_yaml(f)
+
+        if config is None:
+            log(f"WARNING: Empty YAML file: {strap_file_path}")
+            return
+
+        # Get platform code
+        file_platform_name = get_platform_from_filename(yaml_file)
+        platform_code = platform_name_to_code(file_platform_name)
+
+        # Add the YAML config's actions to the plan
+        plan.add_yaml_config(config, root, platform_code, strap=strap_file_path)
+
+        result.executed += 1
+        log(f"Finished planning: {strap_file_path}")
+
+    except utils.yaml.YAMLError as e:
+        result.record_failure(strap_file_path, f"YAML parse error - {e}")
+    except Exception as e:
+        result.record_failure(strap_file_path, str(e))
+        traceback.print_exc()
+
+
+def _run_legacy_strap(result, plan, root):
+    """Execute a legacy Python .strap file, routing its config into the plan."""
+    strap_file_path = os.path.join(root, discovery.LEGACY_STRAP_FILENAME)
+    log(f"Found legacy .strap file: {os.path.relpath(strap_file_path, result.repo_root)}")
+
+    try:
+        log(f"Executing: {strap_file_path}")
+        # Execute the .strap file in its own module scope. Its calls to
+        # utils.process_config() add actions to the plan instead of executing.
+        with utils.planning(plan, strap=strap_file_path):
+            runpy.run_path(strap_file_path, run_name="__strap__")
+        result.executed += 1
+        log(f"Finished executing: {strap_file_path}")
+    except ImportError as e:
+        result.record_failure(strap_file_path, f"Import error - {e}")
+    except Exception as e:
+        result.record_failure(strap_file_path, str(e))
+
+
+def build_plan(result, use_index=True, use_git=False, use_cache=True, strap_dirs=None):
+    """
+    Phase one: discover strap files and build the complete plan.
+
+    Args:
+        result (BootstrapResult): Result to record counts and failures in
+        use_index (bool): Use the persistent discovery index
+        use_git (bool): Discover strap files with `git ls-files`
+        use_cache (bool): Reuse parsed strap files from the config cache
+        strap_dirs (list, optional): (directory, strap file names) to plan
+            instead of discovering all strap files (see affected_strap_dirs)
+
+    Returns:
+        planner.Plan: The deduplicated, conflict-checked plan
+    """
+    repo_root = result.repo_root
+    plan = planner.Plan(repo_root)
+
+    # Get current platform
+    current_platform_name = get_current_platform_name()
+    log(f"Current platform: {current_platform_name}")
+
+    if strap_dirs is not None:
+        log(f"Planning {len(strap_dirs)} affected strap directories only")
+    else:
+        # Discover strap files (ignore-aware, pruned walk with a persistent index)
+        strap_dirs, index = discovery.discover_strap_dirs(
+            repo_root,
+            use_index=use_index,
+            use_git=use_git
+        )
+        log(f"Discovery: {index.stats['stat']} directories checked, "
+            f"{index.stats['reused']} reused from index, {index.stats['scanned']} rescanned, "
+            f"{index.stats['pruned']} pruned")
+
+    cache = None
+    if use_cache:
+        cache = configcache.ConfigCache(repo_root)
+        cache.load()
+
+    for root, files in strap_dirs:
+        # Check for YAML strap files first (new format)
+        for yaml_file in files:
+            if yaml_file not in discovery.STRAP_YAML_PATTERNS:
+                continue
+
+            # Check if this file should be processed on current platform
+            if not should_process_strap_file(yaml_file, current_platform_name):
+                log(f"Skipping {yaml_file} in {os.path.relpath(root, repo_root)} (platform mismatch)")
+                continue
+
+            result.found += 1
+            _plan_yaml_strap(result, plan, root, yaml_file, cache)
+
+        # Legacy: Check for old Python .strap files
+        if discovery.LEGACY_STRAP_FILENAME in files:
+            result.found += 1
+            _run_legacy_strap(result, plan, root)
+
+    if cache is not None:
+        cache.save()
+        log(f"Config cache: {cache.stats['hits']} reused, {cache.stats['parsed']} parsed")
+
+    return plan
+
+
+def affected_strap_dirs(repo_root, changed_paths):
+    """
+    Work out which strap directories a set of changed files affects.
+
+    A change to a strap file, to a file that steers discovery (.gitignore,
+    .strapignore, .gitmodules) or to the bootstrap engine itself needs a
+    full run. Any other file only affects the strap file owning its
+    directory (see discovery.owning_strap_dirs).
+
+    Args:
+        repo_root (str): Repository root
+        changed_paths (list): Changed paths, relative to repo_root
+
+    Returns:
+        list or None: (directory, strap file names) to re-run, or None if
+            a full bootstrap is needed
+    """
+    repo_root = os.path.abspath(repo_root)
+    engine_dir = os.path.dirname(os.path.abspath(__file__))
+    cli_dir = os.path.join(engine_dir, 'cli')
+    for path in changed_paths:
+        name = os.path.basename(path)
+        if discovery.is_strap_filename(name) or name in discovery.DISCOVERY_FILENAMES:
+            return None
+        full_path = os.path.join(repo_root, path)
+        if full_path.startswith(engine_dir + os.sep) and not full_path.startswith(cli_dir + os.sep):
+            return None
+    return discovery.owning_strap_dirs(repo_root, changed_paths)
+
+
+def _report_cron_load(plan, dry_run):
+    """Log how the plan's cron jobs spread over the day and warn about pile-ups."""
+    entries = [action.entry for action in plan.of_kind('cron')]
+    if not entries:
+        return
+
+    schedules = []
+    for entry in entries:
+        time_expr, command = cron.split_entry(entry)
+        try:
+            schedule = cron.CronSchedule(time_expr)
+        except cron.CronError:
+            continue
+        schedules.append(schedule)
+        if dry_run:
+            next_fire = schedule.next_fire()
+            when = next_fire.strftime('%Y-%m-%d %H:%M') if next_fire else 'never'
+            log(f"[plan] cron next run {when}: {command}")
+
+    histogram = cron.minute_histogram(schedules)
+    busy = cron.busiest_minutes(histogram)
+    if not busy:
+        log(f"Cron load: {len(schedules)} job(s), no two share a minute")
+        return
+    shared = sum(1 for count in histogram if count > 1)
+    log(f"Cron load: {len(schedules)} job(s), up to {busy[0][0]} in the same minute")
+    log(f"WARNING: cron jobs coincide in {shared} minute(s) of the day, e.g. "
+        + ', '.join(f"{minute} ({count} jobs)" for count, minute in busy)
+        + "; consider 'jitter: true' on the colliding entries")
+
+
+def default_scheduler():
+    """Return this machine's scheduler backend ($DEYTEFILES_SCHEDULER, default 'cron')."""
+    return os.environ.get('DEYTEFILES_SCHEDULER') or 'cron'
+
+
+def _apply_timers(result, prune):
+    """
+    Install the plan's cron entries as systemd user timers.
+
+    Nothing is recorded in the ledger: its cron lines describe the crontab,
+    and the timer backend compares and prunes its unit files itself.
+    """
+    actions = result.plan.of_kind('cron')
+    log(f"Applying {len(actions)} collected cron job(s) as systemd user timers...")
+    backend = timers.SystemdTimerBackend()
+    try:
+        result.cron_applied = backend.apply(
+            [(action.name, action.entry, action.options) for action in actions], prune=prune)
+    except Exception as e:
+        log(f"WARNING: Error applying systemd timers: {e}")
+        result.cron_applied = False
+
+
+def _apply_cron(result, ledger, prune, scheduler='cron'):
+    """
+    Install the plan's cron lines.
+
+    The crontab is always read, so a crontab cleared or edited outside
+    deytefiles is restored; the managed section's digest decides whether
+    it is rewritten. The ledger only tells which jobs were dropped from
+    the strap files, for --prune.
+    """
+    result.cron_entries = [action.entry for action in result.plan.of_kind('cron')]
+
+    if scheduler == 'systemd':
+        if sys.platform.startswith('linux'):
+            # The backend compares unit files itself, so option-only changes
+            # (which the ledger does not record) are picked up too
+            _apply_timers(result, prune)
+            return
+        log("WARNING: systemd timers are only available on Linux; using crontab")
+
+    dropped = ledger is not None and bool(ledger.cron) and not result.cron_entries
+    if dropped and not prune:
+        log(f"{len(ledger.cron)} previously installed cron job(s) are no longer in any strap file "
+            "(run with --prune to remove them)")
+        return
+
+    if not result.cron_entries and not dropped:
+        log("No cron jobs to apply.")
+        if ledger is not None:
+            ledger.record_cron([])
+        return
+
+    log(f"Applying {len(result.cron_entries)} collected cron job(s)...")
+    try:
+        result.cron_applied = utils.apply_cron_jobs(result.cron_entries, allow_empty=dropped)
+    except Exception as e:
+        log(f"WARNING: Error applying cron jobs: {e}")
+        result.cron_applied = False
+
+    if result.cron_applied and ledger is not None:
+        ledger.record_cron(result.cron_entries)
+
+
+def _handle_stale(result, ledger, prune):
+    """Report (and optionally remove) ledger entries dropped from strap files."""
+    result.stale = ledger.stale_entries(result.plan)
+    for kind, target in result.stale:
+        if not prune:
+            log(f"Stale {kind} (no longer in any strap file): {target}")
+            continue
+        try:
+            if ledger.remove_stale(kind, target):
+                result.pruned += 1
+                log(f"Pruned stale {kind}: {target}")
+        except OSError as e:
+            result.record_failure(target, f"Could not prune stale {kind}: {e}")
+    if result.stale and not prune:
+        log(f"{len(result.stale)} stale entries found (run with --prune to remove them)")
+
+
+def run_bootstrap(repo_root, use_index=True, use_git=False, use_cache=True, dry_run=False, plan=None,
+                  use_ledger=True, prune=False, ledger_path=None, jobs=1, copy_policy=None,
+                  scheduler=None, strap_dirs=None):
+    """
+    Run the bootstrap process for a repository.
+
+    Args:
+        repo_root (str or Path): Dotfiles repository root
+        use_index (bool): Use the persistent discovery index
+        use_git (bool): Discover strap files with `git ls-files`
+        use_cache (bool): Reuse parsed strap files from the config cache
+        dry_run (bool): Build and print the plan without touching the filesystem
+        plan (planner.Plan, optional): Previously built plan to apply instead
+            of planning from the strap files
+        use_ledger (bool): Skip converged entries using the deployed-state ledger
+        prune (bool): Remove entries deployed earlier but dropped from strap files
+        ledger_path (str, optional): Ledger location (defaults to the XDG state dir)
+        jobs (int): Number of independent strap files to apply concurrently
+        copy_policy (str, optional): How to confirm pending copies, one of
+            planner.COPY_POLICIES. Defaults to 'ask' on a terminal and
+            'only-missing' otherwise.
+        scheduler (str, optional): Backend for cron entries, one of
+            SCHEDULERS. Defaults to default_scheduler().
+        strap_dirs (list, optional): Re-run only these (directory, strap
+            file names), e.g. from affected_strap_dirs(). The plan is then
+            partial, so cron jobs and stale entries are left alone.
+
+    Returns:
+        BootstrapResult: Counts, failures, the plan and exit status
+    """
+    repo_root = os.path.abspath(str(repo_root))
+    result = BootstrapResult(repo_root)
+    log(f"Running from: {repo_root}")
+
+    if scheduler is None and default_scheduler() not in SCHEDULERS:
+        result.record_failure(repo_root, f"Unknown scheduler in DEYTEFILES_SCHEDULER: {default_scheduler()}")
+        return result
+
+    # strap_dirs only applies when planning here, not to a saved plan
+    partial = strap_dirs is not None and plan is None
+    if plan is None:
+        if utils.yaml_parser_id() is None:
+            result.record_failure(repo_root, "No YAML parser available")
+            return result
+        plan = build_plan(result, use_index=use_index, use_git=use_git, use_cache=use_cache,
+                          strap_dirs=strap_dirs)
+    result.plan = plan
+
+    # Resolve strap ordering up front so dependency cycles are reported
+    plan.groups()
+    for strap, message in plan.errors:
+        result.record_failure(strap or repo_root, message)
+    for conflict in plan.conflicts:
+        result.record_failure(conflict.target, f"Conflict: {conflict.describe()}")
+    log(f"Plan: {len(plan.actions)} actions, {plan.duplicates} duplicates dropped, "
+        f"{len(plan.conflicts)} conflicts")
+    # A strap file that failed to load, or an entry lost to a conflict, is
+    # missing from the plan; what it deployed would look stale
+    incomplete = bool(result.failures)
+    if incomplete and not partial:
+        log(f"Plan is incomplete ({len(result.failures)} error(s)); stale entries "
+            "are not reported and nothing is pruned")
+    _report_cron_load(plan, dry_run)
+
+    ledger = None
+    if use_ledger:
+        ledger = ledger_mod.Ledger(ledger_path)
+        ledger.load()
+
+    pending = planner.pending_copies(plan, ledger)
+
+    if dry_run:
+        for line in plan.describe():
+            log(f"[plan] {line}")
+        for action, summary in pending:
+            log(f"[plan] pending copy {action.target} ({summary})")
+        if ledger is not None and not partial and not incomplete:
+            for kind, target in ledger.stale_entries(plan):
+                log(f"[plan] stale {kind} {target}")
+        log(f"Dry run finished. {result.summary()}.")
+        return result
+
+    # --- Resolve copy confirmations in one batch ---
+    if copy_policy is None:
+        copy_policy = 'ask' if sys.stdin.isatty() else 'only-missing'
+        if pending and copy_policy != 'ask':
+            log(f"Non-interactive run, using copy policy '{copy_policy}'")
+    decisions = planner.select_copies(pending, copy_policy)
+
+    # --- Phase two: apply links and copies ---
+    result.applied, result.unchanged, result.skipped, failed = planner.apply_plan(
+        plan, ledger=ledger, jobs=jobs, copy_decisions=decisions)
+    for action in failed:
+        result.record_failure(action.strap or repo_root, f"Failed to {action.kind} {action.target}")
+
+    # --- Apply collected cron jobs ---
+    # After all links and copies are in place, install cron entries in one batch.
+    # A partial plan lacks the other strap files' jobs and entries.
+    if partial:
+        log("Partial run: cron jobs and stale entries left unchanged")
+    else:
+        _apply_cron(result, ledger, prune and not incomplete, scheduler or default_scheduler())
+
+    if ledger is not None:
+        if not partial and not incomplete:
+            _handle_stale(result, ledger, prune)
+        try:
+            ledger.save()
+        except OSError as e:
+            log(f"WARNING: Could not write ledger {ledger.path}: {e}")
+
+    log(f"Bootstrap finished. {result.summary()}.")
+    return result
@@ -0,0 +1,257 @@
+"""
+Deployed-state ledger.
+
+Records what bootstrap deployed: every link target and its source, every
+copy target with the content hash of its source, and the cron lines that
+were installed. Re-runs compare the desired plan with the ledger and the
+filesystem so that only entries that actually changed are touched, and so
+that entries dropped from strap files since the last run can be reported
+and (optionally) removed.
+
+The ledger lives in $XDG_STATE_HOME/deytefiles/ledger.json
+(~/.local/state/deytefiles/ledger.json by default).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+from . import utils
+from .copier import hash_file
+
+# Bump when the ledger layout changes
+LEDGER_VERSION = 1
+
+
+def default_ledger_path():
+    """Return the ledger location under the XDG state directory."""
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.path.join(state_home, 'deytefiles', 'ledger.json')
+
+
+def hash_path(path):
+    """
+    Return a content hash of a file, symlink or directory tree.
+
+    Directory hashes cover relative paths, file contents, symlink targets
+    and the executable bit, so any change that a copy would reproduce
+    changes the hash.
+    """
+    if os.path.islink(path):
+        return 'link:' + hashlib.sha256(os.readlink(path).encode()).hexdigest()
+    if not os.path.isdir(path):
+        return hash_file(path)
+
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        rel_root = os.path.relpath(root, path)
+        # Symlinked directories are copied as links, do not descend into them
+        for name in [d for d in dirs if os.path.islink(os.path.join(root, d))]:
+            dirs.remove(name)
+            files.append(name)
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            rel_path = os.path.normpath(os.path.join(rel_root, name))
+            if os.path.islink(file_path):
+                entry = f"L {rel_path} {os.readlink(file_path)}"
+            else:
+                executable = 'x' if os.access(file_path, os.X_OK) else '-'
+                entry = f"F {rel_path} {executable} {hash_file(file_path)}"
+            digest.update(entry.encode('utf-8', 'surrogateescape') + b'\0')
+    return 'tree:' + digest.hexdigest()
+
+
+class Ledger:
+    """Persistent record of deployed links, copies and cron lines."""
+
+    def __init__(self, path=None):
+        """
+        Initialize the ledger.
+
+        Args:
+            path (str, optional): Ledger file. Defaults to default_ledger_path()
+        """
+        self.path = path or default_ledger_path()
+        self.links = {}
+        self.copies = {}
+        self.cron = None
+        self._loaded_text = None
+        self._hash_cache = {}
+
+    def load(self):
+        """Load the ledger; a missing or corrupt ledger starts empty."""
+        try:
+            with open(self.path, 'r') as f:
+                text = f.read()
+            data = json.loads(text)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(data, dict) or data.get('version') != LEDGER_VERSION:
+            return
+
+        self._loaded_text = text
+        self.links = data.get('links') or {}
+        self.copies = data.get('copies') or {}
+        self.cron = data.get('cron')
+
+    def _serialize(self):
+        data = {
+            'version': LEDGER_VERSION,
+            'links': self.links,
+            'copies': self.copies,
+            'cron': self.cron,
+        }
+        return json.dumps(data, indent=1, sort_keys=True) + '\n'
+
+    def save(self):
+        """
+        Persist the ledger if it changed.
+
+        Returns:
+            bool: True if the file was written
+        """
+        text = self._serialize()
+        if text == self._loaded_text:
+            return False
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+        self._loaded_text = text
+        return True
+
+    # --- Convergence checks ---------------------------------------------------
+
+    def _source_hash(self, source):
+        """Hash a copy source, reusing the ledger hash when a file's stat is unchanged."""
+        if source in self._hash_cache:
+            return self._hash_cache[source]
+
+        digest = None
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+        recorded = next((c for c in self.copies.values() if c.get('source') == source), None)
+        if recorded and not os.path.isdir(source) \
+                and recorded.get('size') == st.st_size and recorded.get('mtime_ns') == st.st_mtime_ns:
+            digest = recorded.get('hash')
+        if digest is None:
+            digest = hash_path(source)
+        self._hash_cache[source] = digest
+        return digest
+
+    @staticmethod
+    def link_is_current(action):
+        """Return True if the link target already points at its source."""
+        try:
+            return os.readlink(action.target) == action.source
+        except OSError:
+            return False
+
+    def copy_is_current(self, action):
+        """
+        Return True if a copy target needs no work.
+
+        A copy is current when its target exists and either the source is
+        unchanged since it was last deployed (target edits are user
+        customizations and are kept) or the target already has the source's
+        content.
+        """
+        if not os.path.lexists(action.target):
+            return False
+        source_hash = self._source_hash(action.source)
+        if source_hash is None:
+            return False
+        recorded = self.copies.get(action.target)
+        if recorded and recorded.get('source') == action.source and recorded.get('hash') == source_hash:
+            return True
+        try:
+            return hash_path(action.target) == source_hash
+        except OSError:
+            return False
+
+    # --- Recording --------------------------------------------------------------
+
+    def record(self, action):
+        """Record a link or copy action as deployed."""
+        if action.kind == 'link':
+            self.links[action.target] = action.source
+        elif action.kind == 'copy':
+            source_hash = self._source_hash(action.source)
+            try:
+                st = os.stat(action.source)
+            except OSError:
+                return
+            self.copies[action.target] = {
+                'source': action.source,
+                'hash': source_hash,
+                'size': st.st_size,
+                'mtime_ns': st.st_mtime_ns,
+            }
+
+    def record_copy_if_matching(self, action):
+        """Record a copy only if its target now holds the source's content."""
+        try:
+            if os.path.lexists(action.target) and hash_path(action.target) == self._source_hash(action.source):
+                self.record(action)
+        except OSError:
+            pass
+
+    def record_cron(self, lines):
+        """Record the installed cron lines."""
+        self.cron = list(lines)
+
+    # --- Drift --------------------------------------------------------------------
+
+    def stale_entries(self, plan):
+        """
+        Return ledger entries that are no longer part of the plan.
+
+        Returns:
+            list: (kind, target) tuples; kind is 'link' or 'copy'
+        """
+        desired = {(a.kind, a.target) for a in plan.actions if a.kind != 'cron'}
+        stale = [('link', t) for t in sorted(self.links) if ('link', t) not in desired]
+        stale += [('copy', t) for t in sorted(self.copies) if ('copy', t) not in desired]
+        return stale
+
+    def remove_stale(self, kind, target):
+        """
+        Remove a stale deployed entry, but only if it is still what we deployed.
+
+        Links are removed only while they still point at the recorded source;
+        copies only while their content still matches the recorded hash.
+
+        Returns:
+            bool: True if the entry was removed from disk (or was already gone)
+        """
+        if kind == 'link':
+            source = self.links.get(target)
+            if os.path.islink(target):
+                if os.readlink(target) != source:
+                    utils._log("ledger", f"Keeping {target}: link was changed since it was deployed")
+                    return False
+                os.remove(target)
+            elif os.path.lexists(target):
+                utils._log("ledger", f"Keeping {target}: no longer a symlink")
+                return False
+            self.links.pop(target, None)
+            return True
+
+        recorded = self.copies.get(target) or {}
+        if os.path.lexists(target):
+            if hash_path(target) != recorded.get('hash'):
+                utils._log("ledger", f"Keeping {target}: copy was modified since it was deployed")
+                return False
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+            else:
+                os.remove(target)
+        self.copies.pop(target, None)
+        return True
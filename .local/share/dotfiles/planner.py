@@ -0,0 +1,610 @@
+"""
+Two-phase bootstrap planning.
+
+Phase one turns every strap file into Actions collected in a single Plan.
+The plan indexes actions by their target path, so duplicates across strap
+files are dropped and conflicting claims on the same target (or on a path
+inside another link's target) are detected before anything touches the
+filesystem. Phase two, apply_plan(), executes the remaining actions.
+
+Actions are applied per strap (grouped by config name). Strap files may
+declare ordering constraints with `after: [other-name, ...]`; groups run in
+a stable topological order, optionally on a worker pool. Log lines of each
+group are buffered and emitted in that same order, so parallel output reads
+exactly like a serial run.
+
+Copies that would change their target are resolved up front by
+select_copies() according to a copy policy (ask once for the whole batch,
+yes, no, only-missing, only-changed), so applying never blocks on a
+per-entry prompt.
+
+Plans serialize to JSON so they can be printed, cached and re-applied.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from . import utils
+
+# Bump when the serialized plan layout changes
+PLAN_VERSION = 2
+
+ACTION_KINDS = ('link', 'copy', 'cron')
+
+# 'ask' prompts once for the whole batch of pending copies
+COPY_POLICIES = ('ask', 'yes', 'no', 'only-missing', 'only-changed')
+
+
+class Action:
+    """A single deployment step: a link, a copy or a cron line."""
+
+    __slots__ = ('kind', 'name', 'strap', 'source', 'target', 'entry', 'options')
+
+    def __init__(self, kind, name, strap=None, source=None, target=None, entry=None, options=None):
+        """
+        Initialize an action.
+
+        Args:
+            kind (str): 'link', 'copy' or 'cron'
+            name (str): Strap config name, used for logging
+            strap (str, optional): Strap file the action came from
+            source (str, optional): Absolute source path (link/copy)
+            target (str, optional): Absolute target path (link/copy)
+            entry (str, optional): Formatted crontab line (cron)
+            options (dict, optional): Timer options of a cron entry
+                (see timers.render_units)
+        """
+        if kind not in ACTION_KINDS:
+            raise ValueError(f"Unknown action kind: {kind}")
+        self.kind = kind
+        self.name = name
+        self.strap = strap
+        self.source = source
+        self.target = target
+        self.entry = entry
+        self.options = options
+
+    def key(self):
+        """Return the identity of the action's effect (ignoring its origin)."""
+        return (self.kind, self.source, self.target, self.entry)
+
+    def to_dict(self):
+        """Serialize to a JSON-compatible dictionary."""
+        return {slot: getattr(self, slot) for slot in self.__slots__ if getattr(self, slot) is not None}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Deserialize from a dictionary produced by to_dict()."""
+        return cls(**{slot: data.get(slot) for slot in cls.__slots__})
+
+    def describe(self, repo_root=None):
+        """Return a one-line human-readable description."""
+        if self.kind == 'cron':
+            return f"cron  {self.entry} ({self.name})"
+        source = self.source
+        if repo_root and source.startswith(repo_root + os.sep):
+            source = os.path.relpath(source, repo_root)
+        arrow = '->' if self.kind == 'link' else '<-'
+        return f"{self.kind:<5} {_collapse_home(self.target)} {arrow} {source} ({self.name})"
+
+
+class Conflict:
+    """Two or more actions claiming the same (or a nested) target path."""
+
+    def __init__(self, target, actions, reason):
+        self.target = target
+        self.actions = actions
+        self.reason = reason
+
+    def to_dict(self):
+        """Serialize to a JSON-compatible dictionary."""
+        return {
+            'target': self.target,
+            'reason': self.reason,
+            'actions': [action.to_dict() for action in self.actions],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Deserialize from a dictionary produced by to_dict()."""
+        return cls(data['target'], [Action.from_dict(a) for a in data['actions']], data['reason'])
+
+    def describe(self):
+        """Return a human-readable description."""
+        origins = ', '.join(f"{a.name} ({a.strap or '?'})" for a in self.actions)
+        return f"{_collapse_home(self.target)}: {self.reason} [{origins}]"
+
+
+def _collapse_home(path):
+    """Replace the home directory prefix of path with '~'."""
+    home = os.path.expanduser('~')
+    if path == home:
+        return '~'
+    if path.startswith(home + os.sep):
+        return '~' + path[len(home):]
+    return path
+
+
+class Plan:
+    """Complete, conflict-checked set of actions for a bootstrap run."""
+
+    def __init__(self, repo_root=None):
+        self.repo_root = repo_root
+        self.actions = []
+        self.conflicts = []
+        self.duplicates = 0
+        self.errors = []
+        # strap name -> names it must be applied after
+        self.after = {}
+        # target path -> action (link/copy); cron line -> action
+        self._by_target = {}
+        self._cron_lines = set()
+        # targets excluded from the plan because of a conflict
+        self._conflicted = {}
+
+    # --- Building -----------------------------------------------------------
+
+    def add(self, action):
+        """
+        Add an action, deduplicating and conflict-checking it.
+
+        Returns:
+            bool: True if the action was added to the plan
+        """
+        if action.kind == 'cron':
+            if action.entry in self._cron_lines:
+                self.duplicates += 1
+                return False
+            self._cron_lines.add(action.entry)
+            self.actions.append(action)
+            return True
+
+        target = action.target
+
+        # Already conflicted: record the additional claimant
+        if target in self._conflicted:
+            self._conflicted[target].actions.append(action)
+            return False
+
+        existing = self._by_target.get(target)
+        if existing is not None:
+            if existing.key() == action.key():
+                self.duplicates += 1
+                utils._log(action.name, f"Dropping duplicate {action.kind} of {target} "
+                                        f"(already planned by {existing.name})")
+                return False
+            self._exclude(target, [existing, action], "multiple strap entries target this path")
+            return False
+
+        # A target inside another link's target would be written into the
+        # link's source tree; a link whose target contains already planned
+        # targets would hide them. Both are conflicts.
+        ancestor = self._linked_ancestor(target)
+        if ancestor is not None:
+            self._record(target, [ancestor, action], f"path is inside linked target {_collapse_home(ancestor.target)}")
+            return False
+        if action.kind == 'link':
+            nested = [a for t, a in self._by_target.items() if t.startswith(target + os.sep)]
+            if nested:
+                for a in nested:
+                    self._remove(a)
+                    self._record(a.target, [action, a], f"path is inside linked target {_collapse_home(target)}")
+
+        self._by_target[target] = action
+        self.actions.append(action)
+        return True
+
+    def _linked_ancestor(self, target):
+        """Return the link action whose target is an ancestor of target, if any."""
+        parent = os.path.dirname(target)
+        while parent and parent != os.path.dirname(parent):
+            action = self._by_target.get(parent)
+            if action is not None and action.kind == 'link':
+                return action
+            parent = os.path.dirname(parent)
+        return None
+
+    def _remove(self, action):
+        self._by_target.pop(action.target, None)
+        self.actions.remove(action)
+
+    def _record(self, target, actions, reason):
+        conflict = Conflict(target, actions, reason)
+        self.conflicts.append(conflict)
+        return conflict
+
+    def _exclude(self, target, actions, reason):
+        """Drop every action on target and remember the conflict."""
+        self._remove(actions[0])
+        self._conflicted[target] = self._record(target, actions, reason)
+
+    def add_config(self, config, strap=None):
+        """
+        Add the actions of a normalized config (the process_config() format).
+
+        Entries are validated and platform-filtered exactly as
+        process_config() does in immediate mode.
+
+        Args:
+            config (dict): {'name': str, 'link': [...], 'copy': [...], 'cron': [...]}
+            strap (str, optional): Strap file the config came from
+        """
+        if not isinstance(config, dict):
+            self.errors.append((strap, "Invalid config format - must be a dictionary"))
+            return
+
+        name = config.get('name', 'unknown')
+        current_platform = utils.get_current_platform()
+
+        after = config.get('after', [])
+        if isinstance(after, str):
+            after = [after]
+        if not isinstance(after, list) or not all(isinstance(dep, str) for dep in after):
+            utils._log(name, "ERROR: Invalid 'after' format - must be a list of strap names.")
+            self.errors.append((strap, "Invalid 'after' format"))
+            after = []
+        if after:
+            deps = self.after.setdefault(name, [])
+            deps.extend(dep for dep in after if dep not in deps)
+
+        for kind in ('link', 'copy', 'cron'):
+            tasks = config.get(kind, [])
+            if not isinstance(tasks, list):
+                utils._log(name, f"ERROR: Invalid '{kind}' format - must be a list.")
+                self.errors.append((strap, f"Invalid '{kind}' format"))
+                continue
+
+            for entry in tasks:
+                # Cron entries may carry a fourth element: a dict of timer options
+                options = None
+                if kind == 'cron' and isinstance(entry, (list, tuple)) and len(entry) == 4 \
+                        and isinstance(entry[3], dict):
+                    entry, options = entry[:3], entry[3]
+                if not (isinstance(entry, (list, tuple)) and len(entry) == 3
+                        and isinstance(entry[0], str) and isinstance(entry[1], str)
+                        and isinstance(entry[2], int)):
+                    utils._log(name, f"ERROR: Invalid {kind} entry format: {entry}. Must be [str, str, int].")
+                    self.errors.append((strap, f"Invalid {kind} entry: {entry}"))
+                    continue
+
+                first, second, platform_flag = entry
+                if kind == 'cron':
+                    cron_entry = utils._handle_cron(name, first, second, current_platform, platform_flag)
+                    if cron_entry:
+                        self.add(Action('cron', name, strap, entry=cron_entry, options=options))
+                    continue
+
+                if platform_flag != utils.PLATFORM_ANY and platform_flag != current_platform:
+                    utils._log(name, f"Skipping {kind} {second} (platform mismatch)")
+                    continue
+                self.add(Action(
+                    kind, name, strap,
+                    source=utils._resolve_path(first),
+                    target=utils._resolve_path(second)
+                ))
+
+    def add_yaml_config(self, config, strap_dir, platform, strap=None):
+        """
+        Add the actions of a YAML strap config.
+
+        Args:
+            config (dict): Configuration loaded from a strap YAML file
+            strap_dir (str): Directory containing the strap file
+            platform (int): Platform code of the strap file
+            strap (str, optional): Strap file path
+        """
+        if not isinstance(config, dict):
+            self.errors.append((strap, "Invalid config format - must be a dictionary"))
+            return
+
+        name = config.get('name', 'unknown')
+        self.add_config({
+            'name': name,
+            'after': config.get('after', []),
+            'link': utils._normalize_yaml_entries(config.get('link', []), strap_dir, platform, name),
+            'copy': utils._normalize_yaml_entries(config.get('copy', []), strap_dir, platform, name),
+            'cron': utils._normalize_yaml_cron_entries(config.get('cron', []), strap_dir, platform, name),
+        }, strap=strap)
+
+    # --- Inspection ---------------------------------------------------------
+
+    def of_kind(self, kind):
+        """Return the planned actions of one kind, in plan order."""
+        return [action for action in self.actions if action.kind == kind]
+
+    def groups(self):
+        """
+        Group link/copy actions by strap name in dependency order.
+
+        Groups are ordered topologically by their `after` constraints; ties
+        keep plan order, so without constraints this is plain plan order.
+        Unknown dependency names are ignored. On a dependency cycle the
+        remaining groups keep plan order and an error is recorded.
+
+        Returns:
+            list: (name, actions, dependency names present in the plan)
+        """
+        order = []
+        members = {}
+        for action in self.actions:
+            if action.kind == 'cron':
+                continue
+            if action.name not in members:
+                members[action.name] = []
+                order.append(action.name)
+            members[action.name].append(action)
+
+        deps = {name: [d for d in self.after.get(name, []) if d in members and d != name] for name in order}
+        done = set()
+        result = []
+        while len(result) < len(order):
+            ready = next((n for n in order if n not in done and all(d in done for d in deps[n])), None)
+            if ready is None:
+                cycle = [n for n in order if n not in done]
+                error = (None, f"Dependency cycle between straps: {', '.join(cycle)}")
+                if error not in self.errors:
+                    self.errors.append(error)
+                for name in cycle:
+                    deps[name] = []
+                continue
+            done.add(ready)
+            result.append((ready, members[ready], deps[ready]))
+        return result
+
+    def describe(self):
+        """Return the plan as a list of human-readable lines."""
+        lines = [action.describe(self.repo_root) for action in self.actions]
+        for conflict in self.conflicts:
+            lines.append(f"CONFLICT {conflict.describe()}")
+        return lines
+
+    # --- Serialization ------------------------------------------------------
+
+    def to_dict(self):
+        """Serialize to a JSON-compatible dictionary."""
+        return {
+            'version': PLAN_VERSION,
+            'repo_root': self.repo_root,
+            'actions': [action.to_dict() for action in self.actions],
+            'conflicts': [conflict.to_dict() for conflict in self.conflicts],
+            'duplicates': self.duplicates,
+            'errors': [list(error) for error in self.errors],
+            'after': self.after,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Deserialize a plan produced by to_dict().
+
+        Raises:
+            ValueError: If the data is not a plan of a supported version
+        """
+        if not isinstance(data, dict) or data.get('version') != PLAN_VERSION:
+            raise ValueError("Unsupported or corrupt plan")
+        plan = cls(data.get('repo_root'))
+        for action_data in data.get('actions', []):
+            plan.add(Action.from_dict(action_data))
+        plan.conflicts.extend(Conflict.from_dict(c) for c in data.get('conflicts', []))
+        plan.duplicates += data.get('duplicates', 0)
+        plan.errors.extend(tuple(error) for error in data.get('errors', []))
+        plan.after = data.get('after') or {}
+        return plan
+
+    def save(self, path):
+        """Write the plan to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write('\n')
+
+    @classmethod
+    def load(cls, path):
+        """Read a plan from a JSON file written by save()."""
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+
+def pending_copies(plan, ledger=None):
+    """
+    Find the copy actions that would change their target.
+
+    Copies that the ledger reports as converged, or whose target already
+    holds the source's content, are not pending. Copies whose source is
+    missing are left to fail during apply.
+
+    Returns:
+        list: (action, summary) pairs; summary is copier.diff_summary() text
+    """
+    # Import here to avoid circular dependency
+    from . import copier
+
+    pending = []
+    for action in plan.of_kind('copy'):
+        if not os.path.lexists(action.source):
+            continue
+        if ledger is not None and ledger.copy_is_current(action):
+            continue
+        if os.path.lexists(action.target) and copier.paths_identical(action.source, action.target):
+            continue
+        pending.append((action, copier.diff_summary(action.source, action.target)))
+    return pending
+
+
+def select_copies(pending, policy='ask'):
+    """
+    Decide which pending copies to perform.
+
+    Args:
+        pending (list): (action, summary) pairs from pending_copies()
+        policy (str): One of COPY_POLICIES. 'ask' lists every pending copy
+            and asks a single question for the whole batch.
+
+    Returns:
+        dict: Pending copy target -> True if the copy was approved
+    """
+    if policy not in COPY_POLICIES:
+        raise ValueError(f"Unknown copy policy '{policy}'")
+
+    if policy in ('yes', 'no') or not pending:
+        return {action.target: policy == 'yes' for action, _summary in pending}
+    if policy in ('only-missing', 'only-changed'):
+        want_missing = policy == 'only-missing'
+        return {action.target: os.path.lexists(action.target) != want_missing
+                for action, _summary in pending}
+
+    print(f"[bootstrap] {len(pending)} pending cop{'y' if len(pending) == 1 else 'ies'}:")
+    for action, summary in pending:
+        print(f"  {_collapse_home(action.target)}  ({summary})")
+    missing = sum(1 for action, _summary in pending if not os.path.lexists(action.target))
+    try:
+        with utils._prompt_lock:
+            answer = input(f"Copy all {len(pending)}? "
+                           f"[Y]es / [n]o / only [m]issing ({missing}): ").strip().lower()
+    except EOFError:
+        print("[bootstrap] Non-interactive mode detected, skipping pending copies.")
+        return select_copies(pending, 'no')
+
+    if answer in ('', 'y', 'yes'):
+        return select_copies(pending, 'yes')
+    if answer in ('m', 'missing'):
+        return select_copies(pending, 'only-missing')
+    return select_copies(pending, 'no')
+
+
+def _apply_action(action, ledger, current_platform, copy_decisions=None):
+    """
+    Apply a single link or copy action.
+
+    Args:
+        copy_decisions (dict, optional): Decisions from select_copies().
+            None asks per copy.
+
+    Returns:
+        str: 'applied', 'unchanged', 'skipped' or 'failed'
+    """
+    if action.kind == 'link':
+        if ledger is not None and ledger.link_is_current(action):
+            ledger.record(action)
+            return 'unchanged'
+        ok = utils._handle_link(action.name, action.source, action.target,
+                                current_platform, utils.PLATFORM_ANY)
+        if ok and ledger is not None:
+            ledger.record(action)
+    else:
+        if ledger is not None and ledger.copy_is_current(action):
+            ledger.record(action)
+            return 'unchanged'
+        approved = None
+        if copy_decisions is not None:
+            # Copies that were not pending are converged (or fail on a missing
+            # source); they never need confirmation
+            approved = copy_decisions.get(action.target, True)
+            if not approved:
+                utils._log(action.name, f"Skipped copy {action.target} by copy policy.")
+                return 'skipped'
+        ok = utils._handle_copy(action.name, action.source, action.target,
+                                current_platform, utils.PLATFORM_ANY, approved=approved)
+        if ok and ledger is not None:
+            # The user may have declined the copy; only record real deployments
+            ledger.record_copy_if_matching(action)
+    return 'applied' if ok else 'failed'
+
+
+def _apply_group(actions, ledger, current_platform, copy_decisions=None, buffered=True):
+    """
+    Apply one strap's actions, optionally with its log output buffered.
+
+    Returns:
+        tuple: (outcomes as (action, status) pairs, buffered log lines)
+    """
+    if not buffered:
+        return [(action, _apply_action(action, ledger, current_platform, copy_decisions))
+                for action in actions], []
+    with utils.buffered_log() as lines:
+        outcomes = [(action, _apply_action(action, ledger, current_platform, copy_decisions))
+                    for action in actions]
+    return outcomes, lines
+
+
+def apply_plan(plan, ledger=None, jobs=1, copy_decisions=None):
+    """
+    Execute a plan's link and copy actions.
+
+    Cron actions are not applied here; the caller installs them in one batch.
+
+    Args:
+        plan (Plan): Plan to apply
+        ledger (ledger.Ledger, optional): Deployed-state ledger. When given,
+            actions that are already converged are skipped without touching
+            the filesystem, and applied actions are recorded.
+        jobs (int): Number of strap groups to apply concurrently
+        copy_decisions (dict, optional): Decisions from select_copies();
+            declined copies are skipped. None falls back to asking for each
+            copy.
+
+    Returns:
+        tuple: (number of actions applied, number already up to date,
+            number skipped by the copy policy, list of failed actions)
+    """
+    current_platform = utils.get_current_platform()
+    groups = plan.groups()
+    results = {}
+
+    if jobs <= 1 or len(groups) <= 1:
+        for name, actions, _deps in groups:
+            results[name] = _apply_group(actions, ledger, current_platform, copy_decisions,
+                                         buffered=False)
+    else:
+        _apply_groups_parallel(groups, ledger, current_platform, jobs, results, copy_decisions)
+
+    applied = 0
+    unchanged = 0
+    skipped = 0
+    failed = []
+    for name, _actions, _deps in groups:
+        for action, status in results[name][0]:
+            if status == 'applied':
+                applied += 1
+            elif status == 'unchanged':
+                unchanged += 1
+            elif status == 'skipped':
+                skipped += 1
+            else:
+                failed.append(action)
+
+    return applied, unchanged, skipped, failed
+
+
+def _apply_groups_parallel(groups, ledger, current_platform, jobs, results, copy_decisions=None):
+    """
+    Apply groups on a thread pool, respecting dependencies.
+
+    Buffered log lines are printed in group order as soon as every earlier
+    group has finished, so output is identical to a serial run.
+    """
+    pending = {name: set(deps) for name, _actions, deps in groups}
+    actions_by_name = {name: actions for name, actions, _deps in groups}
+    finished = set()
+    next_to_print = 0
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(finished) < len(groups):
+            for name, _actions, _deps in groups:
+                if name in pending and not pending[name] - finished:
+                    del pending[name]
+                    future = pool.submit(_apply_group, actions_by_name[name], ledger, current_platform,
+                                         copy_decisions)
+                    running[future] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                finished.add(name)
+
+            while next_to_print < len(groups) and groups[next_to_print][0] in results:
+                for line in results[groups[next_to_print][0]][1]:
+                    print(line)
+                next_to_print += 1
@@ -0,0 +1,225 @@
+"""
+systemd user-timer backend for strap cron entries.
+
+An alternative to the crontab: every cron entry is rendered as a
+deytefiles-<strap>-<hash>.service/.timer pair in ~/.config/systemd/user.
+Timers are Persistent= by default, so runs missed while the machine was
+off or suspended are caught up, and entries may set RandomizedDelaySec=.
+
+Applying only writes units whose content changed and reloads systemd once
+for the whole batch. Units are owned by deytefiles through their name
+prefix; units of entries dropped from strap files are reported, and
+removed with prune=True.
+"""
+
+import hashlib
+import os
+
+from . import cron
+from . import utils
+
+UNIT_PREFIX = "deytefiles-"
+UNIT_HEADER = "# Managed by deytefiles bootstrap; changes are overwritten."
+
+
+def default_unit_dir():
+    """Return the systemd user unit directory."""
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(config_home, 'systemd', 'user')
+
+
+def _run_systemctl(args):
+    """
+    Run `systemctl --user` with the given arguments.
+
+    Returns:
+        bool: True if systemctl succeeded
+    """
+    import subprocess
+
+    try:
+        result = subprocess.run(['systemctl', '--user'] + list(args),
+                                capture_output=True, text=True, check=False)
+    except FileNotFoundError:
+        utils._log("timers", "ERROR: 'systemctl' command not found. Is systemd installed?")
+        return False
+    if result.returncode != 0:
+        utils._log("timers", f"ERROR: systemctl {' '.join(args)} failed: {result.stderr.strip()}")
+        return False
+    return True
+
+
+def _escape(text):
+    """Escape text for a unit file value (specifiers and variable expansion)."""
+    return text.replace('%', '%%')
+
+
+def _exec_quote(command):
+    """Quote a shell command as a single ExecStart= argument."""
+    quoted = command.replace('\\', '\\\\').replace('"', '\\"')
+    return '"' + _escape(quoted).replace('$', '$$') + '"'
+
+
+def unit_name(name, entry):
+    """
+    Return the unit name (without suffix) for a cron entry.
+
+    Args:
+        name (str): Strap config name
+        entry (str): Crontab line
+    """
+    slug = ''.join(c if c.isalnum() else '-' for c in name.lower()).strip('-') or 'job'
+    digest = hashlib.sha256(entry.encode()).hexdigest()[:8]
+    return f"{UNIT_PREFIX}{slug}-{digest}"
+
+
+def render_units(name, entry, options=None):
+    """
+    Render the service and timer units for one cron entry.
+
+    Args:
+        name (str): Strap config name
+        entry (str): Crontab line ("<time expression> <command>")
+        options (dict, optional): Timer options: 'persistent' (bool,
+            default True) and 'random_delay' (seconds or a systemd time span)
+
+    Returns:
+        dict: {unit file name: content}
+
+    Raises:
+        cron.CronError: If the entry's time expression is invalid
+    """
+    options = options or {}
+    time_expr, command = cron.split_entry(entry)
+    schedule = cron.CronSchedule(time_expr)
+    base = unit_name(name, entry)
+
+    service = [
+        UNIT_HEADER,
+        "[Unit]",
+        f"Description=deytefiles {_escape(name)}: {_escape(command)}",
+        "",
+        "[Service]",
+        "Type=oneshot",
+        "WorkingDirectory=%h",
+        f"ExecStart=/bin/sh -c {_exec_quote(command)}",
+    ]
+
+    timer = [
+        UNIT_HEADER,
+        "[Unit]",
+        f"Description=deytefiles {_escape(name)}: {time_expr}",
+        "",
+        "[Timer]",
+    ]
+    timer += [f"OnCalendar={calendar}" for calendar in schedule.on_calendar()]
+    timer.append(f"Persistent={'true' if options.get('persistent', True) else 'false'}")
+    if options.get('random_delay'):
+        timer.append(f"RandomizedDelaySec={options['random_delay']}")
+    timer += ["", "[Install]", "WantedBy=timers.target"]
+
+    return {
+        f"{base}.service": '\n'.join(service) + '\n',
+        f"{base}.timer": '\n'.join(timer) + '\n',
+    }
+
+
+class SystemdTimerBackend:
+    """Installs cron entries as systemd user timers."""
+
+    def __init__(self, unit_dir=None, systemctl=None):
+        """
+        Initialize the backend.
+
+        Args:
+            unit_dir (str, optional): Unit directory. Defaults to
+                ~/.config/systemd/user
+            systemctl (callable, optional): Called with a list of
+                `systemctl --user` arguments, returns True on success.
+                Defaults to running systemctl.
+        """
+        self.unit_dir = unit_dir or default_unit_dir()
+        self.systemctl = systemctl or _run_systemctl
+
+    def installed_units(self):
+        """Return the file names of the deytefiles units in the unit directory."""
+        try:
+            names = os.listdir(self.unit_dir)
+        except FileNotFoundError:
+            return set()
+        return {n for n in names if n.startswith(UNIT_PREFIX) and n.endswith(('.service', '.timer'))}
+
+    def _read(self, filename):
+        try:
+            with open(os.path.join(self.unit_dir, filename), 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, filename, content):
+        path = os.path.join(self.unit_dir, filename)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def apply(self, jobs, prune=False):
+        """
+        Bring the unit directory in line with the given cron entries.
+
+        Args:
+            jobs (list): (strap name, crontab line, options dict or None) tuples
+            prune (bool): Remove units of entries no longer in any strap file
+
+        Returns:
+            bool: True if the timers are up to date, False if applying failed
+        """
+        desired = {}
+        for name, entry, options in jobs:
+            try:
+                desired.update(render_units(name, entry, options))
+            except cron.CronError as e:
+                utils._log("timers", f"ERROR: Skipping '{entry}': {e}")
+
+        installed = self.installed_units()
+        changed = [f for f in sorted(desired) if self._read(f) != desired[f]]
+        stale = sorted(installed - set(desired))
+
+        if stale and not prune:
+            for filename in stale:
+                utils._log("timers", f"Stale unit (no longer in any strap file): {filename}")
+            utils._log("timers", f"{len(stale)} stale unit(s) found (run with --prune to remove them)")
+            stale = []
+
+        if not changed and not stale:
+            utils._log("timers", f"Timers already up to date ({len(jobs)} job(s))")
+            return True
+
+        ok = True
+        stale_timers = [f for f in stale if f.endswith('.timer')]
+        if stale_timers:
+            ok &= self.systemctl(['disable', '--now'] + stale_timers)
+        try:
+            os.makedirs(self.unit_dir, exist_ok=True)
+            for filename in changed:
+                utils._log("timers", f"{'Updating' if filename in installed else 'Writing'} {filename}")
+                self._write(filename, desired[filename])
+            for filename in stale:
+                utils._log("timers", f"Removing {filename}")
+                os.unlink(os.path.join(self.unit_dir, filename))
+        except OSError as e:
+            utils._log("timers", f"ERROR: Failed to update units in {self.unit_dir}: {e}")
+            return False
+
+        # One reload for the whole batch, then (re)start the affected timers
+        ok &= self.systemctl(['daemon-reload'])
+        new_timers = [f for f in changed if f.endswith('.timer') and f not in installed]
+        updated_timers = [f for f in changed if f.endswith('.timer') and f in installed]
+        if new_timers:
+            ok &= self.systemctl(['enable', '--now'] + new_timers)
+        if updated_timers:
+            ok &= self.systemctl(['restart'] + updated_timers)
+
+        if ok:
+            utils._log("timers", f"Timers updated: {len(changed)} unit(s) written, {len(stale)} removed")
+        return ok
@@ -1,25 +1,94 @@
 import os
 import sys
-import shutil
-import platform
-import subprocess
-import tempfile
-import re
-
-# Try to import yaml from different sources
-try:
-    import yaml
-except ImportError:
-    # Use vendored YAML parser
-    from pathlib import Path
-    vendor_path = Path(__file__).parent / 'vendor'
-    sys.path.insert(0, str(vendor_path))
+import contextlib
+import contextvars
+import threading
+
+# Heavier modules (subprocess, tempfile, shutil and the YAML parser) are
+# imported where they are first used. Importing PyYAML alone costs more than
+# the rest of a fully cached bootstrap run.
+VENDOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vendor')
+
+_yaml = None
+_yaml_imported = False
+_YAML_LOADER = None
+
+
+def _import_yaml():
+    """
+    Import PyYAML, or the vendored parser if PyYAML is not installed.
+
+    Returns:
+        module: The YAML module, or None if no parser is available
+    """
+    global _yaml, _yaml_imported, _YAML_LOADER
+    if _yaml_imported:
+        return _yaml
+
+    # Try to import yaml from different sources
+    try:
+        import yaml
+    except ImportError:
+        # Use vendored YAML parser
+        sys.path.insert(0, VENDOR_DIR)
+        try:
+            import yaml_parser as yaml
+        except ImportError as e:
+            print(f"[utils] WARNING: Could not import YAML parser: {e}")
+            print("[utils] YAML config files will not be supported")
+            yaml = None
+
+    # Prefer PyYAML's libyaml-backed loader; it is several times faster than
+    # the pure-Python SafeLoader. The vendored parser has no loader classes.
+    _YAML_LOADER = getattr(yaml, 'CSafeLoader', None) or getattr(yaml, 'SafeLoader', None)
+    _yaml = yaml
+    _yaml_imported = True
+    return yaml
+
+
+def __getattr__(name):
+    # `utils.yaml` imports the parser on first access
+    if name == 'yaml':
+        return _import_yaml()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def load_yaml(stream):
+    """
+    Parse a YAML document with the fastest available safe loader.
+
+    Args:
+        stream: YAML content as string or file-like object
+
+    Returns:
+        The parsed document (None for an empty document)
+    """
+    yaml = _import_yaml()
+    if _YAML_LOADER is not None:
+        return yaml.load(stream, Loader=_YAML_LOADER)
+    return yaml.safe_load(stream)
+
+
+def yaml_parser_id():
+    """
+    Identify the YAML parser that load_yaml() uses, without importing it,
+    so cached parse results can be invalidated when it changes.
+
+    Returns:
+        str: The parser module's file, size and mtime, or None if no parser
+            is available
+    """
+    if _yaml_imported:
+        origin = getattr(_yaml, '__file__', None)
+    else:
+        import importlib.util
+        spec = importlib.util.find_spec('yaml')
+        origin = spec.origin if spec is not None else os.path.join(VENDOR_DIR, 'yaml_parser.py')
     try:
-        import yaml_parser as yaml
-    except ImportError as e:
-        print(f"[utils] WARNING: Could not import YAML parser: {e}")
-        print("[utils] YAML config files will not be supported")
-        yaml = None
+        st = os.stat(origin)
+    except (OSError, TypeError):
+        return None
+    return f"{origin}:{st.st_size}:{st.st_mtime_ns}"
 
 # Platform constants
 PLATFORM_DARWIN = 1
@@ -29,25 +98,72 @@ PLATFORM_ANY = 3
 # Cron management markers
 CRON_BEGIN_MARKER = "# BEGIN DEYTENIT DOTFILES STRAP CRON"
 CRON_END_MARKER = "# END DEYTENIT DOTFILES STRAP CRON"
+# Written right after CRON_BEGIN_MARKER; digest of the managed entries
+CRON_DIGEST_PREFIX = "# deytefiles digest: sha256:"
+# Number of crontab backups kept in the state directory
+CRON_BACKUP_COUNT = 5
+# Per-entry options honoured by the systemd timer backend (ignored by cron)
+CRON_TIMER_OPTIONS = ('persistent', 'random_delay')
+
+# While a bootstrap run is planning, process_config() adds entries to the
+# run's plan instead of executing them. The active plan is held in a context
+# variable (not a module global) so repeated runs in one process never share
+# state.
+_active_plan = contextvars.ContextVar('active_plan', default=None)
+
+
+@contextlib.contextmanager
+def planning(plan, strap=None):
+    """
+    Route process_config() calls into `plan` (see planner.Plan.add_config).
 
-# Global list to collect cron entries from all strap files
-COLLECTED_CRON_ENTRIES = []
+    Used for legacy .strap files, which call process_config() themselves.
+    """
+    token = _active_plan.set((plan, strap))
+    try:
+        yield plan
+    finally:
+        _active_plan.reset(token)
 
 def get_current_platform():
     """Determines the current platform code."""
-    system = platform.system().lower()
-    if system == 'darwin':
+    if sys.platform == 'darwin':
         return PLATFORM_DARWIN
-    elif system == 'linux':
+    elif sys.platform.startswith('linux'):
         return PLATFORM_LINUX
     else:
         # Consider other systems as unsupported for platform-specific actions
         # but allow PLATFORM_ANY
         return 0 # Or raise an error if you prefer stricter handling
 
+# When set, _log() appends lines to this list instead of printing them.
+# Parallel bootstrap workers buffer their output and the engine prints it in
+# a stable order.
+_log_sink = contextvars.ContextVar('log_sink', default=None)
+
+# Serializes interactive prompts when strap files are applied in parallel
+_prompt_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def buffered_log():
+    """Collect _log() output of the current thread into a list."""
+    lines = []
+    token = _log_sink.set(lines)
+    try:
+        yield lines
+    finally:
+        _log_sink.reset(token)
+
+
 def _log(name, message):
     """Helper function for logging."""
-    print(f"[bootstrap/{name}] {message}")
+    line = f"[bootstrap/{name}] {message}"
+    sink = _log_sink.get()
+    if sink is not None:
+        sink.append(line)
+    else:
+        print(line)
 
 def _resolve_path(path):
     """Expands ~ and makes path absolute."""
@@ -55,7 +171,7 @@ def _resolve_path(path):
 
 def _validate_cron_time(time_expr):
     """
-    Validates a cron time expression.
+    Validates a cron time expression by compiling it (see cron.CronSchedule).
     
     Args:
         time_expr (str): Cron time expression (e.g., "0 * * * *")
@@ -63,64 +179,13 @@ def _validate_cron_time(time_expr):
     Returns:
         tuple: (is_valid: bool, error_message: str or None)
     """
-    if not isinstance(time_expr, str):
-        return False, "Time expression must be a string"
-    
-    parts = time_expr.strip().split()
-    if len(parts) != 5:
-        return False, f"Cron time expression must have 5 fields, got {len(parts)}"
-    
-    # Basic validation for each field
-    # Minute (0-59), Hour (0-23), Day of Month (1-31), Month (1-12), Day of Week (0-7)
-    ranges = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
-    field_names = ["minute", "hour", "day of month", "month", "day of week"]
-    
-    for i, (part, (min_val, max_val), field_name) in enumerate(zip(parts, ranges, field_names)):
-        # Allow special characters: * , - /
-        if part == '*':
-            continue
-        
-        # Check for step values (*/n)
-        if '/' in part:
-            base, step = part.split('/', 1)
-            if base != '*' and not base.isdigit():
-                # Could be a range like 1-5/2
-                if '-' not in base:
-                    return False, f"Invalid {field_name} field: {part}"
-            if not step.isdigit():
-                return False, f"Invalid step value in {field_name} field: {part}"
-            continue
-        
-        # Check for ranges (n-m)
-        if '-' in part:
-            try:
-                start, end = part.split('-', 1)
-                start_num = int(start)
-                end_num = int(end)
-                if start_num < min_val or end_num > max_val or start_num > end_num:
-                    return False, f"Invalid range in {field_name} field: {part} (should be {min_val}-{max_val})"
-            except ValueError:
-                return False, f"Invalid range in {field_name} field: {part}"
-            continue
-        
-        # Check for lists (n,m,o)
-        if ',' in part:
-            try:
-                values = [int(v) for v in part.split(',')]
-                if any(v < min_val or v > max_val for v in values):
-                    return False, f"Invalid value in {field_name} list: {part} (should be {min_val}-{max_val})"
-            except ValueError:
-                return False, f"Invalid list in {field_name} field: {part}"
-            continue
-        
-        # Check for simple numeric value
-        try:
-            value = int(part)
-            if value < min_val or value > max_val:
-                return False, f"Invalid {field_name} value: {value} (should be {min_val}-{max_val})"
-        except ValueError:
-            return False, f"Invalid {field_name} field: {part}"
-    
+    # Import here to avoid circular dependency
+    from dotfiles import cron
+
+    try:
+        cron.CronSchedule(time_expr)
+    except cron.CronError as e:
+        return False, str(e)
     return True, None
 
 def _validate_cron_entry(name, time_expr, command):
@@ -197,25 +262,93 @@ def _handle_cron(name, time_expr, command, current_platform, platform_flag):
     
     return cron_entry
 
-def apply_cron_jobs(all_cron_entries):
+def _cron_digest(entries):
+    """Return the digest recorded in the managed section for these entries."""
+    import hashlib
+
+    return hashlib.sha256('\n'.join(entries).encode()).hexdigest()
+
+
+def _cron_backup_dir():
+    """Return the crontab backup directory under the XDG state directory."""
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.path.join(state_home, 'deytefiles', 'crontab-backups')
+
+
+def _backup_crontab(crontab, keep=CRON_BACKUP_COUNT):
+    """
+    Save a crontab to a new backup file, keeping only the newest `keep` backups.
+
+    Returns:
+        str or None: Path of the backup, or None if it could not be written
+    """
+    import time
+
+    backup_dir = _cron_backup_dir()
+    now_ns = time.time_ns()
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now_ns // 1_000_000_000))
+    path = os.path.join(backup_dir, f"crontab.{stamp}.{now_ns % 1_000_000_000:09d}")
+    try:
+        os.makedirs(backup_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(crontab)
+        backups = sorted(name for name in os.listdir(backup_dir) if name.startswith('crontab.'))
+        for name in backups[:-keep]:
+            os.unlink(os.path.join(backup_dir, name))
+    except OSError as e:
+        _log("cron", f"WARNING: Could not back up crontab: {e}")
+        return None
+    return path
+
+
+def _find_cron_section(lines):
+    """
+    Locate the managed section in a crontab.
+
+    Returns:
+        tuple: (begin index, end index), -1 for a marker that is missing
+    """
+    begin_idx = -1
+    end_idx = -1
+    for i, line in enumerate(lines):
+        if line.strip() == CRON_BEGIN_MARKER:
+            begin_idx = i
+        elif line.strip() == CRON_END_MARKER:
+            end_idx = i
+            break
+    return begin_idx, end_idx
+
+
+def apply_cron_jobs(all_cron_entries, allow_empty=False):
     """
     Applies collected cron jobs to the user's crontab.
     Manages a dedicated section between markers.
+
+    The section starts with a digest of its entries. When the installed
+    section already carries the digest of the entries to apply, nothing is
+    written, so an unchanged run costs a single `crontab -l`. Otherwise the
+    change is shown as a unified diff, the current crontab is saved to a
+    rotating backup in the state directory and the new one is installed.
     
     Args:
         all_cron_entries (list): List of cron entry strings
+        allow_empty (bool): Write an empty managed section instead of doing
+            nothing when there are no entries (removes previously installed jobs)
+
+    Returns:
+        bool: True if the crontab is up to date, False if applying failed
     """
-    if not all_cron_entries:
+    if not all_cron_entries and not allow_empty:
         _log("cron", "No cron entries to apply")
-        return
+        return True
     
     current_platform = get_current_platform()
     if current_platform not in [PLATFORM_DARWIN, PLATFORM_LINUX]:
-        _log("cron", f"Cron jobs not supported on platform: {platform.system()}")
-        return
-    
-    _log("cron", f"Applying {len(all_cron_entries)} cron job(s) to crontab...")
+        _log("cron", f"Cron jobs not supported on platform: {sys.platform}")
+        return True
     
+    import subprocess
+
     # Read current crontab
     try:
         result = subprocess.run(
@@ -234,33 +367,30 @@ def apply_cron_jobs(all_cron_entries):
     
     except FileNotFoundError:
         _log("cron", "ERROR: 'crontab' command not found. Is cron installed?")
-        return
+        return False
     except Exception as e:
         _log("cron", f"ERROR: Failed to read crontab: {e}")
-        return
-    
-    # Create backup
-    backup_crontab = current_crontab
+        return False
     
-    # Find managed section
     lines = current_crontab.split('\n')
-    begin_idx = -1
-    end_idx = -1
-    
-    for i, line in enumerate(lines):
-        if line.strip() == CRON_BEGIN_MARKER:
-            begin_idx = i
-        elif line.strip() == CRON_END_MARKER:
-            end_idx = i
-            break
+    begin_idx, end_idx = _find_cron_section(lines)
     
+    digest = _cron_digest(all_cron_entries)
+    digest_line = f"{CRON_DIGEST_PREFIX}{digest}"
+
     # Build new managed section
-    managed_section = [CRON_BEGIN_MARKER]
+    managed_section = [CRON_BEGIN_MARKER, digest_line]
     managed_section.extend(all_cron_entries)
     managed_section.append(CRON_END_MARKER)
     
     # Update crontab content
     if begin_idx != -1 and end_idx != -1:
+        installed = lines[begin_idx + 1:end_idx]
+        if installed[:1] == [digest_line]:
+            if _cron_digest(installed[1:]) == digest:
+                _log("cron", f"Crontab already up to date ({len(all_cron_entries)} job(s))")
+                return True
+            _log("cron", "WARNING: Managed cron section was edited by hand; replacing it")
         # Replace existing managed section
         _log("cron", "Updating existing managed cron section")
         new_lines = lines[:begin_idx] + managed_section + lines[end_idx + 1:]
@@ -268,13 +398,13 @@ def apply_cron_jobs(all_cron_entries):
         # Markers are corrupted (only one found)
         _log("cron", "ERROR: Cron markers are corrupted (only one marker found)")
         _log("cron", "Please manually fix your crontab before proceeding")
-        return
+        return False
     else:
         # No managed section exists, append it
         _log("cron", "Creating new managed cron section")
         # Add a blank line before markers if crontab is not empty
         if current_crontab.strip():
-            new_lines = lines + [''] + managed_section
+            new_lines = current_crontab.rstrip('\n').split('\n') + [''] + managed_section
         else:
             new_lines = managed_section
     
@@ -285,76 +415,61 @@ def apply_cron_jobs(all_cron_entries):
     if not new_crontab.endswith('\n'):
         new_crontab += '\n'
     
-    # Write to temporary file
+    _log("cron", f"Applying {len(all_cron_entries)} cron job(s) to crontab:")
+    import difflib
+    for line in difflib.unified_diff(current_crontab.splitlines(), new_crontab.splitlines(),
+                                     'crontab (current)', 'crontab (new)', lineterm=''):
+        _log("cron", f"  {line}")
+
+    if current_crontab:
+        backup_path = _backup_crontab(current_crontab)
+        if backup_path:
+            _log("cron", f"Previous crontab saved to {backup_path}")
+
+    # crontab validates its input and leaves the installed crontab untouched
+    # when it rejects it, so a failed install needs no rollback
     try:
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.crontab') as tmp_file:
-            tmp_file.write(new_crontab)
-            tmp_file_path = tmp_file.name
-        
-        _log("cron", f"Wrote new crontab to temporary file: {tmp_file_path}")
-        
-        # Validate by installing the temporary crontab
         result = subprocess.run(
-            ['crontab', tmp_file_path],
+            ['crontab', '-'],
+            input=new_crontab,
             capture_output=True,
             text=True,
             check=False
         )
-        
-        if result.returncode == 0:
-            _log("cron", "Successfully updated crontab!")
-            _log("cron", f"Added {len(all_cron_entries)} cron job(s)")
-            
-            # Clean up temporary file
-            os.unlink(tmp_file_path)
-        else:
-            # Validation failed, restore backup
-            _log("cron", "ERROR: Crontab validation failed!")
-            _log("cron", f"Error output: {result.stderr}")
-            _log("cron", "Rolling back to previous crontab...")
-            
-            # Restore backup
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.crontab') as backup_file:
-                backup_file.write(backup_crontab if backup_crontab else "")
-                backup_file_path = backup_file.name
-            
-            subprocess.run(['crontab', backup_file_path], check=False)
-            os.unlink(backup_file_path)
-            os.unlink(tmp_file_path)
-            
-            _log("cron", "Rollback completed. Original crontab restored.")
-    
     except Exception as e:
         _log("cron", f"ERROR: Failed to update crontab: {e}")
-        _log("cron", "Attempting to restore backup...")
-        
-        try:
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.crontab') as backup_file:
-                backup_file.write(backup_crontab if backup_crontab else "")
-                backup_file_path = backup_file.name
-            
-            subprocess.run(['crontab', backup_file_path], check=False)
-            os.unlink(backup_file_path)
-            _log("cron", "Backup restored successfully")
-        except Exception as restore_error:
-            _log("cron", f"ERROR: Failed to restore backup: {restore_error}")
+        return False
+
+    if result.returncode != 0:
+        _log("cron", "ERROR: Crontab validation failed! The previous crontab is still installed.")
+        _log("cron", f"Error output: {result.stderr}")
+        return False
+
+    _log("cron", "Successfully updated crontab!")
+    _log("cron", f"Installed {len(all_cron_entries)} cron job(s)")
+    return True
 
 def _handle_link(name, source, target, current_platform, platform_flag):
-    """Handles the linking logic for a single entry."""
+    """
+    Handles the linking logic for a single entry.
+
+    Returns:
+        bool: False if the link could not be created, True otherwise
+    """
     source_abs = _resolve_path(source)
     target_abs = _resolve_path(target)
     
     # Check platform compatibility using the PASSED argument
     if platform_flag != PLATFORM_ANY and platform_flag != current_platform:
         _log(name, f"Skipping link {target} (platform mismatch)")
-        return
+        return True
 
     _log(name, f"Linking {target_abs} -> {source_abs}")
 
     # Ensure source exists
     if not os.path.exists(source_abs):
         _log(name, f"ERROR: Source path does not exist: {source_abs}")
-        return
+        return False
 
     # Ensure target directory exists
     target_dir = os.path.dirname(target_abs)
@@ -362,7 +477,7 @@ def _handle_link(name, source, target, current_platform, platform_flag):
         os.makedirs(target_dir, exist_ok=True)
     except OSError as e:
         _log(name, f"ERROR: Could not create directory {target_dir}: {e}")
-        return
+        return False
 
     # Handle existing target (force linking)
     if os.path.lexists(target_abs): # Use lexists to check for broken symlinks too
@@ -387,39 +502,51 @@ def _handle_link(name, source, target, current_platform, platform_flag):
                  # without removing the target dir first if the target name doesn't conflict.
                  # However, the explicit request is to FORCE the link. Let's remove it.
                  _log(name, f"INFO: Target {target_abs} is a directory. Attempting to remove for linking.")
+                 import shutil
                  shutil.rmtree(target_abs) # Be careful with this!
                  _log(name, f"Removed existing directory: {target_abs}")
 
         except OSError as e:
             _log(name, f"ERROR: Could not remove existing target {target_abs}: {e}")
-            return
+            return False
 
     # Create the symbolic link
     try:
         os.symlink(source_abs, target_abs, target_is_directory=os.path.isdir(source_abs)) # Add target_is_directory for Windows compatibility if needed, fine on Unix.
         _log(name, f"Successfully linked {target_abs} -> {source_abs}")
+        return True
     except OSError as e:
         _log(name, f"ERROR: Could not create symlink {target_abs}: {e}")
     except Exception as e:
         _log(name, f"ERROR: An unexpected error occurred during linking {target_abs}: {e}")
+    return False
 
 
-def _handle_copy(name, source, target, current_platform, platform_flag):
-    """Handles the copying logic for a single entry."""
+def _handle_copy(name, source, target, current_platform, platform_flag, approved=None):
+    """
+    Handles the copying logic for a single entry.
+
+    Args:
+        approved (bool, optional): Decision already made for this copy (see
+            planner.select_copies). None asks the user for this entry.
+
+    Returns:
+        bool: False if the copy failed, True if it succeeded or was skipped
+    """
     source_abs = _resolve_path(source)
     target_abs = _resolve_path(target)
 
     # Check platform compatibility
     if platform_flag != PLATFORM_ANY and platform_flag != current_platform:
         _log(name, f"Skipping copy {target} (platform mismatch)")
-        return
+        return True
 
     _log(name, f"Preparing to copy {target_abs} <- {source_abs}")
 
     # Ensure source exists
     if not os.path.exists(source_abs):
         _log(name, f"ERROR: Source path does not exist: {source_abs}")
-        return
+        return False
         
     # Ensure target directory exists
     target_dir = os.path.dirname(target_abs)
@@ -427,48 +554,59 @@ def _handle_copy(name, source, target, current_platform, platform_flag):
         os.makedirs(target_dir, exist_ok=True)
     except OSError as e:
         _log(name, f"ERROR: Could not create directory {target_dir}: {e}")
-        return
+        return False
 
-    # Ask for user confirmation
-    prompt = f"Copy '{os.path.basename(source_abs)}' to '{target_abs}'?"
-    if os.path.exists(target_abs):
-        prompt += " (Target exists and will be overwritten)"
-    prompt += " [Y/n]: "
+    # Import here to avoid circular dependency
+    from dotfiles import copier
 
+    # Nothing to do (and nothing to ask) if the target already matches
     try:
-        user_input = input(prompt).strip().lower()
-    except EOFError: # Handle non-interactive environments gracefully
-        user_input = 'n'
-        _log(name, "Non-interactive mode detected, skipping copy confirmation.")
+        if copier.paths_identical(source_abs, target_abs):
+            _log(name, f"Target already up to date: {target_abs}")
+            return True
+    except OSError:
+        pass
+
+    # Why a copy is not made, for the log
+    skip_reason = "by copy policy"
+    if approved is None:
+        # Ask for user confirmation
+        prompt = f"Copy '{os.path.basename(source_abs)}' to '{target_abs}'?"
+        if os.path.exists(target_abs):
+            prompt += " (Target exists and will be overwritten)"
+        prompt += " [Y/n]: "
 
+        try:
+            with _prompt_lock:
+                user_input = input(prompt).strip().lower()
+        except EOFError: # Handle non-interactive environments gracefully
+            user_input = 'n'
+            _log(name, "Non-interactive mode detected, skipping copy confirmation.")
+            skip_reason = "without confirmation (no terminal)"
+        else:
+            skip_reason = "as declined at the prompt"
+
+        approved = user_input in ('', 'y', 'yes')
 
-    if user_input == '' or user_input == 'y' or user_input == 'yes':
+    if approved:
         try:
-             # Remove existing file/dir before copying if necessary
-            if os.path.lexists(target_abs):
-                if os.path.isdir(target_abs) and not os.path.islink(target_abs):
-                    shutil.rmtree(target_abs)
-                    _log(name, f"Removed existing directory: {target_abs}")
-                elif os.path.isfile(target_abs) or os.path.islink(target_abs):
-                     os.remove(target_abs)
-                     _log(name, f"Removed existing file/link: {target_abs}")
-
-            # Perform the copy (copy2 preserves metadata like permissions)
-            if os.path.isdir(source_abs):
-                shutil.copytree(source_abs, target_abs, symlinks=True) # copy dirs recursively
-            else:
-                shutil.copy2(source_abs, target_abs) 
-            _log(name, f"Successfully copied {target_abs} <- {source_abs}")
+            # Incremental copy: only files that differ are rewritten, metadata
+            # is preserved like copy2, extra target entries are removed
+            stats = copier.sync_path(source_abs, target_abs)
+            _log(name, f"Successfully copied {target_abs} <- {source_abs} ({stats.describe()})")
+            return True
         except OSError as e:
             _log(name, f"ERROR: Could not copy {source_abs} to {target_abs}: {e}")
         except Exception as e:
             _log(name, f"ERROR: An unexpected error occurred during copying {target_abs}: {e}")
+        return False
 
     else:
-        _log(name, f"Skipped copy {target_abs} by user request.")
+        _log(name, f"Skipped copy {target_abs} {skip_reason}.")
+        return True
 
 # The main function called by .strap files
-def process_config(config):
+def process_config(config, cron_entries=None):
     """
     Processes the configuration dictionary to link, copy files, and collect cron jobs.
 
@@ -491,12 +629,25 @@ def process_config(config):
           time_expr: Cron time expression (e.g., "0 * * * *").
           command: Command or script to execute.
           platform_flag: 1 (Darwin), 2 (Linux), 3 (Any).
+        cron_entries (list, optional): List to append validated cron entries to.
+
+    When called inside planning(), the config is added to the active plan
+    and nothing is executed.
+
+    Returns:
+        list: Validated cron entries collected from this config
     """
-    global COLLECTED_CRON_ENTRIES
+    collected = []
+
+    active = _active_plan.get()
+    if active is not None:
+        plan, strap = active
+        plan.add_config(config, strap=strap)
+        return collected
     
     if not isinstance(config, dict):
         print("[bootstrap/utils] ERROR: Invalid config format - must be a dictionary.")
-        return
+        return collected
 
     name = config.get('name', 'unknown')
     link_tasks = config.get('link', [])
@@ -515,7 +666,7 @@ def process_config(config):
 
 
     current_platform = get_current_platform()
-    _log(name, f"Processing on platform: {platform.system()} ({current_platform})")
+    _log(name, f"Processing on platform: {os.uname().sysname} ({current_platform})")
 
     # Process links
     for entry in link_tasks:
@@ -547,16 +698,20 @@ def process_config(config):
             if isinstance(time_expr, str) and isinstance(command, str) and isinstance(platform_flag, int):
                 cron_entry = _handle_cron(name, time_expr, command, current_platform, platform_flag)
                 if cron_entry:
-                    COLLECTED_CRON_ENTRIES.append(cron_entry)
+                    collected.append(cron_entry)
             else:
                 _log(name, f"ERROR: Invalid cron entry format: {entry}. Must be [str, str, int].")
         else:
             _log(name, f"ERROR: Invalid cron entry format: {entry}. Must be a list/tuple of 3 elements.")
 
+    if cron_entries is not None:
+        cron_entries.extend(collected)
+
     _log(name, "Processing finished.")
+    return collected
 
 
-def process_yaml_config(config, strap_dir, platform):
+def process_yaml_config(config, strap_dir, platform, cron_entries=None):
     """
     Process YAML-based configuration with smart path resolution.
     
@@ -574,6 +729,10 @@ def process_yaml_config(config, strap_dir, platform):
             }
         strap_dir (str): Absolute path to the directory containing the strap file
         platform (int): Platform code (PLATFORM_DARWIN, PLATFORM_LINUX, or PLATFORM_ANY)
+        cron_entries (list, optional): List to append validated cron entries to
+    
+    Returns:
+        list: Validated cron entries collected from this config
     
     Entry formats supported:
         - String: 'file.txt' → [strap_dir/file.txt, same_path_as_strap_dir/file.txt, platform]
@@ -583,7 +742,7 @@ def process_yaml_config(config, strap_dir, platform):
     """
     if not isinstance(config, dict):
         print(f"[bootstrap/yaml] ERROR: Invalid config format - must be a dictionary.")
-        return
+        return []
     
     name = config.get('name', 'unknown')
     _log(name, f"Processing YAML config from {strap_dir}")
@@ -597,7 +756,7 @@ def process_yaml_config(config, strap_dir, platform):
     }
     
     # Process using the existing function
-    process_config(normalized_config)
+    return process_config(normalized_config, cron_entries=cron_entries)
 
 
 def _normalize_yaml_entries(entries, strap_dir, platform, name):
@@ -673,6 +832,12 @@ def _normalize_yaml_entries(entries, strap_dir, platform, name):
 def _normalize_yaml_cron_entries(entries, strap_dir, platform, name):
     """
     Normalize YAML cron entries to full [time_expr, command, platform] format.
+
+    Entries are [time_expr, command], [time_expr, command, platform] or a
+    mapping with 'schedule', 'command' and optional 'platform', 'jitter'
+    and timer option keys (CRON_TIMER_OPTIONS). Jittered entries get their
+    minute field rewritten here; entries with timer options get them as a
+    fourth element.
     
     Args:
         entries (list): List of cron entries
@@ -681,7 +846,8 @@ def _normalize_yaml_cron_entries(entries, strap_dir, platform, name):
         name (str): Config name for logging
         
     Returns:
-        list: Normalized cron entries in [time_expr, command, platform] format
+        list: Normalized cron entries in [time_expr, command, platform] or
+            [time_expr, command, platform, options] format
     """
     if not isinstance(entries, list):
         return []
@@ -690,7 +856,21 @@ def _normalize_yaml_cron_entries(entries, strap_dir, platform, name):
     
     for entry in entries:
         try:
-            if isinstance(entry, (list, tuple)):
+            if isinstance(entry, dict):
+                # {schedule: ..., command: ..., platform: ..., jitter: bool} format
+                time_expr = entry.get('schedule')
+                command = entry.get('command')
+                entry_platform = entry.get('platform', platform)
+                if entry.get('jitter') and isinstance(time_expr, str) and isinstance(command, str):
+                    time_expr = _jitter_cron_time(name, time_expr, command)
+                # Timer options, used by the systemd backend (see timers.py)
+                options = {key: entry[key] for key in CRON_TIMER_OPTIONS if key in entry}
+                if options:
+                    normalized.append([time_expr, command, entry_platform, options])
+                else:
+                    normalized.append([time_expr, command, entry_platform])
+
+            elif isinstance(entry, (list, tuple)):
                 if len(entry) == 2:
                     # [time_expr, command] format
                     time_expr, command = entry
@@ -711,6 +891,24 @@ def _normalize_yaml_cron_entries(entries, strap_dir, platform, name):
     return normalized
 
 
+def _jitter_cron_time(name, time_expr, command):
+    """
+    Spread a jittered cron job's minute field (see cron.apply_jitter).
+
+    Invalid expressions are returned unchanged so validation reports them.
+    """
+    # Import here to avoid circular dependency
+    from dotfiles import cron
+
+    try:
+        jittered = cron.apply_jitter(time_expr, name, command)
+    except cron.CronError:
+        return time_expr
+    if jittered != ' '.join(time_expr.split()):
+        _log(name, f"Jitter: '{time_expr}' -> '{jittered}' for {command}")
+    return jittered
+
+
 def _infer_target_from_path(strap_dir_path):
     """
     Infer the target path from the strap directory path.